@@ -0,0 +1,132 @@
+# backend/asgi.py
+"""
+ASGI serving mode:  uvicorn asgi:app  (or gunicorn asgi:app -k uvicorn.workers.UvicornWorker)
+
+Endpoints that spend their time waiting on providers are served natively on
+the event loop: they call the async twins in the route modules (httpx via
+utils.upstream.afetch) and build the response with the same *_payload()
+functions the Flask views use. Every other path is handed to the Flask app
+through asgiref's WSGI adapter, so the two modes never drift apart. Native
+paths get the same deadline and admission gates as the Flask hooks
+(utils.admission), on the event loop. The lifespan startup starts the
+process's background workers (app.start_background).
+"""
+import json
+import time
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app as flask_app, start_background
+from routes.predictions import (awildfire_risk, aflood_risk, acrop_health, acrop_health_series,
+                                aai_predict, series_args)
+from routes.flood import aflood_spread
+from spread_api import aspread
+from utils import admission, upstream
+
+_wsgi = WsgiToAsgi(flask_app)
+
+
+def _arg(q, name, default=None, cast=float):
+    v = q.get(name, [None])[0]
+    if v is None or v == "":
+        if default is None:
+            raise ValueError(f"missing {name}")
+        return default
+    return cast(v)
+
+
+# path -> coroutine(query) returning a JSON-able dict (or (dict, status))
+async def _wildfire(q):
+    return await awildfire_risk(_arg(q, "lat", 37.7749), _arg(q, "lon", -122.4194))
+
+async def _flood(q):
+    return await aflood_risk(_arg(q, "lat", 29.7604), _arg(q, "lon", -95.3698))
+
+async def _crop(q):
+    deg = float(q["deg"][0]) if q.get("deg", [""])[0] else None     # no deg: the feature-store cell
+    return await acrop_health(_arg(q, "lat", 41.8781), _arg(q, "lon", -87.6298), deg)
+
+async def _crop_series(q):
+    lat, lon, deg, days, step = series_args({k: v[0] for k, v in q.items()})
+    return await acrop_health_series(lat, lon, deg, days, step)
+
+async def _ai(q):
+    return await aai_predict(_arg(q, "lat", 40.7128), _arg(q, "lon", -74.0060),
+                             _arg(q, "mode", "wildfire", cast=str))
+
+async def _spread(q):
+    try:
+        lat, lon, h = _arg(q, "lat"), _arg(q, "lon"), _arg(q, "h", 3.0)
+    except Exception:
+        return {"error": "invalid lat/lon/h"}, 400
+    return await aspread(lat, lon, h)
+
+async def _spread_flood(q):
+    try:
+        lat, lon = _arg(q, "lat"), _arg(q, "lon")
+    except Exception:
+        return {"error": "lat and lon are required numeric query params"}, 400
+    return await aflood_spread(lat, lon, q.get("rp", [None])[0], q.get("tide", [None])[0])
+
+ROUTES = {
+    "/api/wildfire-risk": _wildfire,
+    "/api/flood-risk": _flood,
+    "/api/crop-health": _crop,
+    "/api/crop-health/series": _crop_series,
+    "/api/ai/predict": _ai,
+    "/api/spread": _spread,
+    "/api/spread/flood": _spread_flood,
+}
+
+
+async def _send_json(send, payload, status=200, headers=()):
+    body = json.dumps(payload).encode("utf-8")
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode()),
+                            (b"access-control-allow-origin", b"*"), *headers]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _lifespan(receive, send):
+    while True:
+        msg = await receive()
+        if msg["type"] == "lifespan.startup":
+            start_background()
+            await send({"type": "lifespan.startup.complete"})
+        elif msg["type"] == "lifespan.shutdown":
+            await upstream.aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    handler = ROUTES.get(scope.get("path")) if scope["type"] == "http" else None
+    if handler is None or scope.get("method") not in ("GET", "HEAD"):
+        return await _wsgi(scope, receive, send)
+
+    q = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    header = dict(scope.get("headers") or ()).get(admission.DEADLINE_HEADER.lower().encode())
+    seconds = admission.request_deadline_s(header.decode("latin-1") if header else None)
+    gate = admission.gate_for(scope["path"])
+    with admission.deadline(seconds):
+        if gate is not None and not await gate.aenter(min(admission.QUEUE_WAIT_S, seconds)):
+            return await _send_json(
+                send, {"status": "error", "message": f"too many {gate.name} requests in flight, retry later"},
+                503, [(b"retry-after", str(gate.retry_after_s()).encode())])
+        started = time.monotonic()
+        try:
+            result = await handler(q)
+        except ValueError as e:
+            return await _send_json(send, {"status": "error", "message": str(e)}, 400)
+        except admission.DeadlineExceeded as e:
+            return await _send_json(send, {"status": "error", "message": str(e)}, 504)
+        finally:
+            if gate is not None:
+                gate.aleave(time.monotonic() - started)
+    if isinstance(result, tuple):
+        return await _send_json(send, *result)
+    return await _send_json(send, result)
@@ -0,0 +1,22 @@
+# backend/gunicorn.conf.py
+# Picked up automatically by `gunicorn app:app` when started from this directory.
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# Threaded workers: an open /api/events stream holds a thread, not a process
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+
+# Load the app once in the master and fork workers from it; app.create_app()
+# warms caches and imports heavy modules before the fork when LEO_PRELOAD=1.
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+if preload_app:
+    os.environ.setdefault("LEO_PRELOAD", "1")
+
+
+def post_fork(server, worker):
+    # background threads don't survive fork, and importing the app never
+    # starts them: each worker starts its own here
+    from app import start_background
+    start_background()
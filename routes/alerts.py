@@ -0,0 +1,62 @@
+# backend/routes/alerts.py
+from flask import Blueprint, request, jsonify
+
+bp_alerts = Blueprint("alerts", __name__, url_prefix="/api/alerts")
+
+MAX_BULK = 10000
+
+@bp_alerts.route("", methods=["GET"])
+def list_alerts():
+    """Rules with their count of firing cells; ?limit=&offset= pages through them."""
+    from utils import alerts
+    limit = min(int(request.args.get("limit", 100)), 1000)
+    total, rules = alerts.list_rules(limit, int(request.args.get("offset", 0)))
+    return jsonify({"status": "success", "total": total, "rules": rules})
+
+@bp_alerts.route("", methods=["POST"])
+def add_alert():
+    """
+    Body: one rule, or {"rules": [...]} for up to MAX_BULK at once.
+      {"kind": "risk", "lat": .., "lon": .., "mode": "wildfire", "above": 0.7, "radius_km": 5}
+      {"kind": "firms", "lat": .., "lon": .., "within_km": 10, "min_count": 1}
+      {"kind": "spread", "lat": .., "lon": .., "horizon_h": 3}
+    Optional "name" and "webhook" (an http(s) URL on a host in
+    LEO_ALERT_WEBHOOK_HOSTS; default LEO_ALERT_WEBHOOK, else notifications
+    are only recorded).
+    """
+    from utils import alerts
+    data = request.get_json(force=True, silent=True) or {}
+    specs = data["rules"] if isinstance(data.get("rules"), list) else [data]
+    if len(specs) > MAX_BULK:
+        return jsonify({"status": "error", "message": f"at most {MAX_BULK} rules per request"}), 400
+    try:
+        ids = alerts.add_rules(specs)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if "rules" in data:
+        return jsonify({"status": "success", "count": len(ids), "ids": ids}), 201
+    return jsonify({"status": "success", "rule": alerts.get_rule(ids[0])}), 201
+
+@bp_alerts.route("/<int:rule_id>", methods=["GET"])
+def get_alert(rule_id):
+    """The rule, its cells with their current state, and its latest deliveries."""
+    from utils import alerts
+    rule = alerts.get_rule(rule_id)
+    if rule is None:
+        return jsonify({"status": "error", "message": "unknown id"}), 404
+    return jsonify({"status": "success", "rule": rule, "deliveries": alerts.deliveries(rule_id, limit=20)})
+
+@bp_alerts.route("/<int:rule_id>", methods=["DELETE"])
+def remove_alert(rule_id):
+    from utils import alerts
+    if not alerts.remove_rule(rule_id):
+        return jsonify({"status": "error", "message": "unknown id"}), 404
+    return jsonify({"status": "success", "id": rule_id})
+
+@bp_alerts.route("/deliveries", methods=["GET"])
+def list_deliveries():
+    """Latest notifications (recorded-only ones included) with their delivery status."""
+    from utils import alerts
+    rule_id = request.args.get("rule_id", type=int)
+    limit = min(int(request.args.get("limit", 50)), 500)
+    return jsonify({"status": "success", "deliveries": alerts.deliveries(rule_id, limit)})
@@ -1,73 +1,96 @@
 # routes/crops.py
-import os, time, requests
-from flask import Blueprint, request, jsonify
+"""
+Bulk field statistics:  POST /api/crop-health/bulk  (GeoJSON FeatureCollection)
 
-crops_bp = Blueprint('crops', __name__)
-SH_ID = os.getenv('SENTINELHUB_CLIENT_ID')
-SH_SECRET = os.getenv('SENTINELHUB_CLIENT_SECRET')
-
-def sh_token():
-    r = requests.post('https://services.sentinel-hub.com/oauth/token',
-        data={'grant_type':'client_credentials',
-              'client_id':SH_ID,
-              'client_secret':SH_SECRET}, timeout=10)
-    r.raise_for_status()
-    return r.json()['access_token']
-
-EVALSCRIPT = """
-//VERSION=3
-function setup(){return{input:[{bands:["B04","B08"]}],output:{bands:1}};}
-function evaluatePixel(s){let ndvi=(s.B08 - s.B04)/(s.B08 + s.B04);return [ndvi];}
+Parcels are grouped per tile (utils.zonal) and each tile costs one cached
+CDSE process request: a cloud-masked max-NDVI composite over the window at
+~10 m. Per-parcel mean/min/max/valid-fraction come back as NDJSON, one line
+per parcel, streamed as each tile finishes, then a summary line.
+
+  ?days=30        composite window ending today
+  ?tile_deg=0.1   grouping tile size
 """
+import datetime as dt
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from flask import Blueprint, Response, request, jsonify
+
+from routes.predictions import PROCESS_URL, get_cdse_token_inline
+from utils.ratelimit import BATCH, priority
+from utils.shared_cache import provider_ttl
+from utils.upstream import fetch
+
+crops_bp = Blueprint('crops', __name__)
+
+MAX_PARCELS = int(os.getenv("LEO_BULK_MAX_PARCELS", "10000"))
+TILE_CONCURRENCY = int(os.getenv("LEO_BULK_TILE_CONCURRENCY", "4"))
+
+
+def _tile_ndvi(tile, window, token):
+    from utils.ndvi_stack import stack_payload, decode_stack
+    content = fetch("cdse", PROCESS_URL, method="POST",
+                    json=stack_payload(tile["bbox"], [window], tile["width"], tile["height"]),
+                    headers={"Authorization": f"Bearer {token}", "Accept": "application/tar"},
+                    timeout=120, parse="bytes", ttl=provider_ttl("cdse"))
+    return decode_stack(content, 1)[0]
+
+
+def _tile_job(tile, window, token):
+    from utils.zonal import tile_results
+    with priority(BATCH):
+        return tile_results(tile, _tile_ndvi(tile, window, token))
+
+
+def _line(obj):
+    return json.dumps(obj, separators=(",", ":")) + "\n"
+
+
+@crops_bp.post('/api/crop-health/bulk')
+def crop_health_bulk():
+    from utils.zonal import parse_parcels, group_parcels
+    try:
+        days = int(request.args.get('days', 30))
+        tile_deg = float(request.args.get('tile_deg', 0.1))
+        if not (1 <= days <= 180) or not (0.01 <= tile_deg <= 1.0):
+            raise ValueError("need 1 <= days <= 180 and 0.01 <= tile_deg <= 1")
+        parcels, errors = parse_parcels(request.get_json(force=True, silent=True))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if len(parcels) + len(errors) > MAX_PARCELS:
+        return jsonify({"status": "error", "message": f"at most {MAX_PARCELS} parcels per request"}), 400
+
+    token = get_cdse_token_inline()
+    if not token:
+        return jsonify({"status": "error", "message": "CDSE credentials not configured"}), 503
+
+    tiles = group_parcels(parcels, tile_deg)
+    end = dt.datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + dt.timedelta(days=1)
+    window = (end - dt.timedelta(days=days), end)
+
+    def stream():
+        t0 = time.time()
+        failed = 0
+        for pid, msg in errors:
+            yield _line({"id": pid, "error": msg})
+        with ThreadPoolExecutor(max_workers=TILE_CONCURRENCY) as pool:
+            jobs = {pool.submit(_tile_job, t, window, token): t for t in tiles}
+            for fut in as_completed(jobs):
+                tile = jobs[fut]
+                try:
+                    rows = fut.result()
+                except Exception as e:
+                    failed += 1
+                    rows = [{"id": pid, "tile": tile["key"], "error": f"raster fetch failed: {e!r}"}
+                            for pid, _ in tile["parcels"]]
+                for row in rows:
+                    yield _line(row)
+        yield _line({"type": "summary", "parcels": len(parcels), "invalid": len(errors),
+                     "tiles": len(tiles), "failed_tiles": failed,
+                     "window": [window[0].strftime("%Y-%m-%d"), window[1].strftime("%Y-%m-%d")],
+                     "elapsed_s": round(time.time() - t0, 2)})
 
-@crops_bp.get('/api/crop-health')
-def crop_health():
-    lat = float(request.args.get('lat'))
-    lon = float(request.args.get('lon'))
-    size = 0.001  # ~100 m tile
-    bbox = [lon - size, lat - size, lon + size, lat + size]
-
-    token = sh_token()
-    payload = {
-      "input": {
-        "bounds": {"bbox": bbox, "properties": {"crs": "http://www.opengis.net/def/crs/EPSG/0/4326"}},
-        "data": [{"type":"sentinel-2-l2a","dataFilter":{"timeRange":{"from": time.strftime("%Y-%m-%dT00:00:00Z", time.gmtime(time.time()-14*86400)),
-                                                                      "to": time.strftime("%Y-%m-%dT23:59:59Z", time.gmtime())},
-                                  "maxCloudCoverage": 20}}]
-      },
-      "evalscript": EVALSCRIPT,
-      "aggregation": {"timeRange":{"from": time.strftime("%Y-%m-%dT00:00:00Z", time.gmtime(time.time()-14*86400)),
-                                   "to": time.strftime("%Y-%m-%dT23:59:59Z", time.gmtime())},
-                      "aggregationInterval":{"of":"P14D","to":"P14D"},
-                      "resx":10,"resy":10,"reducers":["MEAN"]}
-    }
-    r = requests.post('https://services.sentinel-hub.com/api/v1/process',
-                      headers={'Authorization': f'Bearer {token}'}, json=payload, timeout=30)
-    ndvi_mean = None
-    if r.ok:
-        # Result is image bytes by default; for stats, alternatively use Statistics API
-        # Better: use Statistics API for numeric mean
-        stats = requests.post('https://services.sentinel-hub.com/api/v1/statistics',
-                              headers={'Authorization': f'Bearer {token}'},
-                              json={
-                                "input":{"bounds":{"bbox":bbox},
-                                         "data":[{"type":"sentinel-2-l2a"}]},
-                                "aggregation":{"timeRange":{"from":payload["aggregation"]["timeRange"]["from"],
-                                                             "to":payload["aggregation"]["timeRange"]["to"]},
-                                               "resolution":{"x":60,"y":60},
-                                               "evalscript":EVALSCRIPT}
-                              }, timeout=30)
-        if stats.ok:
-            stj = stats.json()
-            # Walk to NDVI mean
-            # Simplify: read first tile stats if present
-            for k,v in stj.get('data', [{}])[0].get('outputs', {}).items():
-                pass
-            # If needed, adapt based on actual structure
-    data = {
-        'health_index': ndvi_mean,  # set from stats when parsed
-        'risk_level': 'low' if (ndvi_mean is None or ndvi_mean>0.5) else 'medium',
-        'prediction_confidence': 0.6,
-        'factors': {'ndvi': ndvi_mean, 'lst': None, 'vci': None}
-    }
-    return jsonify({'data': data})
+    return Response(stream(), mimetype="application/x-ndjson",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
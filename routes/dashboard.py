@@ -0,0 +1,170 @@
+# backend/routes/dashboard.py
+"""
+Everything the UI shows for one map click, in one request:
+
+  GET /api/dashboard?lat=38.5&lon=-122.7[&panels=wildfire,flood,spread][&fields=wildfire.data.risk_score]
+
+Panels are the payloads of /api/wildfire-risk, /api/flood-risk,
+/api/crop-health, /api/ai/predict (mode=), /api/spread (h=), /api/triage
+and /api/tasking (mode=), built by the same *_payload() functions. The
+request builds one LocationContext: each set of feature-store sources is
+read once however many panels need it, and inside upstream.shared_fetches()
+any provider call two panels share goes out once. Panels then run in
+parallel; a failing panel lands in "errors" without failing the others.
+
+panels= picks panels (default all); fields= keeps only the listed dotted
+paths of the result, e.g. fields=wildfire.data.risk_level,flood.data.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+import contextvars
+import threading
+import time
+
+from flask import Blueprint, request, jsonify
+
+bp_dashboard = Blueprint("dashboard", __name__, url_prefix="/api")
+
+
+class LocationContext:
+    """Per-request inputs for one point, each computed at most once across panel threads."""
+
+    def __init__(self, lat, lon, mode="wildfire", horizon=3.0):
+        self.lat = lat
+        self.lon = lon
+        self.mode = mode
+        self.horizon = horizon
+        self._lock = threading.Lock()
+        self._memo = {}
+
+    def _once(self, name, fn):
+        with self._lock:
+            fut = self._memo.get(name)
+            first = fut is None
+            if first:
+                fut = self._memo[name] = Future()
+        if first:
+            try:
+                fut.set_result(fn())
+            except Exception as e:
+                fut.set_exception(e)
+        return fut.result()
+
+    def features(self, sources):
+        from utils.feature_store import get_features
+        return self._once(("features", sources), lambda: get_features(self.lat, self.lon, sources))
+
+    def weather(self):
+        from spread_api import fetch_weather, DEMO_WEATHER
+        return self._once("weather", lambda: fetch_weather(self.lat, self.lon) or dict(DEMO_WEATHER))
+
+
+# -----------------------------
+# Panels
+# -----------------------------
+def _wildfire(ctx):
+    from routes.predictions import wildfire_payload
+    from utils.feature_store import WILDFIRE_SOURCES
+    return wildfire_payload(ctx.lat, ctx.lon, ctx.features(WILDFIRE_SOURCES))
+
+def _flood(ctx):
+    from routes.predictions import flood_from_features
+    from utils.feature_store import FLOOD_SOURCES
+    return flood_from_features(ctx.lat, ctx.lon, ctx.features(FLOOD_SOURCES))
+
+def _crop(ctx):
+    from routes.predictions import crop_payload, cell_bbox
+    from utils.feature_store import CROP_SOURCES
+    feats = ctx.features(CROP_SOURCES)
+    return crop_payload(ctx.lat, ctx.lon, feats.get("ndvi"), feats, cell_bbox(feats))
+
+def _ai(ctx):
+    from routes.predictions import ai_payload
+    from utils.feature_store import AI_SOURCES
+    return ai_payload(ctx.lat, ctx.lon, ctx.mode, ctx.features(AI_SOURCES))
+
+def _spread(ctx):
+    from spread_api import spread_payload
+    return spread_payload(ctx.lat, ctx.lon, ctx.horizon, ctx.weather())
+
+def _triage(ctx):
+    from routes.triage import triage_payload
+    return triage_payload(ctx.lat, ctx.lon)
+
+def _tasking(ctx):
+    from routes.tasking import tasking_lookup_payload
+    return tasking_lookup_payload(ctx.lat, ctx.lon, ctx.mode)
+
+PANELS = {
+    "wildfire": _wildfire,
+    "flood": _flood,
+    "crop": _crop,
+    "ai": _ai,
+    "spread": _spread,
+    "triage": _triage,
+    "tasking": _tasking,
+}
+
+
+def build_dashboard(ctx, panels):
+    """({panel: payload}, {panel: error}, distinct upstream calls) with panels run in parallel."""
+    from utils.upstream import shared_fetches
+    with shared_fetches() as calls:
+        with ThreadPoolExecutor(max_workers=len(panels)) as pool:
+            # each panel runs in a copy of the request context (deadline, priority, shared fetches)
+            futures = {name: pool.submit(contextvars.copy_context().run, PANELS[name], ctx) for name in panels}
+        out, errors = {}, {}
+        for name, fut in futures.items():
+            try:
+                out[name] = fut.result()
+            except Exception as e:
+                errors[name] = str(e) or type(e).__name__
+        return out, errors, len(calls)
+
+
+def _project(obj, paths):
+    """Keep only the dotted `paths` of a nested dict; "flood.data." means all of flood.data."""
+    out = {}
+    for path in paths:
+        keys = [k for k in path.strip().split(".") if k]
+        src = obj
+        for k in keys:
+            if not isinstance(src, dict) or k not in src:
+                break
+            src = src[k]
+        else:
+            if not keys:
+                continue
+            dst = out
+            for k in keys[:-1]:
+                dst = dst.setdefault(k, {})
+            dst[keys[-1]] = src
+    return out
+
+
+@bp_dashboard.route("/dashboard", methods=["GET"])
+def dashboard():
+    try:
+        lat = float(request.args.get("lat"))
+        lon = float(request.args.get("lon"))
+        horizon = float(request.args.get("h", 3.0))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "lat and lon are required numeric query params"}), 400
+    panels = [p for p in (request.args.get("panels") or ",".join(PANELS)).lower().split(",") if p]
+    unknown = [p for p in panels if p not in PANELS]
+    if unknown or not panels:
+        return jsonify({"status": "error", "message": f"panels must be any of {', '.join(PANELS)}"}), 400
+
+    started = time.time()
+    ctx = LocationContext(lat, lon, (request.args.get("mode") or "wildfire").lower(), horizon)
+    out, errors, calls = build_dashboard(ctx, list(dict.fromkeys(panels)))
+    if request.args.get("fields"):
+        out = _project(out, [f for f in request.args["fields"].split(",") if f])
+    return jsonify({
+        "status": "success",
+        "lat": lat,
+        "lon": lon,
+        "panels": out,
+        "errors": errors,
+        "upstream_calls": calls,
+        "elapsed_s": round(time.time() - started, 3),
+    })
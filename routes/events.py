@@ -0,0 +1,147 @@
+# backend/routes/events.py
+"""
+Server-Sent Events push for tasking progress and risk changes.
+
+  GET /api/events?task=T1,T2&point=37.77,-122.42[,wildfire|flood]&point=...
+
+Each query becomes a broker topic ("task:T1", "risk:wildfire:37.770,-122.420").
+The per-process pump in utils.events evaluates a topic once per interval no
+matter how many clients hold it and pushes only changes; a prewarmer refresh
+of the same data wakes the risk source early. Points are rounded to 3 decimals
+so nearby clicks share one topic. The stream ends on its own once every task
+it follows is done and it watches no points.
+
+Under gthread each open stream holds a worker thread, so a worker serves
+at most MAX_STREAMS at a time (default a quarter of its threads) and
+answers 503 with Retry-After beyond that. Streams are also closed after
+STREAM_MAX_S; EventSource clients reconnect on their own after `retry`,
+so long-lived point watchers take turns instead of pinning threads.
+"""
+import json
+import os
+import threading
+import time
+
+from flask import Blueprint, Response, request, jsonify
+
+from utils.events import broker
+from utils.watchlist import prewarmer
+
+bp_events = Blueprint("events", __name__, url_prefix="/api")
+
+RISK_REFRESH_S = float(os.getenv("LEO_EVENTS_RISK_S", "60"))
+TASK_REFRESH_S = 1.0
+HEARTBEAT_S = 15.0
+RISK_MODES = ("wildfire", "flood")
+MAX_STREAMS = int(os.getenv("LEO_EVENTS_MAX_STREAMS", str(max(1, int(os.getenv("GUNICORN_THREADS", "16")) // 4))))
+STREAM_MAX_S = float(os.getenv("LEO_EVENTS_STREAM_MAX_S", "600"))
+RETRY_AFTER_S = 30
+
+_streams = threading.BoundedSemaphore(MAX_STREAMS)
+
+
+# -----------------------------
+# Sources
+# -----------------------------
+def _task_source(topic):
+    from routes.tasking import job_status
+    task_id = topic.split(":", 1)[1]
+    return job_status(task_id) or {"id": task_id, "status": "unknown"}
+
+
+def _risk_source(topic):
+    from routes.predictions import wildfire_payload, flood_from_features
+    from utils.feature_store import get_features, WILDFIRE_SOURCES, FLOOD_SOURCES
+    from utils.ratelimit import PREFETCH, priority
+    _, mode, point = topic.split(":", 2)
+    lat, lon = (float(v) for v in point.split(","))
+    with priority(PREFETCH):
+        feats = get_features(lat, lon, WILDFIRE_SOURCES if mode == "wildfire" else FLOOD_SOURCES)
+    # background polling is not a request: keep it out of the score archive
+    if mode == "wildfire":
+        data = wildfire_payload(lat, lon, feats, archive=False)["data"]
+    else:
+        data = flood_from_features(lat, lon, feats, archive=False)["data"]
+    return {"mode": mode, **data}
+
+
+broker.add_source("task:", _task_source, TASK_REFRESH_S)
+broker.add_source("risk:", _risk_source, RISK_REFRESH_S)
+
+
+@prewarmer.on_refresh
+def _on_prewarm(area, provider, ok):
+    if ok:
+        broker.wake("risk:")
+
+
+# -----------------------------
+# Stream
+# -----------------------------
+def parse_topics(args):
+    topics = [f"task:{t.strip()}" for raw in args.getlist("task") for t in raw.split(",") if t.strip()]
+    for raw in args.getlist("point"):
+        parts = [p.strip() for p in raw.split(",")]
+        if len(parts) not in (2, 3):
+            raise ValueError("point must be lat,lon[,mode]")
+        lat, lon = float(parts[0]), float(parts[1])
+        mode = (parts[2] if len(parts) == 3 else "wildfire").lower()
+        if mode not in RISK_MODES:
+            raise ValueError(f"mode must be one of {RISK_MODES}")
+        topics.append(f"risk:{mode}:{lat:.3f},{lon:.3f}")
+    if not topics:
+        raise ValueError("subscribe to at least one task or point")
+    return list(dict.fromkeys(topics))
+
+
+def _sse(event, data, event_id):
+    return f"event: {event}\nid: {event_id}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+@bp_events.route("/events")
+def events():
+    try:
+        topics = parse_topics(request.args)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if not _streams.acquire(blocking=False):
+        return jsonify({"status": "error", "message": "too many open event streams, retry later"}), \
+            503, {"Retry-After": str(RETRY_AFTER_S)}
+    sub = broker.subscribe(topics)
+    closed = []
+
+    def close():
+        # from the generator or from the response, whichever comes first
+        if not closed:
+            closed.append(True)
+            sub.close()
+            _streams.release()
+
+    def stream():
+        pending = {t for t in topics if t.startswith("task:")}
+        watching = any(t.startswith("risk:") for t in topics)
+        until = time.monotonic() + STREAM_MAX_S
+        seq = 0
+        try:
+            yield "retry: 3000\n\n"
+            while time.monotonic() < until:
+                item = sub.get(timeout=min(HEARTBEAT_S, max(0.0, until - time.monotonic())))
+                if item is None:
+                    yield ": keepalive\n\n"
+                    continue
+                topic, data = item
+                seq += 1
+                kind = topic.split(":", 1)[0]
+                yield _sse(kind, {"topic": topic, **data, "sent": time.time()}, seq)
+                if kind == "task" and data.get("status") in ("done", "unknown"):
+                    pending.discard(topic)
+                    if not pending and not watching:
+                        yield _sse("end", {"topics": topics}, seq + 1)
+                        return
+        finally:
+            close()
+
+    resp = Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    resp.call_on_close(close)
+    return resp
@@ -0,0 +1,154 @@
+# backend/routes/export.py
+"""
+Regional risk export:  GET /api/export?bbox=w,s,e,n&res=0.05&format=csv
+
+  format   csv | geojsonseq (RFC 8142, one Point feature per cell) | arrow
+           (Arrow IPC stream, needs pyarrow)
+  layers   wildfire,flood (default both)
+
+The grid is scored block by block (utils.risk_grid.score_block, the same
+inputs and heuristics as /api/tiles) inside a generator, so the header goes
+out at once, each block is sent as soon as it is scored, and memory does
+not grow with the region. Block fetches run at BATCH priority.
+"""
+import io
+import json
+import math
+import os
+
+from flask import Blueprint, Response, request, jsonify
+
+bp_export = Blueprint("export", __name__, url_prefix="/api")
+
+MAX_CELLS = int(os.getenv("LEO_EXPORT_MAX_CELLS", "1000000"))
+MIN_RES_DEG = 0.005
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "geojsonseq": ("application/geo+json-seq", "geojsons"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+VALUE_COLUMNS = {
+    "wildfire": ("wildfire_risk", "firms_raw"),
+    "flood": ("flood_probability", "height_above_drainage_m"),
+}
+WEATHER_COLUMNS = ("humidity", "wind_kmh", "precip_24h_mm")
+
+
+def export_args(args):
+    try:
+        w, s, e, n = (float(v) for v in args.get("bbox", "").split(","))
+    except ValueError:
+        raise ValueError("bbox=w,s,e,n required")
+    if not (-180 <= w < e <= 180 and -90 <= s < n <= 90):
+        raise ValueError("bbox must be west < east, south < north, in degrees")
+    res = float(args.get("res", 0.05))
+    if res < MIN_RES_DEG:
+        raise ValueError(f"res must be >= {MIN_RES_DEG} degrees")
+    fmt = (args.get("format") or "csv").lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    layers = tuple(l for l in (args.get("layers") or "wildfire,flood").lower().split(",") if l)
+    if not layers or any(l not in VALUE_COLUMNS for l in layers):
+        raise ValueError("layers must be wildfire and/or flood")
+    cells = math.ceil((n - s) / res - 1e-9) * math.ceil((e - w) / res - 1e-9)
+    if cells > MAX_CELLS:
+        raise ValueError(f"{cells} cells requested, at most {MAX_CELLS}; raise res")
+    return (w, s, e, n), res, fmt, layers, cells
+
+
+def _blocks(bbox, res, layers):
+    from utils.ratelimit import BATCH, priority
+    from utils.risk_grid import region_axes, region_blocks, score_block
+    lats, lons = region_axes(*bbox, res)
+    for blat, blon in region_blocks(lats, lons):
+        with priority(BATCH):
+            yield score_block(blat, blon, res, layers)
+
+
+def _num(v, digits):
+    return None if v != v else round(v, digits)
+
+
+def _csv_stream(blocks, columns):
+    import csv
+    buf = io.StringIO()
+    out = csv.writer(buf)
+    out.writerow(columns)
+    yield buf.getvalue()
+    for cols in blocks:
+        buf.seek(0)
+        buf.truncate()
+        lat, lon, *values = (cols[c].tolist() for c in columns)
+        out.writerows([f"{y:.5f}", f"{x:.5f}"] + ["" if v != v else f"{v:.4g}" for v in vals]
+                      for y, x, *vals in zip(lat, lon, *values))
+        yield buf.getvalue()
+
+
+def _geojsonseq_stream(blocks, columns):
+    props = columns[2:]
+    for cols in blocks:
+        lines = []
+        for lat, lon, *vals in zip(*(cols[c].tolist() for c in columns)):
+            feat = {"type": "Feature", "geometry": {"type": "Point", "coordinates": [round(lon, 5), round(lat, 5)]},
+                    "properties": {c: _num(v, 4) for c, v in zip(props, vals)}}
+            lines.append("\x1e" + json.dumps(feat, separators=(",", ":")) + "\n")
+        yield "".join(lines)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last take()."""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._parts.append(bytes(b))
+        return len(b)
+
+    def take(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _arrow_stream(blocks, columns):
+    import numpy as np
+    import pyarrow as pa
+    schema = pa.schema([(c, pa.float64() if c in ("lat", "lon") else pa.float32()) for c in columns])
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield sink.take()
+        for cols in blocks:
+            writer.write_batch(pa.record_batch(
+                [pa.array(np.asarray(cols[f.name], dtype=f.type.to_pandas_dtype()), from_pandas=True)
+                 for f in schema], schema=schema))
+            yield sink.take()
+    yield sink.take()   # end-of-stream marker
+
+
+STREAMS = {"csv": _csv_stream, "geojsonseq": _geojsonseq_stream, "arrow": _arrow_stream}
+
+
+@bp_export.route("/export", methods=["GET"])
+def export():
+    try:
+        bbox, res, fmt, layers, cells = export_args(request.args)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if fmt == "arrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return jsonify({"status": "error", "message": "format=arrow needs pyarrow installed"}), 501
+
+    columns = ["lat", "lon"] + [c for l in layers for c in VALUE_COLUMNS[l]] + list(WEATHER_COLUMNS)
+    mimetype, ext = FORMATS[fmt]
+    return Response(STREAMS[fmt](_blocks(bbox, res, layers), columns), mimetype=mimetype, headers={
+        "Content-Disposition": f'attachment; filename="risk_export.{ext}"',
+        "X-Export-Cells": str(cells),
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
@@ -1,13 +1,11 @@
 # routes/flood.py
 import math
-import requests
 from flask import Blueprint, request, jsonify
 
+
 # Mount under the same prefix the frontend calls
 flood_bp = Blueprint("flood", __name__, url_prefix="/api/spread")
 
-USER_AGENT = "LEO-DTE/1.0 (contact: email@example.com)"
-
 def parse_float_arg(name):
     """Return float value for query arg or None if missing/invalid."""
     v = request.args.get(name, type=str)
@@ -16,16 +14,38 @@ def parse_float_arg(name):
     except (TypeError, ValueError):
         return None
 
-def http_get(url, headers=None, timeout=10):
-    """Small helper to wrap requests.get with consistent headers and error handling."""
-    h = {"User-Agent": USER_AGENT}
-    if headers:
-        h.update(headers)
-    try:
-        r = requests.get(url, headers=h, timeout=timeout)
-        return r
-    except requests.RequestException:
-        return None
+def flood_payload(precip24, rp=None, tide=None, terrain=None):
+    if terrain:
+        # DEM indexes precomputed by utils.dem; same model as /api/flood-risk
+        from utils.risk_grid import terrain_flood_probability
+        score = float(terrain_flood_probability(precip24, float("nan"),
+                                                terrain["hand_m"], terrain["upstream_km2"]))
+    else:
+        # QPF-only thresholds outside DEM coverage
+        score = 0.0
+        if precip24 >= 25:
+            score += 0.6
+        elif precip24 >= 10:
+            score += 0.3
+
+    data = {
+        "risk_level": "high" if score > 0.7 else "medium" if score > 0.35 else "low",
+        "risk_score": round(score, 2),
+        "prediction_confidence": 0.75 if terrain else 0.6,
+        "factors": {
+            "river_level": None,
+            "soil_moisture": None,
+            "precip_24h": round(precip24, 2),
+            "height_above_drainage_m": round(terrain["hand_m"], 2) if terrain else None,
+            "upstream_area_km2": round(terrain["upstream_km2"], 2) if terrain else None,
+        },
+        "meta": {
+            "rp": rp,
+            "tide": tide,
+            "source": "api.weather.gov (QPF 24h)" + (" + DEM" if terrain else ""),
+        },
+    }
+    return {"data": data}
 
 @flood_bp.get("/flood")
 def flood_risk():
@@ -39,43 +59,19 @@ def flood_risk():
     rp = request.args.get("rp")      # return period or region param (optional)
     tide = request.args.get("tide")  # tide flag (optional)
 
-    # 2) Default scores/factors
-    precip24 = 0.0
-    soil_m = None
-    river_level = None
+    # NOAA NWS QPF via the feature store (US-only; safe-fail outside coverage)
+    from utils.dem import terrain_at
+    from utils.feature_store import get_features, FLOOD_SOURCES
+    precip24 = get_features(lat, lon, FLOOD_SOURCES).get("rain_24h") or 0.0
+    return jsonify(flood_payload(precip24, rp, tide, terrain_at(lat, lon))), 200
 
-    # 3) NOAA NWS forecast grid lookup (US-only; safe-fail outside coverage)
-    pts = http_get(f"https://api.weather.gov/points/{lat},{lon}")
-    if pts and pts.ok:
-        grid = (pts.json().get("properties") or {}).get("forecastGridData")
-        if grid:
-            gridj = http_get(grid, headers={"Accept": "application/geo+json"})
-            if gridj and gridj.ok:
-                props = gridj.json().get("properties") or {}
-                qpf = (props.get("quantitativePrecipitation", {}).get("values") or [])[:24]
-                precip24 = sum(v.get("value") or 0 for v in qpf if v.get("value") is not None)
+async def aflood_spread(lat, lon, rp=None, tide=None):
+    from utils.dem import terrain_at
+    from utils.feature_store import aget_features, FLOOD_SOURCES
+    precip24 = (await aget_features(lat, lon, FLOOD_SOURCES)).get("rain_24h") or 0.0
+    return flood_payload(precip24, rp, tide, terrain_at(lat, lon))
 
-    # 4) Simple scoring model (placeholder)
-    score = 0.0
-    if precip24 >= 25:
-        score += 0.6
-    elif precip24 >= 10:
-        score += 0.3
-
-    # 5) Compose response
-    data = {
-        "risk_level": "high" if score > 0.7 else "medium" if score > 0.35 else "low",
-        "risk_score": round(score, 2),
-        "prediction_confidence": 0.6,
-        "factors": {
-            "river_level": river_level,
-            "soil_moisture": soil_m,
-            "precip_24h": round(precip24, 2),
-        },
-        "meta": {
-            "rp": rp,
-            "tide": tide,
-            "source": "api.weather.gov (QPF 24h)",
-        },
-    }
-    return jsonify({"data": data}), 200
+def warm():
+    """Open the DEM tile set before workers fork so the mmaps are shared."""
+    from utils.dem import get_dem
+    get_dem()
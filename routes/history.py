@@ -0,0 +1,104 @@
+# backend/routes/history.py
+"""
+Time-travel over archived scores (utils.score_archive); never calls upstream.
+
+  GET /api/history?kind=wildfire&bbox=w,s,e,n&start=..&end=..
+      every score emitted in the region and window, plus an hourly series
+  GET /api/history?kind=flood&lat=..&lon=..&at=2026-10-18T14:00
+      what the system said for the point's cell: the last score per cell
+      at or before `at`, looking back lookback_h (default 1)
+
+Times are ISO UTC; the default window is the last 24 h. features=0 drops
+the per-row input features.
+"""
+import datetime as dt
+import time
+
+from flask import Blueprint, request, jsonify
+
+bp_history = Blueprint("history", __name__, url_prefix="/api")
+
+MAX_ROWS = 10000
+
+
+def _ts(s):
+    s = s.strip().rstrip("Z")
+    for fmt in ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d"):
+        try:
+            return dt.datetime.strptime(s, fmt).replace(tzinfo=dt.timezone.utc).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f"bad time {s!r}, expected YYYY-MM-DDTHH:MM[:SS]")
+
+
+def _iso(ts):
+    return dt.datetime.utcfromtimestamp(ts).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def history_args(args):
+    from utils.feature_store import CELL_DEG, cell_of
+    from utils.score_archive import KINDS
+    kind = (args.get("kind") or "wildfire").lower()
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+    if args.get("bbox"):
+        try:
+            bbox = tuple(float(v) for v in args["bbox"].split(","))
+            w, s, e, n = bbox
+        except ValueError:
+            raise ValueError("bbox must be w,s,e,n")
+        if not (w < e and s < n):
+            raise ValueError("bbox must be west < east, south < north")
+    else:
+        cy, cx = cell_of(float(args["lat"]), float(args["lon"]))
+        bbox = (cx * CELL_DEG, cy * CELL_DEG, (cx + 1) * CELL_DEG, (cy + 1) * CELL_DEG)
+    at = _ts(args["at"]) if args.get("at") else None
+    if at is not None:
+        t1 = at
+        t0 = at - float(args.get("lookback_h", 1)) * 3600.0
+    else:
+        t1 = _ts(args["end"]) if args.get("end") else time.time()
+        t0 = _ts(args["start"]) if args.get("start") else t1 - 86400.0
+    if t0 > t1:
+        raise ValueError("start must be before end")
+    limit = min(int(args.get("limit", MAX_ROWS)), MAX_ROWS)
+    return kind, bbox, t0, t1, at, limit, args.get("features", "1") != "0"
+
+
+@bp_history.route("/history", methods=["GET"])
+def history():
+    try:
+        kind, bbox, t0, t1, at, limit, with_feats = history_args(request.args)
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({"status": "error", "message": f"{e} (need bbox=w,s,e,n or lat & lon)"
+                        if isinstance(e, KeyError) else str(e)}), 400
+
+    from utils.feature_store import FEATURES
+    from utils.score_archive import hourly_series, latest_per_cell, query
+    started = time.time()
+    rows = query(kind, bbox, t0, t1)
+    idx = latest_per_cell(rows) if at is not None else range(len(rows["ts"]))
+    series = hourly_series(rows)
+    out = []
+    for i in idx:
+        if len(out) >= limit:
+            break
+        row = {"time": _iso(rows["ts"][i]), "lat": round(float(rows["lat"][i]), 5),
+               "lon": round(float(rows["lon"][i]), 5), "score": round(float(rows["score"][i]), 4)}
+        if with_feats:
+            f = rows["feats"][i]
+            row["features"] = {n: (None if f[j] != f[j] else round(float(f[j]), 3)) for j, n in enumerate(FEATURES)}
+        out.append(row)
+    return jsonify({
+        "status": "success",
+        "kind": kind,
+        "bbox": list(bbox),
+        "window": {"start": _iso(t0), "end": _iso(t1)},
+        "at": None if at is None else _iso(at),
+        "count": len(idx),
+        "truncated": len(idx) > len(out),
+        "series": [{"hour": _iso(h), "count": n, "mean": round(m, 4), "max": round(x, 4)}
+                   for h, n, m, x in series],
+        "rows": out,
+        "elapsed_s": round(time.time() - started, 3),
+    })
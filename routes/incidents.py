@@ -0,0 +1,88 @@
+# backend/routes/incidents.py
+"""
+Fire incidents: FIRMS detections clustered and tracked by utils.incidents.
+
+  GET /api/incidents?bbox=w,s,e,n[&days=1]
+      builds the box from its FIRMS response, then lists the incidents in it;
+      if the build fails the stored incidents are listed with
+      clusters_built null and an "error" message
+  GET /api/incidents?lat=..&lon=..[&radius_km=50]
+      builds the point's 1° FIRMS box, then lists incidents around the point
+  GET /api/incidents/<id>
+      one incident with its footprint, whatever its status
+
+Box lists take status= (active, merged, out or all; default active),
+limit= and footprint=1 (GeoJSON footprint per incident); point lists are
+active incidents, nearest first, each with distance_km.
+"""
+from flask import Blueprint, request, jsonify
+
+
+bp_incidents = Blueprint("incidents", __name__, url_prefix="/api/incidents")
+
+MAX_LIMIT = 5000
+
+
+def _bbox_arg(args):
+    try:
+        w, s, e, n = (float(v) for v in args["bbox"].split(","))
+    except ValueError:
+        raise ValueError("bbox must be w,s,e,n")
+    if not (-180.0 <= w < e <= 180.0 and -90.0 <= s < n <= 90.0):
+        raise ValueError("bbox must be west < east, south < north, within ±180/±90")
+    return w, s, e, n
+
+
+def _list_args(args):
+    from utils import incidents
+    try:
+        days = int(args.get("days", 1))
+        limit = min(int(args.get("limit", 500)), MAX_LIMIT)
+    except ValueError:
+        raise ValueError("days and limit must be integers")
+    if not 1 <= days <= incidents.MAX_DAYS:
+        raise ValueError(f"days must be 1..{incidents.MAX_DAYS}")
+    status = (args.get("status") or "active").lower()
+    if status not in (*incidents.STATUSES, "all"):
+        raise ValueError(f"status must be one of {', '.join(incidents.STATUSES)}, all")
+    return days, None if status == "all" else status, limit
+
+
+@bp_incidents.route("", methods=["GET"])
+def list_incidents():
+    from utils import incidents
+    args = request.args
+    try:
+        days, status, limit = _list_args(args)
+        bbox = _bbox_arg(args) if args.get("bbox") else None
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if bbox is not None:
+        out = {"status": "success", "bbox": list(bbox)}
+        try:
+            out["clusters_built"] = incidents.build(bbox, days)
+        except Exception as e:
+            # FIRMS or the build failed: still list what is stored
+            print("incident build failed:", repr(e))
+            out["clusters_built"] = None
+            out["error"] = f"incident build failed: {e.__class__.__name__}"
+        total, rows = incidents.query(bbox, status, limit, args.get("footprint") == "1")
+        return jsonify({**out, "total": total, "incidents": rows})
+    try:
+        lat = float(args.get("lat"))
+        lon = float(args.get("lon"))
+        radius_km = float(args.get("radius_km", 50.0))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "bbox=w,s,e,n or numeric lat and lon are required"}), 400
+    rows = incidents.around(lat, lon, radius_km, limit)
+    return jsonify({"status": "success", "lat": lat, "lon": lon, "radius_km": radius_km,
+                    "total": len(rows), "incidents": rows})
+
+
+@bp_incidents.route("/<int:incident_id>", methods=["GET"])
+def get_incident(incident_id):
+    from utils import incidents
+    inc = incidents.get_incident(incident_id, footprint=request.args.get("footprint", "1") == "1")
+    if inc is None:
+        return jsonify({"status": "error", "message": "unknown id"}), 404
+    return jsonify({"status": "success", "incident": inc})
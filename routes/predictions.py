@@ -1,21 +1,19 @@
 from flask import Blueprint, jsonify, request
-import os, io, csv, time, random
+import os, io, csv, time
+import asyncio
 import datetime as dt
-import requests
-import numpy as np
-from PIL import Image
 import math
 
+from utils.shared_cache import provider_ttl
+from utils.upstream import fetch, afetch
+
 # Flask blueprint (kept the same)
 pred_bp = Blueprint('predictions', __name__)
 
 # -----------------------------
 # Small math helpers
 # -----------------------------
-def _sigmoid(x): 
-    return 1.0 / (1.0 + math.exp(-x))
-
-def _clamp01(x): 
+def _clamp01(x):
     return max(0.0, min(1.0, x))
 
 def _label_from_score(s):
@@ -31,97 +29,55 @@ def _confidence_from_score(s):
 def bbox_from_point(lat: float, lon: float, deg: float = 1.0) -> str:
     return f"{lon - deg},{lat - deg},{lon + deg},{lat + deg}"
 
-# Weather.gov grid fetch
-NWS_POINTS = "https://api.weather.gov/points/{lat},{lon}"
-
-def nws_grid_forecast(lat: float, lon: float):
-    UA = os.getenv("NWS_USER_AGENT", "LEO-DigitalTwin/1.0 (contact@example.com)")
-    try:
-        p = requests.get(
-            NWS_POINTS.format(lat=lat, lon=lon),
-            timeout=15,
-            headers={"User-Agent": UA}
-        ).json()
-        grid_url = p["properties"]["forecastGridData"]
-        g = requests.get(
-            grid_url,
-            timeout=20,
-            headers={"Accept": "application/geo+json", "User-Agent": UA}
-        ).json()
-        props = g.get("properties", {})
-        precip = (props.get("quantitativePrecipitation", {}).get("values") or [])[:24]
-        rh = (props.get("relativeHumidity", {}).get("values") or [])[:24]
-        wind = (props.get("windSpeed", {}).get("values") or [])[:24]
-        temp = (props.get("temperature", {}).get("values") or [])[:24]
-        precip_mm = sum((v.get("value") or 0) for v in precip)
-        rh_vals = [v.get("value") for v in rh if v.get("value") is not None]
-        wind_vals = [v.get("value") for v in wind if v.get("value") is not None]
-        temp_vals = [v.get("value") for v in temp if v.get("value") is not None]
-        rh_avg = (sum(rh_vals) / len(rh_vals)) if rh_vals else None
-        wind_avg = (sum(wind_vals) / len(wind_vals)) if wind_vals else None
-        temp_avg = (sum(temp_vals) / len(temp_vals)) if temp_vals else None
-        return precip_mm, rh_avg, wind_avg, temp_avg, grid_url
-    except Exception:
-        return None, None, None, None, None
-
 # -----------------------------
 # Wildfire risk (FIRMS + NWS)
 # -----------------------------
 FIRMS_URL = "https://firms.modaps.eosdis.nasa.gov/api/area/csv/{MAP_KEY}/{SOURCE}/{BBOX}/{DAYS}"
 FIRMS_SOURCE = os.getenv("FIRMS_SOURCE", "VIIRS_NOAA20_NRT")
 
-@pred_bp.route('/wildfire-risk')
-def wildfire_risk():
-    lat = float(request.args.get('lat', 37.7749))
-    lon = float(request.args.get('lon', -122.4194))
-    bbox = bbox_from_point(lat, lon, deg=1.0)
-
+def _firms_url(lat, lon):
     key = os.getenv("FIRMS_KEY")
-    detections = 0
-    rows = []
-    if key:
-        url = FIRMS_URL.format(MAP_KEY=key, SOURCE=FIRMS_SOURCE, BBOX=bbox, DAYS=1)
-        try:
-            r = requests.get(url, timeout=20); r.raise_for_status()
-            rows = list(csv.DictReader(io.StringIO(r.text)))
-            detections = max(0, len(rows))
-        except Exception:
-            detections = 0
+    if not key:
+        return None
+    # 0.1° snapped centre: the 1° box still covers the 50 km scoring radius and
+    # nearby points share one cached FIRMS response
+    bbox = bbox_from_point(round(lat, 1), round(lon, 1), deg=1.0)
+    return FIRMS_URL.format(MAP_KEY=key, SOURCE=FIRMS_SOURCE, BBOX=bbox, DAYS=1)
+
+def load_firms_rows(lat, lon):
+    """FIRMS detections in the 1° box around the point, or None without a key; raises on provider errors."""
+    url = _firms_url(lat, lon)
+    if not url:
+        return None
+    return list(csv.DictReader(io.StringIO(fetch("firms", url, timeout=20, parse="text"))))
+
+async def aload_firms_rows(lat, lon):
+    url = _firms_url(lat, lon)
+    if not url:
+        return None
+    return list(csv.DictReader(io.StringIO(await afetch("firms", url, timeout=20, parse="text"))))
+
+def firms_rows(lat, lon):
+    """load_firms_rows() with provider errors read as no detections."""
+    try:
+        return load_firms_rows(lat, lon)
+    except Exception:
+        return []
 
-    precip_mm, rh_avg, wind_avg, temp_avg, grid_url = nws_grid_forecast(lat, lon)
+def wildfire_payload(lat, lon, feats, archive=True):
+    precip_mm, rh_avg, wind_avg, temp_avg, grid_url = feats.nws_summary()
+    detections = int(feats.get("detections_24h") or 0)
 
-    # Distance-weighted FIRMS risk proxy (coarse)
-    risk_raw = 0.0
-    if key and detections:
-        try:
-            def km(dd): return dd * 111.0
-            for row in rows[:1000]:
-                try:
-                    fy = float(row["latitude"]); fx = float(row["longitude"])
-                except Exception:
-                    continue
-                dist_km = km(((fy - lat)**2 + (fx - lon)**2)**0.5)
-                if dist_km < 50.0:
-                    conf_raw = row.get("confidence", "50")
-                    try:
-                        conf = float(conf_raw)
-                    except Exception:
-                        conf_map = {"low":30, "nominal":60, "high":90}
-                        conf = conf_map.get(str(conf_raw).strip().lower(), 50)
-                    try:
-                        frp = float(row.get("frp", 1.0))
-                    except Exception:
-                        frp = 1.0
-                    risk_raw += (conf/100.0)*(frp/10.0)*max(0.0, (1.0 - dist_km/50.0))
-        except Exception:
-            pass
-
-    # Fuse with NWS dryness/wind
-    score = _clamp01(risk_raw)
-    if rh_avg is not None and rh_avg < 25: score = min(1.0, score + 0.25)
-    if wind_avg is not None and wind_avg > 30: score = min(1.0, score + 0.2)
+    # Distance-weighted FIRMS risk proxy (coarse, from the feature store), fused
+    # with NWS dryness/wind; same scoring as the /api/tiles rasterizer
+    from utils.risk_grid import wildfire_score, nan_if_none
+    risk_raw = feats.get("firms_risk") or 0.0
+    score = float(wildfire_score(risk_raw, nan_if_none(rh_avg), nan_if_none(wind_avg)))
     level = "high" if score >= 0.7 else "medium" if score >= 0.4 else "low"
     confidence = 0.5 + 0.15*min(detections, 3)
+    if archive:
+        from utils.score_archive import record
+        record("wildfire", lat, lon, round(score, 2), feats)
     factors = {
         "temperature": None if temp_avg is None else round(temp_avg,1),
         "humidity": None if rh_avg is None else round(rh_avg,1),
@@ -130,7 +86,7 @@ def wildfire_risk():
         "detections_24h": detections
     }
 
-    return jsonify({
+    return {
         "status":"success",
         "data":{
             "coordinates":[lat, lon],
@@ -141,58 +97,82 @@ def wildfire_risk():
             "source": f"FIRMS {FIRMS_SOURCE} + NWS"
         },
         "timestamp": dt.datetime.utcnow().isoformat()
-    })
+    }
+
+@pred_bp.route('/wildfire-risk')
+def wildfire_risk():
+    lat = float(request.args.get('lat', 37.7749))
+    lon = float(request.args.get('lon', -122.4194))
+    from utils.feature_store import get_features, WILDFIRE_SOURCES
+    return jsonify(wildfire_payload(lat, lon, get_features(lat, lon, WILDFIRE_SOURCES)))
+
+async def awildfire_risk(lat, lon):
+    from utils.feature_store import aget_features, WILDFIRE_SOURCES
+    return wildfire_payload(lat, lon, await aget_features(lat, lon, WILDFIRE_SOURCES))
 
 # -----------------------------
 # Flood risk (Weather.gov)
 # -----------------------------
-@pred_bp.route('/flood-risk')
-def flood_risk():
-    lat = float(request.args.get('lat', 29.7604))
-    lon = float(request.args.get('lon', -95.3698))
-
-    precip_mm, rh_avg, wind_avg, temp_avg, grid_url = nws_grid_forecast(lat, lon)
-    if precip_mm is None:
-        precipitation = random.uniform(0, 100)
-        soil_moisture = random.uniform(0.2, 0.9)
-        elevation_risk = random.uniform(0.1, 0.8)
-        prob = min((precipitation/100 + soil_moisture + elevation_risk) / 3, 1.0)
-        level = 'high' if prob > 0.7 else 'medium' if prob > 0.4 else 'low'
-        return jsonify({
-            'status': 'success',
-            'data': {
-                'coordinates': [lat, lon],
-                'flood_probability': round(prob, 2),
-                'risk_level': level,
-                'factors': {
-                    'precipitation_24h': round(precipitation, 1),
-                    'soil_moisture': round(soil_moisture, 2),
-                    'river_level': '--'
-                },
-                'early_warning': prob > 0.6,
-                'source': 'NWS (fallback)'
-            },
-            'timestamp': dt.datetime.utcnow().isoformat()
-        })
-
-    prob = min(1.0, (precip_mm/50.0)*0.6 + ((rh_avg or 50)/100.0)*0.4)
-    level = 'high' if prob > 0.7 else 'medium' if prob > 0.4 else 'low'
-    return jsonify({
+def flood_payload(lat, lon, nws, windows=None, terrain=None, soil_moisture=None):
+    """Flood risk from the NWS QPF window, scaled by DEM terrain indexes where available."""
+    precip_mm, rh_avg, wind_avg, temp_avg, grid_url = nws
+    if terrain is None:
+        from utils.dem import terrain_at
+        terrain = terrain_at(lat, lon)
+
+    from utils.risk_grid import terrain_flood_probability, flood_probability, nan_if_none
+    if terrain:
+        prob = float(terrain_flood_probability(nan_if_none(precip_mm), nan_if_none(rh_avg),
+                                               terrain['hand_m'], terrain['upstream_km2']))
+    elif precip_mm is not None:
+        prob = float(flood_probability(precip_mm, nan_if_none(rh_avg)))
+    else:
+        prob = None
+    level = 'unknown' if prob is None else 'high' if prob > 0.7 else 'medium' if prob > 0.4 else 'low'
+    sources = [s for s in (grid_url or ('NWS forecastGridData' if precip_mm is not None else None),
+                           'DEM' if terrain else None) if s]
+    return {
         'status': 'success',
         'data': {
             'coordinates': [lat, lon],
-            'flood_probability': round(prob, 2),
+            'flood_probability': None if prob is None else round(prob, 2),
             'risk_level': level,
             'factors': {
-                'precipitation_24h': round(precip_mm, 1),
-                'soil_moisture': None if rh_avg is None else round(rh_avg/100.0, 2),
+                'precipitation_24h': None if precip_mm is None else round(precip_mm, 1),
+                **(windows or {}),
+                'soil_moisture': (round(soil_moisture/100.0, 2) if soil_moisture is not None
+                                  else None if rh_avg is None else round(rh_avg/100.0, 2)),
+                'elevation_m': None if not terrain else round(terrain['elevation_m'], 1),
+                'height_above_drainage_m': None if not terrain else round(terrain['hand_m'], 2),
+                'upstream_area_km2': None if not terrain else round(terrain['upstream_km2'], 2),
                 'river_level': '--'
             },
-            'early_warning': prob > 0.6,
-            'source': grid_url or 'NWS forecastGridData'
+            'early_warning': prob is not None and prob > 0.6,
+            'source': ' + '.join(sources) or 'unavailable'
         },
         'timestamp': dt.datetime.utcnow().isoformat()
-    })
+    }
+
+def flood_from_features(lat, lon, feats, archive=True):
+    # soil_moisture is not a flood source; it is used when the cell already has it (AI reads)
+    windows = {f"precipitation_{h}h": None if feats.get(f"rain_{h}h") is None else round(feats.get(f"rain_{h}h"), 1)
+               for h in (6, 72)}
+    payload = flood_payload(lat, lon, feats.nws_summary(), windows, soil_moisture=feats.get("soil_moisture"))
+    if archive:
+        from utils.score_archive import record
+        record("flood", lat, lon, payload["data"]["flood_probability"], feats)
+    return payload
+
+@pred_bp.route('/flood-risk')
+def flood_risk():
+    from utils.feature_store import get_features, FLOOD_SOURCES
+    lat = float(request.args.get('lat', 29.7604))
+    lon = float(request.args.get('lon', -95.3698))
+    return jsonify(flood_from_features(lat, lon, get_features(lat, lon, FLOOD_SOURCES)))
+
+async def aflood_risk(lat, lon):
+    from utils.feature_store import aget_features, FLOOD_SOURCES
+    return flood_from_features(lat, lon, await aget_features(lat, lon, FLOOD_SOURCES))
 
 # -----------------------------
 # Crop health (Sentinel-2 NDVI via CDSE, PNG UINT8)
@@ -202,23 +182,33 @@ PROCESS_URL = "https://sh.dataspace.copernicus.eu/api/v1/process"
 _cdse_token = None
 _cdse_exp = 0.0
 
-def get_cdse_token_inline():
-    global _cdse_token, _cdse_exp
-    if _cdse_token and time.time() < _cdse_exp:
-        return _cdse_token
+def _cdse_credentials():
     cid = os.getenv("CDSE_CLIENT_ID"); csec = os.getenv("CDSE_CLIENT_SECRET")
     if not cid or not csec: return None
-    r = requests.post(CDSE_TOKEN_URL, data={
-        "grant_type":"client_credentials","client_id":cid,"client_secret":csec
-    }, timeout=20)
-    r.raise_for_status()
-    j = r.json()
+    return {"grant_type":"client_credentials","client_id":cid,"client_secret":csec}
+
+def _store_cdse_token(j):
+    global _cdse_token, _cdse_exp
     _cdse_token = j["access_token"]
     _cdse_exp = time.time() + j.get("expires_in",3600) - 60
     return _cdse_token
 
-def ndvi_from_sentinel_inline(bbox, t_from_iso, t_to_iso, token):
-    payload = {
+def get_cdse_token_inline():
+    if _cdse_token and time.time() < _cdse_exp:
+        return _cdse_token
+    creds = _cdse_credentials()
+    if not creds: return None
+    return _store_cdse_token(fetch("cdse", CDSE_TOKEN_URL, method="POST", data=creds, timeout=20))
+
+async def aget_cdse_token():
+    if _cdse_token and time.time() < _cdse_exp:
+        return _cdse_token
+    creds = _cdse_credentials()
+    if not creds: return None
+    return _store_cdse_token(await afetch("cdse", CDSE_TOKEN_URL, method="POST", data=creds, timeout=20))
+
+def _ndvi_payload(bbox, t_from_iso, t_to_iso):
+    return {
       "input": {
         "bounds": {"bbox": bbox, "properties": {"crs": "http://www.opengis.net/def/crs/EPSG/0/4326"}},
         "data": [{"type":"sentinel-2-l2a",
@@ -240,44 +230,45 @@ function evaluatePixel(s) {
 }
 """
     }
-    r = requests.post(PROCESS_URL, json=payload,
-                      headers={"Authorization": f"Bearer {token}"}, timeout=45)
-    if not r.ok:
-        print("DEBUG process error:", r.status_code, r.text[:250])
-        r.raise_for_status()
-    img = Image.open(io.BytesIO(r.content)).convert("L")
+
+def _ndvi_from_png(content):
+    import numpy as np          # heavy imports deferred to first NDVI request
+    from PIL import Image
+    img = Image.open(io.BytesIO(content)).convert("L")
     arr = np.array(img, dtype=np.uint8)
     ndvi_arr = (arr.astype(np.float32) / 127.5) - 1.0
     ndvi_arr = ndvi_arr[np.isfinite(ndvi_arr)]
     return float(np.clip(np.nanmean(ndvi_arr), -1, 1)) if ndvi_arr.size else None
 
-@pred_bp.route('/crop-health')
-def crop_health():
-    lat = float(request.args.get('lat', 41.8781))
-    lon = float(request.args.get('lon', -87.6298))
-    deg = float(request.args.get('deg', 0.02))
+def ndvi_from_sentinel_inline(bbox, t_from_iso, t_to_iso, token):
+    content = fetch("cdse", PROCESS_URL, method="POST", json=_ndvi_payload(bbox, t_from_iso, t_to_iso),
+                    headers={"Authorization": f"Bearer {token}"}, timeout=45, parse="bytes",
+                    ttl=provider_ttl("cdse"))
+    return _ndvi_from_png(content)
+
+async def andvi_from_sentinel(bbox, t_from_iso, t_to_iso, token):
+    content = await afetch("cdse", PROCESS_URL, method="POST", json=_ndvi_payload(bbox, t_from_iso, t_to_iso),
+                           headers={"Authorization": f"Bearer {token}"}, timeout=45, parse="bytes",
+                           ttl=provider_ttl("cdse"))
+    return _ndvi_from_png(content)
+
+def crop_window(lat, lon, deg):
     bbox = [lon - deg, lat - deg, lon + deg, lat + deg]
-
-    t_to = dt.datetime.utcnow()
+    # whole-day window so the process request (and its cache key) is stable all day
+    t_to = dt.datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + dt.timedelta(days=1)
     t_from = t_to - dt.timedelta(days=30)
-    t_to_iso = t_to.strftime("%Y-%m-%dT%H:%M:%SZ")
-    t_from_iso = t_from.strftime("%Y-%m-%dT%H:%M:%SZ")
-
-    ndvi = None
-    token = get_cdse_token_inline()
-    if token:
-        try:
-            ndvi = ndvi_from_sentinel_inline(bbox, t_from_iso, t_to_iso, token)
-        except Exception as e:
-            print("NDVI request error:", repr(e)); ndvi = None
+    return bbox, t_from.strftime("%Y-%m-%dT%H:%M:%SZ"), t_to.strftime("%Y-%m-%dT%H:%M:%SZ")
 
+def crop_payload(lat, lon, ndvi, feats=None, bbox=None):
+    from utils.score_archive import record
+    record("crop", lat, lon, None if ndvi is None else round(ndvi, 3), feats)
     if ndvi is None:
         ndvi = 0.45; status = "good"; source = "Sentinel-2 (fallback)"
     else:
         status = "excellent" if ndvi > 0.7 else "good" if ndvi > 0.5 else "poor"
         source = "Sentinel-2 L2A NDVI (CDSE)"
 
-    return jsonify({
+    return {
         'status': 'success',
         'data': {
             'coordinates': [lat, lon],
@@ -286,14 +277,198 @@ def crop_health():
             'growth_stage': 'vegetative' if ndvi > 0.6 else ('seedling' if ndvi < 0.4 else 'flowering'),
             'yield_prediction': round((0.6 + max(ndvi, 0)) * 100, 1),
             'irrigation_needed': ndvi < 0.5,
+            'ndvi_bbox': bbox,
             'source': source
         },
         'timestamp': dt.datetime.utcnow().isoformat()
-    })
+    }
+
+def cell_bbox(feats):
+    from utils.feature_store import CELL_DEG
+    cy, cx = feats.cell
+    return [round(v, 6) for v in (cx * CELL_DEG, cy * CELL_DEG, (cx + 1) * CELL_DEG, (cy + 1) * CELL_DEG)]
+
+@pred_bp.route('/crop-health')
+def crop_health():
+    """
+    Without deg, NDVI of the feature-store cell holding the point (the whole
+    0.05 deg cell, shared with the AI model); with deg, a CDSE request for
+    the box of that half-width around the point. data.ndvi_bbox says which.
+    """
+    lat = float(request.args.get('lat', 41.8781))
+    lon = float(request.args.get('lon', -87.6298))
+    if request.args.get('deg') is None:
+        from utils.feature_store import get_features, CROP_SOURCES
+        feats = get_features(lat, lon, CROP_SOURCES)
+        return jsonify(crop_payload(lat, lon, feats.get("ndvi"), feats, cell_bbox(feats)))
+    deg = float(request.args['deg'])
+    bbox, t_from_iso, t_to_iso = crop_window(lat, lon, deg)
+
+    ndvi = None
+    try:
+        token = get_cdse_token_inline()
+        if token:
+            ndvi = ndvi_from_sentinel_inline(bbox, t_from_iso, t_to_iso, token)
+    except Exception as e:
+        print("NDVI request error:", repr(e)); ndvi = None
+    return jsonify(crop_payload(lat, lon, ndvi, bbox=bbox))
+
+async def acrop_health(lat, lon, deg=None):
+    if deg is None:
+        from utils.feature_store import aget_features, CROP_SOURCES
+        feats = await aget_features(lat, lon, CROP_SOURCES)
+        return crop_payload(lat, lon, feats.get("ndvi"), feats, cell_bbox(feats))
+    bbox, t_from_iso, t_to_iso = crop_window(lat, lon, deg)
+    ndvi = None
+    try:
+        token = await aget_cdse_token()
+        if token:
+            ndvi = await andvi_from_sentinel(bbox, t_from_iso, t_to_iso, token)
+    except Exception as e:
+        print("NDVI request error:", repr(e)); ndvi = None
+    return crop_payload(lat, lon, ndvi, bbox=bbox)
+
+# -----------------------------
+# Crop health time series (one multi-date CDSE request)
+# -----------------------------
+# Last year's composites don't change once acquired; keep the baseline for 30 days
+NDVI_BASELINE_TTL_S = int(os.getenv("LEO_NDVI_BASELINE_TTL_S", str(30 * 86400)))
+
+def _stack_request(bbox, bins, token, ttl):
+    from utils.ndvi_stack import stack_payload
+    return {"method": "POST", "json": stack_payload(bbox, bins), "timeout": 90, "parse": "bytes",
+            "headers": {"Authorization": f"Bearer {token}", "Accept": "application/tar"}, "ttl": ttl}
+
+def series_args(args):
+    lat = float(args.get('lat', 41.8781))
+    lon = float(args.get('lon', -87.6298))
+    deg = float(args.get('deg', 0.02))
+    days = int(args.get('days', 90))
+    step = int(args.get('step', 15))
+    if not (5 <= step <= days <= 365):
+        raise ValueError("need 5 <= step <= days <= 365")
+    from utils.ndvi_stack import MAX_BINS
+    if math.ceil(days / step) > MAX_BINS:
+        raise ValueError(f"days/step gives {math.ceil(days / step)} bins, at most {MAX_BINS}; "
+                         f"use step >= {math.ceil(days / MAX_BINS)}")
+    return lat, lon, deg, days, step
+
+def ndvi_series_inline(bbox, bins, token):
+    """(current, baseline) NDVI stacks; the baseline is the same bins a year earlier, or None."""
+    from utils.ndvi_stack import decode_stack, shift_bins
+    cur = decode_stack(fetch("cdse", PROCESS_URL, **_stack_request(bbox, bins, token, provider_ttl("cdse"))), len(bins))
+    try:
+        base = decode_stack(fetch("cdse", PROCESS_URL, **_stack_request(
+            bbox, shift_bins(bins, -365), token, NDVI_BASELINE_TTL_S)), len(bins))
+    except Exception:
+        base = None
+    return cur, base
+
+async def andvi_series(bbox, bins, token):
+    from utils.ndvi_stack import decode_stack, shift_bins
+    cur, base = await asyncio.gather(
+        afetch("cdse", PROCESS_URL, **_stack_request(bbox, bins, token, provider_ttl("cdse"))),
+        afetch("cdse", PROCESS_URL, **_stack_request(bbox, shift_bins(bins, -365), token, NDVI_BASELINE_TTL_S)),
+        return_exceptions=True)
+    if isinstance(cur, Exception):
+        raise cur
+    return decode_stack(cur, len(bins)), None if isinstance(base, Exception) else decode_stack(base, len(bins))
+
+def crop_series_payload(lat, lon, bbox, bins, stacks):
+    from utils.ndvi_stack import series_summary
+    cur, base = stacks
+    return {
+        'status': 'success',
+        'data': {
+            'coordinates': [lat, lon],
+            'bbox': bbox,
+            **series_summary(bins, cur, base),
+            'baseline': 'same bins, previous year' if base is not None else None,
+            'source': 'Sentinel-2 L2A NDVI max-value composites (CDSE)'
+        },
+        'timestamp': dt.datetime.utcnow().isoformat()
+    }
+
+@pred_bp.route('/crop-health/series')
+def crop_health_series():
+    from utils.ndvi_stack import time_bins
+    try:
+        lat, lon, deg, days, step = series_args(request.args)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    bbox = [lon - deg, lat - deg, lon + deg, lat + deg]
+    bins = time_bins(days, step)
+    try:
+        token = get_cdse_token_inline()
+        if not token:
+            return jsonify({"status": "error", "message": "CDSE credentials not configured"}), 503
+        stacks = ndvi_series_inline(bbox, bins, token)
+    except Exception as e:
+        return jsonify({"status": "error", "message": f"NDVI stack request failed: {e!r}"}), 502
+    return jsonify(crop_series_payload(lat, lon, bbox, bins, stacks))
+
+async def acrop_health_series(lat, lon, deg=0.02, days=90, step=15):
+    from utils.ndvi_stack import time_bins
+    bbox = [lon - deg, lat - deg, lon + deg, lat + deg]
+    bins = time_bins(days, step)
+    try:
+        token = await aget_cdse_token()
+        if not token:
+            return {"status": "error", "message": "CDSE credentials not configured"}, 503
+        stacks = await andvi_series(bbox, bins, token)
+    except Exception as e:
+        return {"status": "error", "message": f"NDVI stack request failed: {e!r}"}, 502
+    return crop_series_payload(lat, lon, bbox, bins, stacks)
 
 # -----------------------------
 # NEW: Lightweight AI prediction for modal
 # -----------------------------
+def ai_features(feats):
+    """
+    Model inputs from the feature store (AI_SOURCES, plus the cell's NDVI
+    once a crop read computed it); anything unavailable takes the artifact
+    default.
+    """
+    if feats is None:
+        return {}
+    return {n: feats.get(n) for n in ("temperature", "humidity", "wind", "rain_24h",
+                                      "soil_moisture", "ndvi", "vpd")}
+
+def _head_for(model, mode):
+    # unknown modes have always been scored with the crop formula
+    return mode if mode in model.heads else "crop"
+
+def _ai_result(model, scored, head, i, X):
+    score, logit, contrib = scored[head]
+    terms = model.heads[head]["terms"]
+    s = float(score[i])
+    return {
+        "score": s,
+        "label": _label_from_score(s),
+        "confidence": _confidence_from_score(s),
+        "factors": [{"name": n, "value": model.format_value(n, X[i, model.index[n]]),
+                     "weight": float(contrib[i, model.index[n]])} for n in terms],
+    }
+
+def ai_payload(lat, lon, mode, feats):
+    from utils.model_runtime import get_model
+    model = get_model()
+    head = _head_for(model, mode)
+    X = model.matrix([ai_features(feats)])
+    result = _ai_result(model, model.score(X, [head]), head, 0, X)
+    from utils.score_archive import record
+    record(f"ai_{head}", lat, lon, result["score"], feats)
+    return {
+        "mode": mode,
+        "lat": lat,
+        "lon": lon,
+        **result,
+        "rationale": model.heads[head]["rationale"],
+        "model": model.version,
+        "source": feats.meta.get("grid_url") or "heuristic+NWS",
+        "timestamp": dt.datetime.utcnow().isoformat()
+    }
+
 @pred_bp.route('/ai/predict')
 def ai_predict():
     # Inputs
@@ -301,61 +476,105 @@ def ai_predict():
     lon = float(request.args.get("lon", -74.0060))
     mode = (request.args.get("mode", "wildfire") or "wildfire").lower()
 
-    # Pull quick features from NWS if available
-    precip_mm, rh_avg, wind_avg, temp_avg, grid_url = nws_grid_forecast(lat, lon)
-
-    # Fallbacks if NWS not available
-    temperature_c = temp_avg if temp_avg is not None else 17.0
-    humidity_pct = rh_avg if rh_avg is not None else 55.0
-    wind_kmh = wind_avg if wind_avg is not None else 10.0
-    soil_moisture_pct = 60.0  # simple proxy
-    rain_24h_mm = precip_mm if precip_mm is not None else 4.0
-    river_level_kmh = wind_kmh  # placeholder to satisfy UI label
-    ndvi = 0.42
-    vpd = 0.9
-
-    # Heuristic logits
-    if mode == "wildfire":
-        z = 0.03*temperature_c - 0.02*humidity_pct + 0.04*(wind_kmh/10.0) - 0.03*(soil_moisture_pct/10.0) + 0.10
-        rationale = "Higher wind and lower humidity increase wildfire likelihood; wetter soils reduce it."
-        factors = [
-            {"name":"temperature", "value": f"{temperature_c:.1f}°C", "weight": 0.03*temperature_c},
-            {"name":"humidity", "value": f"{humidity_pct:.1f}%", "weight": -0.02*humidity_pct},
-            {"name":"wind", "value": f"{wind_kmh:.0f} km/h", "weight": 0.04*(wind_kmh/10.0)},
-            {"name":"soil_moisture", "value": f"{soil_moisture_pct:.1f}%", "weight": -0.03*(soil_moisture_pct/10.0)},
-        ]
-    elif mode == "flood":
-        z = 0.05*(rain_24h_mm/10.0) + 0.04*(river_level_kmh/10.0) + 0.03*(soil_moisture_pct/10.0) - 0.02*(wind_kmh/10.0) + 0.05
-        rationale = "More rain, higher river level, and wetter soils increase flood risk."
-        factors = [
-            {"name":"rain_24h", "value": f"{rain_24h_mm:.1f} mm", "weight": 0.05*(rain_24h_mm/10.0)},
-            {"name":"river_level", "value": f"{river_level_kmh:.0f} km/h", "weight": 0.04*(river_level_kmh/10.0)},
-            {"name":"soil_moisture", "value": f"{soil_moisture_pct:.1f}%", "weight": 0.03*(soil_moisture_pct/10.0)},
-            {"name":"wind", "value": f"{wind_kmh:.0f} km/h", "weight": -0.02*(wind_kmh/10.0)},
-        ]
-    else:  # crop
-        z = 0.04*(soil_moisture_pct/10.0) + 0.03*ndvi - 0.03*vpd - 0.02*(wind_kmh/10.0)
-        rationale = "Better moisture and vegetation health raise yield; high VPD and wind reduce it."
-        factors = [
-            {"name":"soil_moisture", "value": f"{soil_moisture_pct:.1f}%", "weight": 0.04*(soil_moisture_pct/10.0)},
-            {"name":"ndvi", "value": f"{ndvi:.2f}", "weight": 0.03*ndvi},
-            {"name":"vpd", "value": f"{vpd:.2f}", "weight": -0.03*vpd},
-            {"name":"wind", "value": f"{wind_kmh:.0f} km/h", "weight": -0.02*(wind_kmh/10.0)},
-        ]
-
-    score = _clamp01(_sigmoid(z))
-    label = _label_from_score(score)
-    confidence = _confidence_from_score(score)
-
-    return jsonify({
-        "mode": mode,
-        "lat": lat,
-        "lon": lon,
-        "score": score,
-        "label": label,
-        "confidence": confidence,
-        "rationale": rationale,
-        "factors": factors,
-        "source": grid_url or "heuristic+NWS",
+    from utils.feature_store import get_features, AI_SOURCES
+    return jsonify(ai_payload(lat, lon, mode, get_features(lat, lon, AI_SOURCES)))
+
+async def aai_predict(lat, lon, mode="wildfire"):
+    from utils.feature_store import aget_features, AI_SOURCES
+    return ai_payload(lat, lon, (mode or "wildfire").lower(), await aget_features(lat, lon, AI_SOURCES))
+
+MAX_BATCH_POINTS = int(os.getenv("LEO_AI_BATCH_MAX_POINTS", "500"))
+
+def ai_batch_payload(points, modes, feature_rows, feats=None):
+    """Score every point for every mode in one vectorized call per head."""
+    from utils.model_runtime import get_model
+    model = get_model()
+    heads = {m: _head_for(model, m) for m in modes}
+    X = model.matrix(feature_rows)
+    scored = model.score(X, sorted(set(heads.values())))
+    results = []
+    for i, p in enumerate(points):
+        results.append({
+            "lat": p["lat"], "lon": p["lon"],
+            "predictions": {m: _ai_result(model, scored, h, i, X) for m, h in heads.items()},
+        })
+    from utils.score_archive import record_many
+    record_many((f"ai_{h}", p["lat"], p["lon"], float(scored[h][0][i]), feats[i] if feats else None)
+                for h in set(heads.values()) for i, p in enumerate(points))
+    return {
+        "status": "success",
+        "model": model.version,
+        "rationale": {m: model.heads[h]["rationale"] for m, h in heads.items()},
+        "results": results,
         "timestamp": dt.datetime.utcnow().isoformat()
-    })
+    }
+
+def _batch_point_features(i, raw):
+    """A point's "features" as {name: float|None}; anything non-numeric is a ValueError."""
+    if raw is None:
+        return {}
+    if not isinstance(raw, dict):
+        raise ValueError(f"points[{i}].features must be an object")
+    out = {}
+    for name, v in raw.items():
+        if v is None:
+            out[name] = None
+            continue
+        try:
+            if isinstance(v, bool):
+                raise TypeError
+            out[name] = float(v)
+        except (TypeError, ValueError):
+            raise ValueError(f"points[{i}].features.{name} must be a number or null")
+        if not math.isfinite(out[name]):
+            raise ValueError(f"points[{i}].features.{name} must be finite")
+    return out
+
+def parse_batch(body):
+    """(points, modes, fetch_nws) from a batch request body."""
+    if not isinstance(body, dict) or not isinstance(body.get("points"), list):
+        raise ValueError("body must be {\"points\": [{\"lat\", \"lon\", \"features\"?}], \"modes\"?: [...]}")
+    if not 1 <= len(body["points"]) <= MAX_BATCH_POINTS:
+        raise ValueError(f"send 1..{MAX_BATCH_POINTS} points")
+    points = []
+    for i, p in enumerate(body["points"]):
+        if not isinstance(p, dict):
+            raise ValueError(f"points[{i}] must be an object")
+        points.append({"lat": float(p["lat"]), "lon": float(p["lon"]),
+                       "features": _batch_point_features(i, p.get("features"))})
+    modes = [str(m).lower() for m in (body.get("modes") or ["wildfire", "flood", "crop"])]
+    return points, modes, bool(body.get("fetch", True))
+
+@pred_bp.route('/ai/predict/batch', methods=['POST'])
+def ai_predict_batch():
+    """
+    Many points, all modes, one call. Each point may carry its own
+    "features"; unless "fetch": false, the feature store fills in the rest.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    import contextvars
+    from utils.feature_store import get_features, AI_SOURCES
+    from utils.ratelimit import BATCH, priority
+
+    def batch_features(p):
+        with priority(BATCH):
+            return get_features(p["lat"], p["lon"], AI_SOURCES)
+
+    try:
+        points, modes, fetch_nws = parse_batch(request.get_json(force=True, silent=True))
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if fetch_nws:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            # each point runs in a copy of the request context (deadline, shared fetches)
+            futures = [pool.submit(contextvars.copy_context().run, batch_features, p) for p in points]
+            feats = [f.result() for f in futures]
+    else:
+        feats = [None] * len(points)
+    rows = [{**ai_features(f), **p["features"]} for f, p in zip(feats, points)]
+    return jsonify(ai_batch_payload(points, modes, rows, feats))
+
+def warm():
+    """Load the model artifact before workers fork."""
+    from utils.model_runtime import get_model
+    get_model()
@@ -1,5 +1,5 @@
 from flask import Blueprint, jsonify, request
-import random, datetime
+import datetime
 
 satellite_bp = Blueprint('satellite', __name__)
 
@@ -10,19 +10,28 @@ def satellite_status():
     return jsonify({'status': 'success', 'constellation_health': 'optimal', 'operational': len(sats), 'satellites': sats})
 
 
-@satellite_bp.route('/cost-savings')
+@satellite_bp.route('/cost-savings', methods=['GET', 'POST'])
 def cost_savings():
-    scenarios = {
-        'wildfire_prevention': {'without': 50_000_000, 'with': 5_000_000, 'success': 0.85, 'annual': 100},
-        'flood_prevention': {'without': 25_000_000, 'with': 2_500_000, 'success': 0.75, 'annual': 150},
-    }
-    total = 0; details = {}
-    for k,v in scenarios.items():
-        per = (v['without'] - v['with']) * v['success']
-        ann = per * v['annual']; total += ann
-        details[k] = {'savings_per_incident': per, 'annual_savings': ann, 'success_rate': v['success']}
-    return jsonify({'status':'success','total_annual_savings': total,
+    """
+    Expected-value savings plus Monte Carlo bands (utils.cost_model).
+    GET uses the default scenarios; POST a JSON body to override any of
+    scenarios / system_cost / discount_rate / years. ?draws= & ?seed= on both.
+    """
+    from utils.cost_model import DEFAULT_DRAWS, MAX_DRAWS, cached_run, merge_params, point_estimate
+    body = request.get_json(force=True, silent=True) if request.method == 'POST' else None
+    body = dict(body or {})
+    try:
+        draws = int(body.pop('draws', request.args.get('draws', DEFAULT_DRAWS)))
+        seed = int(body.pop('seed', request.args.get('seed', 0)))
+        if not (1000 <= draws <= MAX_DRAWS):
+            raise ValueError(f"draws must be 1000..{MAX_DRAWS}")
+        params = merge_params(body)
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    total, details, roi = point_estimate(params)
+    sim, cached = cached_run(params, draws, seed)
+    sim['cached'] = cached
+    return jsonify({'status': 'success', 'total_annual_savings': total,
                     'details': details,
-                    'roi_projection': {'system_cost': 100_000_000,
-                                       'payback_period_months': round((100_000_000/total)*12,1),
-                                       '5_year_net_benefit': total*5 - 100_000_000}})
+                    'roi_projection': roi,
+                    'simulation': sim})
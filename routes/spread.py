@@ -1,9 +1,11 @@
 # backend/routes/spread.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 import math
 
 bp_spread = Blueprint('spread', __name__, url_prefix='/api/spread')
 
+MAX_ASSETS_LISTED = 200   # impacted assets returned per response; counts cover all of them
+
 def sector_polygon(lat, lon, radius_km, bearing_deg, width_deg=60, steps=24):
     # Great-circle sector approximated in lat/lon; small-radius assumption
     R = 6371.0
@@ -31,11 +33,55 @@ def sector_polygon(lat, lon, radius_km, bearing_deg, width_deg=60, steps=24):
 
 def clamp(x, lo, hi): return max(lo, min(hi, x))
 
+def spread_origin(args):
+    """
+    (lat, lon, start radius km, incident) to grow a spread from. incident=<id>
+    starts at a tracked FIRMS incident (utils.incidents): its centroid, with
+    the radius of a circle as large as its footprint. Otherwise lat/lon with
+    radius 0. Raises KeyError for an unknown incident, ValueError/TypeError
+    for bad coordinates.
+    """
+    if args.get("incident"):
+        from utils.incidents import get_incident
+        inc = get_incident(int(args["incident"]), footprint=False)
+        if inc is None:
+            raise KeyError(args["incident"])
+        return inc["lat"], inc["lon"], inc["radius_km"], inc
+    return float(args.get("lat")), float(args.get("lon")), 0.0, None
+
+def near_km_arg(args):
+    """near_km= (km beyond the perimeter that still counts an asset as exposed); raises ValueError."""
+    near_km = float(args.get("near_km", 0.0))
+    if not 0.0 <= near_km <= 1000.0:
+        raise ValueError("near_km must be 0..1000")
+    return near_km
+
+def geojson_response(fc):
+    """
+    Send a FeatureCollection through the LOD output stage (z/tol/q/fmt query
+    args, see utils.geometry). Without any of those args the response is
+    the plain GeoJSON it always was.
+    """
+    if not any(k in request.args for k in ("z", "tol", "q", "fmt")):
+        return jsonify(fc)
+    from utils.geometry import lod_options, encode_collection
+    try:
+        tol, digits, fmt = lod_options(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    body, mimetype = encode_collection(fc, tol, digits, fmt)
+    return Response(body, mimetype=mimetype)
+
 @bp_spread.route("/wildfire", methods=["GET"])
 def wildfire():
     from math import cos, radians
-    lat = float(request.args.get("lat"))
-    lon = float(request.args.get("lon"))
+    try:
+        lat, lon, r0_km, incident = spread_origin(request.args)
+        near_km = near_km_arg(request.args)
+    except KeyError:
+        return jsonify({"error": "unknown incident"}), 404
+    except (TypeError, ValueError):
+        return jsonify({"error": "invalid lat/lon/incident/near_km"}), 400
 
     # What‑if params from UI
     h = (request.args.get("h") or "3h").lower()       # '1h','3h','6h','12h'
@@ -50,7 +96,7 @@ def wildfire():
     moisture = {"dry": 1.3, "normal": 1.0, "wet": 0.7}.get(m, 1.0)
 
     # Radius model (km) — placeholder demo logic
-    radius_km = max(0.5, 2.0 * scale * moisture * (0.5 + w/60.0))
+    radius_km = r0_km + max(0.5, 2.0 * scale * moisture * (0.5 + w/60.0))
 
     # Helper: quick rectangular polygon around center for demo
     def rect(r_km):
@@ -72,12 +118,93 @@ def wildfire():
     # Two rings to suggest growth
     features = [rect(radius_km*0.6), rect(radius_km)]
 
+    # Registry assets inside the outer ring (and within near_km of it)
+    from shapely.geometry import shape
+    from utils.assets import get_assets
+    assets, inside = get_assets().impacted(shape(features[-1]["geometry"]), near_km, limit=MAX_ASSETS_LISTED)
+
     # Meta KPIs for UI strip
     meta = {
         "area_km2": round((2*radius_km)*(2*radius_km), 2),
         "pop_exposed": int(1200*scale*moisture + w*10),
-        "assets_exposed": int(50*scale + w),
+        "assets_exposed": inside,
+        "assets": assets,
         "delta": f"+{int(200*scale)} vs 1h",
     }
+    if incident:
+        meta["incident"] = incident
+
+    return geojson_response({"type": "FeatureCollection", "features": features, "meta": meta})
+
+SECTOR_BEARINGS = {"N": 0.0, "E": 90.0, "S": 180.0, "W": 270.0}
+
+@bp_spread.route("/sectors", methods=["GET"])
+def sectors():
+    """
+    Directional spread sectors from the live spread model, one polygon per
+    sector and horizon. h accepts a list for multi-horizon output: h=1,3,6
+    incident=<id> instead of lat/lon grows the sectors from a tracked
+    incident's centroid and footprint radius (spread_origin).
+    meta.assets lists registry assets the largest horizon reaches (plus any
+    within near_km of it), each with the first horizon that reaches it.
+    Example: /api/spread/sectors?lat=38.5&lon=-122.7&h=1,3,6&z=8&fmt=polyline
+    """
+    try:
+        lat, lon, r0_km, incident = spread_origin(request.args)
+        horizons = [float(v) for v in (request.args.get("h") or "3").split(",")]
+        near_km = near_km_arg(request.args)
+    except KeyError:
+        return jsonify({"error": "unknown incident"}), 404
+    except Exception:
+        return jsonify({"error": "invalid lat/lon/h/near_km"}), 400
+
+    from spread_api import fetch_weather, spread_payload, DEMO_WEATHER
+    weather = fetch_weather(lat, lon) or dict(DEMO_WEATHER)
+    features = []
+    for h in horizons:
+        sp = spread_payload(lat, lon, h, weather)
+        for key, bearing in SECTOR_BEARINGS.items():
+            r_km = r0_km + sp["r_dir_km"][key]
+            f = sector_polygon(lat, lon, r_km, bearing, width_deg=90)
+            f["properties"] = {"horizon_hours": h, "sector": key,
+                               "radius_km": round(r_km, 3),
+                               "weight_pct": sp["w_dir_pct"][key]}
+            features.append(f)
+    assets, inside = sector_assets(features, near_km)
+    meta = {"weather_source": weather.get("source"),
+            "r0_kmph": sp["r0_kmph"],
+            "assets_exposed": inside,
+            "assets": assets}
+    if incident:
+        meta["incident"] = incident
+    return geojson_response({"type": "FeatureCollection", "features": features, "meta": meta})
+
+def sector_assets(features, near_km=0.0):
+    """
+    Registry assets hit by (or within near_km of) the union of the sector
+    polygons, tagged with the first horizon reaching them: inside assets by
+    the first horizon containing them, the others by the first horizon that
+    comes within near_km.
+    """
+    import shapely
+    from shapely.geometry import shape
+    from utils.assets import get_assets
+    index = get_assets()
+    if not len(index):
+        return [], 0
+    by_h = {}
+    for f in features:
+        by_h.setdefault(f["properties"]["horizon_hours"], []).append(shape(f["geometry"]))
+    reached = {True: {}, False: {}}
+    for h in sorted(by_h):
+        for a in index.impacted(shapely.union_all(by_h[h]), near_km)[0]:
+            reached[a["inside"]].setdefault(a["id"], h)
+    assets, inside = index.impacted(shapely.union_all(by_h[max(by_h)]), near_km, limit=MAX_ASSETS_LISTED)
+    for a in assets:
+        a["reached_at_h"] = reached[a["inside"]].get(a["id"])
+    return assets, inside
 
-    return jsonify({"type": "FeatureCollection", "features": features, "meta": meta})
+def warm():
+    """Load the asset registry before workers fork so the STRtree is shared."""
+    from utils.assets import get_assets
+    get_assets()
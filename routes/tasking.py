@@ -1,16 +1,36 @@
 # backend/routes/tasking.py
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timedelta
+import os
 import time
 
+from utils.state_db import state_db
+
 # Blueprint lives under /api/tasking (matches frontend)
 bp_tasking = Blueprint("tasking", __name__, url_prefix="/api/tasking")
 
-# In-memory demo store (clears on server restart)
-JOBS = {}
+# Demo jobs live in the shared state DB so any worker can answer /status or
+# stream /api/events for them. Progress is a function of elapsed time (one
+# step every TASK_STEP_S), not of how often somebody polls.
+TASK_STEP_S = float(os.getenv("LEO_TASK_STEP_S", "2"))
+PROGRESS_STEPS = (10, 35, 60, 85, 100)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasking_jobs (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    mode TEXT NOT NULL,
+    confidence REAL NOT NULL
+)
+"""
 
-def _now_iso():
-    return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+def _db():
+    return state_db(_SCHEMA)
+
+def _now_iso(ts=None):
+    return datetime.utcfromtimestamp(time.time() if ts is None else ts).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 def _demo_artifact_path():
     # Serve a static image placed at frontend/assets/demo_task.png
@@ -18,6 +38,22 @@ def _demo_artifact_path():
     # this relative URL will resolve in the browser.
     return "/assets/demo_task.png"
 
+def tasking_lookup_payload(lat, lon, mode="wildfire"):
+    # Simple demo signals
+    eta_hours = 8 if mode == "wildfire" else 10
+    eta = datetime.utcnow() + timedelta(hours=eta_hours)
+    cloud_risk = 0.25 if mode == "wildfire" else 0.35
+
+    return {
+        "status": "success",
+        "platform": "Sentinel-2",
+        "eta": eta.strftime("%Y-%m-%dT%H:%MZ"),
+        "cloud_risk": cloud_risk,
+        "recommendation": "Optical confirm" if cloud_risk < 0.5 else "Radar tasking",
+        "center": {"lat": lat, "lon": lon},
+        "mode": mode
+    }
+
 @bp_tasking.route("", methods=["GET"])
 def tasking_point_lookup():
     """
@@ -29,21 +65,7 @@ def tasking_point_lookup():
         lat = float(request.args.get("lat"))
         lon = float(request.args.get("lon"))
         mode = (request.args.get("mode") or "wildfire").lower()
-
-        # Simple demo signals
-        eta_hours = 8 if mode == "wildfire" else 10
-        eta = datetime.utcnow() + timedelta(hours=eta_hours)
-        cloud_risk = 0.25 if mode == "wildfire" else 0.35
-
-        return jsonify({
-            "status": "success",
-            "platform": "Sentinel-2",
-            "eta": eta.strftime("%Y-%m-%dT%H:%MZ"),
-            "cloud_risk": cloud_risk,
-            "recommendation": "Optical confirm" if cloud_risk < 0.5 else "Radar tasking",
-            "center": {"lat": lat, "lon": lon},
-            "mode": mode
-        })
+        return jsonify(tasking_lookup_payload(lat, lon, mode))
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 400
 
@@ -56,49 +78,47 @@ def submit():
         mode = (data.get("mode") or "wildfire").lower()
         confidence = float(data.get("confidence", 0))
 
-        task_id = f"T{int(time.time())}"
-
-        JOBS[task_id] = {
-            "id": task_id,
-            "created": _now_iso(),
-            "status": "queued",
-            "progress": 0,
-            "center": {"lat": lat, "lon": lon},
-            "mode": mode,
-            "confidence": confidence,
-            "artifact": None,
-        }
+        now = time.time()
+        task_id = f"T{int(now)}"
+
+        _db().execute(
+            "INSERT OR REPLACE INTO tasking_jobs (id, created_at, lat, lon, mode, confidence) "
+            "VALUES (?, ?, ?, ?, ?, ?)", (task_id, now, lat, lon, mode, confidence))
         return jsonify({"id": task_id, "status": "queued"})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 400
 
+def job_status(task_id, now=None):
+    """Current state of a job, or None if unknown."""
+    row = _db().execute(
+        "SELECT id, created_at, lat, lon, mode FROM tasking_jobs WHERE id = ?", (task_id,)).fetchone()
+    if row is None:
+        return None
+    step = int(((time.time() if now is None else now) - row[1]) // TASK_STEP_S)
+    if step <= 0:
+        state, progress = "queued", 0
+    else:
+        progress = PROGRESS_STEPS[min(step, len(PROGRESS_STEPS)) - 1]
+        state = "done" if progress >= 100 else "running"
+    return {
+        "id": row[0],
+        "status": state,
+        "progress": progress,
+        "artifact": _demo_artifact_path() if state == "done" else None,
+        "center": {"lat": row[2], "lon": row[3]},
+        "mode": row[4],
+        "created": _now_iso(row[1]),
+    }
+
 @bp_tasking.route("/status", methods=["GET"])
 def status():
     try:
         task_id = request.args.get("id")
-        if not task_id or task_id not in JOBS:
+        job = job_status(task_id) if task_id else None
+        if job is None:
             return jsonify({"status": "error", "message": "unknown id"}), 404
-
-        job = JOBS[task_id]
-
-        # Advance state machine on each poll
-        if job["status"] == "queued":
-            job["status"] = "running"
-            job["progress"] = 10
-        elif job["status"] == "running":
-            job["progress"] = min(100, job["progress"] + 25)
-            if job["progress"] >= 100:
-                job["status"] = "done"
-                job["artifact"] = _demo_artifact_path()
-
-        return jsonify({
-            "id": job["id"],
-            "status": job["status"],
-            "progress": job.get("progress"),
-            "artifact": job.get("artifact"),
-            "center": job.get("center"),
-            "mode": job.get("mode"),
-        })
+        job.pop("created")
+        return jsonify(job)
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 400
 
@@ -123,3 +143,102 @@ def info():
         })
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 400
+
+# -----------------------------
+# Fleet coverage over an AOI
+# -----------------------------
+MAX_COVERAGE_DAYS = 14.0
+_fleet = None
+
+def get_fleet():
+    global _fleet
+    if _fleet is None:
+        from utils.orbits import Fleet, load_fleet
+        _fleet = Fleet(load_fleet())
+    return _fleet
+
+def coverage_geometry(req):
+    """AOI from a POSTed GeoJSON geometry/Feature/FeatureCollection, or ?bbox=w,s,e,n."""
+    from shapely.geometry import box, shape
+    if req.method == "POST":
+        gj = req.get_json(force=True, silent=True) or {}
+        if gj.get("type") == "FeatureCollection":
+            gj = (gj.get("features") or [{}])[0]
+        if gj.get("type") == "Feature":
+            gj = gj.get("geometry") or {}
+        try:
+            geom = shape(gj)
+        except Exception:
+            raise ValueError("body must be a GeoJSON Polygon, Feature or FeatureCollection")
+    else:
+        try:
+            w, s, e, n = (float(v) for v in req.args.get("bbox", "").split(","))
+        except ValueError:
+            raise ValueError("bbox=w,s,e,n required (or POST a GeoJSON polygon)")
+        geom = box(w, s, e, n)
+    if geom.geom_type not in ("Polygon", "MultiPolygon") or geom.is_empty or geom.area == 0:
+        raise ValueError("AOI must be a non-empty Polygon or MultiPolygon")
+    return geom
+
+def _cell(v, digits=None):
+    if v != v or v < 0:   # NaN gap / -1 revisits outside the AOI
+        return None
+    return round(float(v), digits) if digits is not None else int(v)
+
+@bp_tasking.route("/coverage", methods=["GET", "POST"])
+def coverage():
+    """
+    Revisit raster and gap statistics of the whole fleet over an AOI.
+    Example: GET /api/tasking/coverage?bbox=-122.6,37.2,-121.8,38.0&days=7&res_km=5
+             POST the same with a GeoJSON polygon body
+    """
+    try:
+        geom = coverage_geometry(request)
+        days = float(request.args.get("days", 7))
+        res_km = float(request.args.get("res_km", 5))
+        if not (0 < days <= MAX_COVERAGE_DAYS) or res_km < 0.5:
+            raise ValueError(f"need 0 < days <= {MAX_COVERAGE_DAYS:g} and res_km >= 0.5")
+        start = request.args.get("start")
+        start = (datetime.strptime(start.rstrip("Z"), "%Y-%m-%dT%H:%M") if start
+                 else datetime.utcnow().replace(minute=0, second=0, microsecond=0))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    import numpy as np
+    from utils.orbits import coverage as fleet_coverage
+    t = time.time()
+    fleet = get_fleet()
+    end = start + timedelta(days=days)
+    cov = fleet_coverage(fleet, geom, start, end, res_km)
+    rev, gap = cov["revisits"], cov["max_gap_h"]
+    inside = rev >= 0
+    counts = rev[inside]
+    gaps = gap[inside]
+    per_sat = {i: 0 for i in fleet.ids}
+    for p in cov["passes"]:
+        per_sat[p["satellite"]] += 1
+    return jsonify({
+        "status": "success",
+        "window": {"start": start.strftime("%Y-%m-%dT%H:%MZ"), "end": end.strftime("%Y-%m-%dT%H:%MZ"),
+                   "days": days},
+        "grid": {"bbox": [round(v, 6) for v in geom.bounds],
+                 "width": len(cov["lons"]), "height": len(cov["lats"]), "res_km": round(cov["res_km"], 3),
+                 "rows": "north to south"},
+        "revisits": [[_cell(v) for v in row] for row in rev],
+        "max_gap_h": [[_cell(v, 1) for v in row] for row in gap],
+        "stats": {
+            "cells": int(inside.sum()),
+            "covered_fraction": round(float((counts > 0).mean()), 3),
+            "revisits": {"min": int(counts.min()), "mean": round(float(counts.mean()), 2),
+                         "max": int(counts.max())},
+            "mean_revisit_h": round(cov["hours"] / float(counts.mean()), 1) if counts.mean() > 0 else None,
+            "max_gap_h": {"p50": round(float(np.percentile(gaps, 50)), 1),
+                          "p90": round(float(np.percentile(gaps, 90)), 1),
+                          "max": round(float(gaps.max()), 1)},
+        },
+        "satellites": [{"id": i, "passes": n} for i, n in per_sat.items()],
+        "passes": [{"satellite": p["satellite"], "start": p["start"].strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "end": p["end"].strftime("%Y-%m-%dT%H:%M:%SZ"), "cells": p["cells"]}
+                   for p in cov["passes"]],
+        "elapsed_s": round(time.time() - t, 3),
+    })
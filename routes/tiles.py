@@ -0,0 +1,40 @@
+# backend/routes/tiles.py
+from flask import Blueprint, Response, jsonify
+
+bp_tiles = Blueprint("tiles", __name__, url_prefix="/api/tiles")
+
+MAX_ZOOM = 18
+
+@bp_tiles.route("/<layer>/<int:z>/<int:x>/<int:y>.png", methods=["GET"])
+def risk_tile(layer, z, x, y):
+    """
+    XYZ risk heatmap tile, e.g. /api/tiles/wildfire/8/41/98.png
+    Tiles are cached on disk per input data version; X-Tile-Cache says hit/miss.
+    """
+    from utils.risk_grid import LAYERS, tile_input_specs, tile_input_version, render_risk_tile
+    from utils.tile_cache import get_tile_cache
+
+    if layer not in LAYERS:
+        return jsonify({"status": "error", "message": f"layer must be one of {list(LAYERS)}"}), 404
+    if not (0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return jsonify({"status": "error", "message": "tile out of range"}), 404
+
+    cache = get_tile_cache()
+    specs = tile_input_specs(layer, z, x, y)
+    version = tile_input_version(specs)
+    if version:
+        png = cache.get(layer, z, x, y, version)
+        if png is not None:
+            return _png(png, "hit")
+
+    png = render_risk_tile(layer, z, x, y, specs)
+    version = tile_input_version(specs)
+    if version:
+        cache.put(layer, z, x, y, version, png)
+    return _png(png, "miss")
+
+def _png(data, state):
+    resp = Response(data, mimetype="image/png")
+    resp.headers["Cache-Control"] = "public, max-age=300"
+    resp.headers["X-Tile-Cache"] = state
+    return resp
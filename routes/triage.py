@@ -4,6 +4,15 @@ import math
 
 bp_triage = Blueprint("triage", __name__)
 
+# Registry assets (utils.assets) within this radius of a ring point set its exposure
+EXPOSURE_RADIUS_KM = 25.0
+EXPOSURE_SCALE = 10.0      # criticality-weighted count giving exposure 1 - 1/e
+# Tracked FIRMS incidents (utils.incidents) within this radius join the ring
+INCIDENT_RADIUS_KM = 75.0
+MAX_INCIDENTS = 5
+INCIDENT_FRP_SCALE = 100.0  # MW of current FRP giving risk 1 - 1/e
+INCIDENT_GROWTH_SCALE = 1.0 # km²/h of footprint growth giving the same
+
 def haversine_km(lat1, lon1, lat2, lon2):
     R=6371.0
     from math import radians,sin,cos,asin,sqrt
@@ -11,34 +20,57 @@ def haversine_km(lat1, lon1, lat2, lon2):
     a=sin(dlat/2)**2 + cos(radians(lat1))*cos(radians(lat2))*sin(dlon/2)**2
     return 2*R*math.asin(math.sqrt(a))
 
+def incident_risk(inc):
+    """Risk of a tracked incident from its current FRP and footprint growth."""
+    growth = max(0.0, inc.get("growth_km2_h") or 0.0)
+    return round(1.0 - math.exp(-(inc["frp_total"] / INCIDENT_FRP_SCALE + growth / INCIDENT_GROWTH_SCALE)), 3)
+
+def triage_payload(lat, lon):
+    # Nearby ring like your frontend uses
+    ring = [
+        {"lat":lat, "lon":lon, "name":"Selected"},
+        {"lat":lat+0.5, "lon":lon, "name":"N"},
+        {"lat":lat-0.5, "lon":lon, "name":"S"},
+        {"lat":lat, "lon":lon+0.5, "name":"E"},
+        {"lat":lat, "lon":lon-0.5, "name":"W"},
+    ]
+    # Tracked incidents are real ignition areas; their exposure radius starts at the footprint's edge
+    from utils.incidents import around
+    for inc in around(lat, lon, INCIDENT_RADIUS_KM, MAX_INCIDENTS):
+        ring.append({"lat":inc["lat"], "lon":inc["lon"], "name":f"Incident {inc['id']}",
+                     "incident":inc, "risk":incident_risk(inc)})
+
+    from utils.assets import get_assets
+    assets = get_assets()
+    items = []
+    for loc in ring:
+        # Pull your real values here (risk_score, factors, exposure)
+        # Placeholder logic:
+        risk = loc.pop("risk", None)
+        if risk is None:
+            risk = max(0.0, min(1.0, 0.2 + 0.6*abs((loc["lat"]-lat)+(loc["lon"]-lon))))
+        if len(assets):
+            reach = EXPOSURE_RADIUS_KM + (loc["incident"]["radius_km"] if "incident" in loc else 0.0)
+            weight, nearest = assets.exposure(loc["lat"], loc["lon"], reach)
+            exposure = round(1.0 - math.exp(-weight / EXPOSURE_SCALE), 3)
+        else:
+            nearest = []
+            exposure = max(0.0, min(1.0, 0.3 + 0.7*(1.0/(1.0+haversine_km(lat,lon,loc["lat"],loc["lon"])+0.1))))
+        priority = round(risk*exposure, 3)
+        tags = []
+        if risk > 0.6: tags.append("high risk")
+        if exposure > 0.6: tags.append("high exposure")
+        items.append({**loc, "risk":risk, "exposure":exposure, "priority":priority, "tags":tags,
+                      "assets": nearest})
+
+    items.sort(key=lambda x: x["priority"], reverse=True)
+    return {"status":"success","items":items}
+
 @bp_triage.route("/triage", methods=["GET"])
 def triage():
     try:
         lat = float(request.args.get("lat"))
         lon = float(request.args.get("lon"))
-
-        # Nearby ring like your frontend uses
-        ring = [
-            {"lat":lat, "lon":lon, "name":"Selected"},
-            {"lat":lat+0.5, "lon":lon, "name":"N"},
-            {"lat":lat-0.5, "lon":lon, "name":"S"},
-            {"lat":lat, "lon":lon+0.5, "name":"E"},
-            {"lat":lat, "lon":lon-0.5, "name":"W"},
-        ]
-
-        items = []
-        for loc in ring:
-            # Pull your real values here (risk_score, factors, exposure)
-            # Placeholder logic:
-            risk = max(0.0, min(1.0, 0.2 + 0.6*abs((loc["lat"]-lat)+(loc["lon"]-lon))))
-            exposure = max(0.0, min(1.0, 0.3 + 0.7*(1.0/(1.0+haversine_km(lat,lon,loc["lat"],loc["lon"])+0.1))))
-            priority = round(risk*exposure, 3)
-            tags = []
-            if risk > 0.6: tags.append("high risk")
-            if exposure > 0.6: tags.append("high exposure")
-            items.append({**loc, "risk":risk, "exposure":exposure, "priority":priority, "tags":tags})
-
-        items.sort(key=lambda x: x["priority"], reverse=True)
-        return jsonify({"status":"success","items":items})
+        return jsonify(triage_payload(lat, lon))
     except Exception as e:
         return jsonify({"status":"error","message":str(e)}), 400
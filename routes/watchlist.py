@@ -0,0 +1,31 @@
+# backend/routes/watchlist.py
+from flask import Blueprint, request, jsonify
+
+from utils import watchlist
+
+bp_watchlist = Blueprint("watchlist", __name__, url_prefix="/api/watchlist")
+
+@bp_watchlist.route("", methods=["GET"])
+def list_watchlist():
+    """Watched areas with the last pre-warm time per provider."""
+    return jsonify({"status": "success", "areas": watchlist.list_areas()})
+
+@bp_watchlist.route("", methods=["POST"])
+def add_watchlist():
+    """
+    Body: {"lat": .., "lon": .., "name": "Sonoma", "kinds": ["wildfire", "flood"]}
+    kinds defaults to all of wildfire, flood, crop, spread.
+    """
+    try:
+        data = request.get_json(force=True) or {}
+        area = watchlist.add_area(float(data.get("lat")), float(data.get("lon")),
+                                  name=data.get("name"), kinds=data.get("kinds"))
+        return jsonify({"status": "success", "area": area}), 201
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@bp_watchlist.route("/<int:area_id>", methods=["DELETE"])
+def remove_watchlist(area_id):
+    if not watchlist.remove_area(area_id):
+        return jsonify({"status": "error", "message": "unknown id"}), 404
+    return jsonify({"status": "success", "id": area_id})
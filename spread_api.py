@@ -1,9 +1,10 @@
 # backend/spread_api.py
 from flask import Blueprint, request, jsonify
 import math
-import requests
 import time
 
+from utils.upstream import fetch, afetch
+
 bp_spread_live = Blueprint("spread_live", __name__)
 
 def cosd(x): 
@@ -21,41 +22,81 @@ def fuel_factor(fuel_index, k_f=0.6):
     f = clamp(fuel_index, 0.0, 1.0)
     return 1.0 + k_f * f  # heavier/drier fuel -> larger
 
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+
+# Hours of forecast blended into the "current" weather used for spread
+SMOOTH_HOURS = 3
+
+def _open_meteo_params(lat, lon):
+    # open-meteo's grid is coarser than 0.01°; snapping keeps nearby clicks on one cache entry.
+    # forecast_hours starts the hourly series at the current hour, not at 00 UTC.
+    return {
+        "latitude": round(lat, 2),
+        "longitude": round(lon, 2),
+        "hourly": "windspeed_10m,winddirection_10m,relativehumidity_2m,soil_moisture_0_to_7cm",
+        "past_hours": 0,
+        "forecast_hours": SMOOTH_HOURS,
+        "timezone": "UTC",
+    }
+
+def _weather_from_open_meteo(j):
+    import numpy as np
+    from utils.timeseries import ewma, as_array
+    hourly = j["hourly"]
+
+    def now(series):
+        # EWMA over the next SMOOTH_HOURS, run backwards so the current hour weighs most;
+        # None when every hour is missing
+        x = as_array(series[:SMOOTH_HOURS])
+        x = x[~np.isnan(x)]
+        return float(ewma(x[::-1], alpha=0.5)[-1]) if x.size else None
+
+    bearing = as_array(hourly["winddirection_10m"][:SMOOTH_HOURS])
+    u = now(np.sin(np.radians(bearing)))
+    v = now(np.cos(np.radians(bearing)))
+    speed = now(hourly["windspeed_10m"])
+    humidity = now(hourly["relativehumidity_2m"])
+    if None in (u, v, speed, humidity):
+        return None   # callers fall back as for a failed fetch
+    soil_val = now(hourly.get("soil_moisture_0_to_7cm") or [])
+    return {
+        "wind_speed_kmph": speed,
+        "wind_bearing_deg": float(np.degrees(np.arctan2(u, v)) % 360.0),
+        "humidity_pct": humidity,
+        "soil_moisture": 0.22 if soil_val is None else soil_val,
+        "fuel_index": 0.4,  # keep simple placeholder; map NDVI/landcover if available
+        "observed_unix": int(time.time()),
+        "source": "open-meteo",
+    }
+
 def fetch_weather(lat: float, lon: float):
     """
     Live weather provider using Open-Meteo.
     Returns dict or None on failure.
     """
     try:
-        r = requests.get(
-            "https://api.open-meteo.com/v1/forecast",
-            params={
-                "latitude": lat,
-                "longitude": lon,
-                "hourly": "windspeed_10m,winddirection_10m,relativehumidity_2m,soil_moisture_0_to_7cm",
-                "past_days": 0,
-                "forecast_days": 1,
-                "timezone": "UTC",
-            },
-            timeout=6,
-        )
-        r.raise_for_status()
-        j = r.json()
-        idx = 0  # use current/next hour
-        soil_series = j["hourly"].get("soil_moisture_0_to_7cm")
-        soil_val = soil_series[idx] if soil_series else 0.22
-        return {
-            "wind_speed_kmph": float(j["hourly"]["windspeed_10m"][idx]),
-            "wind_bearing_deg": float(j["hourly"]["winddirection_10m"][idx]),
-            "humidity_pct": float(j["hourly"]["relativehumidity_2m"][idx]),
-            "soil_moisture": float(soil_val),
-            "fuel_index": 0.4,  # keep simple placeholder; map NDVI/landcover if available
-            "observed_unix": int(time.time()),
-            "source": "open-meteo",
-        }
+        j = fetch("open-meteo", OPEN_METEO_URL, params=_open_meteo_params(lat, lon), timeout=6)
+        return _weather_from_open_meteo(j)
     except Exception:
         return None
 
+async def afetch_weather(lat: float, lon: float):
+    try:
+        j = await afetch("open-meteo", OPEN_METEO_URL, params=_open_meteo_params(lat, lon), timeout=6)
+        return _weather_from_open_meteo(j)
+    except Exception:
+        return None
+
+DEMO_WEATHER = {
+    "wind_speed_kmph": 18.0,
+    "wind_bearing_deg": 250.0,  # blowing from 250°
+    "humidity_pct": 62.0,
+    "soil_moisture": 0.22,
+    "fuel_index": 0.4,
+    "observed_unix": None,
+    "source": "demo-fallback",
+}
+
 @bp_spread_live.route("/spread")
 def spread():
     # Parse inputs
@@ -74,17 +115,13 @@ def spread():
         if callable(provider):
             weather = provider(lat, lon)
 
-    if not weather:
-        weather = {
-            "wind_speed_kmph": 18.0,
-            "wind_bearing_deg": 250.0,  # blowing from 250°
-            "humidity_pct": 62.0,
-            "soil_moisture": 0.22,
-            "fuel_index": 0.4,
-            "observed_unix": None,
-            "source": "demo-fallback",
-        }
+    return jsonify(spread_payload(lat, lon, horizon, weather or dict(DEMO_WEATHER)))
+
+async def aspread(lat, lon, horizon=3.0):
+    weather = await afetch_weather(lat, lon)
+    return spread_payload(lat, lon, horizon, weather or dict(DEMO_WEATHER))
 
+def spread_payload(lat, lon, horizon, weather):
     # Extract fields
     ws = float(weather["wind_speed_kmph"])
     wb = float(weather["wind_bearing_deg"])
@@ -119,7 +156,7 @@ def spread():
         mx = max(w_dir, key=w_dir.get)
         w_dir[mx] += rem
 
-    return jsonify({
+    return {
         "lat": lat,
         "lon": lon,
         "horizon_hours": horizon,
@@ -127,4 +164,4 @@ def spread():
         "r0_kmph": r0_kmph,
         "r_dir_km": r_dir_km,
         "w_dir_pct": w_dir
-    })
+    }
@@ -0,0 +1,25 @@
+# backend/tests/conftest.py
+"""
+Shared test setup: every test gets its own state database, archive and
+fixture directories, with no shared cache, no pre-warm and live upstream
+mode unless the test switches it.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    monkeypatch.setenv("LEO_STATE_PATH", str(tmp_path / "state.sqlite"))
+    monkeypatch.setenv("LEO_ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setenv("LEO_FIXTURE_DIR", str(tmp_path / "fixtures"))
+    monkeypatch.setenv("LEO_CACHE_PATH", "")
+    monkeypatch.setenv("LEO_PREWARM", "0")
+    monkeypatch.setenv("LEO_UPSTREAM_MODE", "live")
+    monkeypatch.delenv("LEO_ALERT_WEBHOOK", raising=False)
+    monkeypatch.delenv("LEO_ALERT_WEBHOOK_HOSTS", raising=False)
+    return tmp_path
@@ -0,0 +1,45 @@
+# backend/tests/test_admission.py
+from flask import Flask, Response
+
+from utils import admission
+
+
+def _app(seen):
+    app = Flask(__name__)
+    admission.install(app)
+    gate = admission.gate_for("/api/crop-health/bulk")
+
+    @app.route("/api/crop-health/bulk")
+    def bulk():
+        def stream():
+            for i in range(3):
+                seen.append(gate._active)
+                yield f"{i}\n"
+        return Response(stream(), mimetype="application/x-ndjson")
+
+    @app.route("/api/crop-health")
+    def single():
+        seen.append(gate._active)
+        return {"ok": True}
+
+    return app, gate
+
+
+def test_streamed_response_holds_its_slot_until_closed():
+    seen = []
+    app, gate = _app(seen)
+    before = gate._active
+    r = app.test_client().get("/api/crop-health/bulk", buffered=False)
+    assert gate._active == before + 1          # teardown has run; the body has not
+    assert r.get_data(as_text=True) == "0\n1\n2\n"
+    assert seen == [before + 1] * 3
+    r.close()
+    assert gate._active == before
+
+
+def test_plain_response_releases_at_teardown():
+    seen = []
+    app, gate = _app(seen)
+    before = gate._active
+    app.test_client().get("/api/crop-health")
+    assert seen == [before + 1] and gate._active == before
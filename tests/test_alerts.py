@@ -0,0 +1,140 @@
+# backend/tests/test_alerts.py
+import json
+import socket
+
+import numpy as np
+import pytest
+
+from utils import alerts, feature_store
+
+LAT, LON = 35.5, -119.5
+
+
+class FakeRecord:
+    """Just enough of feature_store.FeatureRecord for the evaluator."""
+
+    def __init__(self, count, updated_at, mark=None):
+        self.cell = feature_store.cell_of(LAT, LON)
+        self.values = np.array([count], dtype=np.float32)
+        self.updated_at = updated_at
+        self.mark = mark
+
+
+def _count_condition(rule, rec):
+    n = int(rec.values[0])
+    return n >= rule["min_count"], n, rec.mark, {}
+
+
+def _events():
+    rows = alerts._db().execute("SELECT payload FROM alert_outbox ORDER BY id").fetchall()
+    return [json.loads(p)["event"] for p, in rows]
+
+
+@pytest.fixture
+def rule(monkeypatch):
+    monkeypatch.setitem(alerts.CONDITIONS, "firms", _count_condition)
+    rule_id, = alerts.add_rules([{"kind": "firms", "lat": LAT, "lon": LON, "min_count": 2}])
+    return rule_id
+
+
+def _changed(monkeypatch, *recs):
+    monkeypatch.setattr(feature_store, "updated_since", lambda since, limit: list(recs))
+    return alerts.evaluate_changed()
+
+
+def test_first_evaluation_of_a_quiet_cell_sends_nothing(monkeypatch, rule):
+    monkeypatch.setattr(feature_store, "read_cell", lambda cy, cx: FakeRecord(0, 1.0))
+    assert alerts.evaluate_pending() == (1, 0)
+    assert alerts.evaluate_pending() == (0, 0)       # evaluated once
+    assert _events() == []
+
+
+def test_firing_and_resolved_are_edge_triggered(monkeypatch, rule):
+    assert _changed(monkeypatch, FakeRecord(3, 1.0)) == (1, 1)
+    assert _changed(monkeypatch, FakeRecord(3, 2.0)) == (1, 0)      # same features: skipped
+    assert _changed(monkeypatch, FakeRecord(5, 3.0)) == (1, 0)      # still firing
+    assert alerts.get_rule(rule)["cells"][0]["firing"] is True
+    assert _changed(monkeypatch, FakeRecord(1, 4.0)) == (1, 1)
+    assert _changed(monkeypatch, FakeRecord(0, 5.0)) == (1, 0)      # still resolved
+    assert _events() == ["firing", "resolved"]
+    assert alerts.get_rule(rule)["cells"][0]["firing"] is False
+
+
+def test_newer_mark_fires_again_while_firing(monkeypatch, rule):
+    _changed(monkeypatch, FakeRecord(3, 1.0, mark="2026-01-01T0100"))
+    _changed(monkeypatch, FakeRecord(4, 2.0, mark="2026-01-01T0100"))
+    _changed(monkeypatch, FakeRecord(5, 3.0, mark="2026-01-01T0200"))
+    assert _events() == ["firing", "firing"]
+
+
+def test_only_indexed_rules_are_evaluated(monkeypatch, rule):
+    far = FakeRecord(9, 1.0)
+    far.cell = feature_store.cell_of(LAT + 1.0, LON)
+    assert _changed(monkeypatch, far) == (1, 0)
+    assert _events() == []
+
+
+def test_no_webhook_needs_no_allowlist():
+    assert alerts.validate_webhook(None) is None
+
+
+def test_without_any_webhook_notifications_are_only_recorded(monkeypatch, rule):
+    posted = []
+    monkeypatch.setattr(alerts.requests, "post", lambda *a, **kw: posted.append(a))
+    _changed(monkeypatch, FakeRecord(3, 1.0))
+    assert alerts.deliver_due() == 0
+    (d,) = alerts.deliveries(rule)
+    assert d["status"] == "recorded" and d["webhook"] is None and d["payload"]["event"] == "firing"
+    assert posted == []
+
+
+def test_default_webhook_gets_the_notification(monkeypatch, rule):
+    monkeypatch.setenv("LEO_ALERT_WEBHOOK", "http://10.0.0.2/hook")      # operator-set: may be internal
+    posted = []
+
+    class Ok:
+        status_code, is_redirect = 200, False
+
+        def raise_for_status(self):
+            pass
+
+    monkeypatch.setattr(alerts.requests, "post", lambda url, **kw: posted.append(url) or Ok())
+    _changed(monkeypatch, FakeRecord(3, 1.0))
+    assert alerts.deliver_due() == 1
+    assert posted == ["http://10.0.0.2/hook"]
+    assert alerts.deliveries(rule)[0]["status"] == "delivered"
+
+
+def test_webhook_allowlist(monkeypatch):
+    monkeypatch.setenv("LEO_ALERT_WEBHOOK_HOSTS", "hooks.example.com, .corp.example.org")
+    monkeypatch.setenv("LEO_ALERT_WEBHOOK", "https://alerts.example.net/in")
+    for ok in ("https://hooks.example.com/a", "https://a.b.corp.example.org/x", "http://alerts.example.net/other"):
+        assert alerts.validate_webhook(ok) == ok
+    for bad in ("stub", "https://evil.example.com/a", "https://notcorp.example.org/x", "ftp://hooks.example.com/a",
+                "hooks.example.com/a", 42):
+        with pytest.raises(ValueError):
+            alerts.validate_webhook(bad)
+
+
+@pytest.mark.parametrize("host", ["127.0.0.1", "10.1.2.3", "169.254.169.254", "[::1]", "192.168.0.10"])
+def test_webhook_rejects_private_literals(monkeypatch, host):
+    monkeypatch.setenv("LEO_ALERT_WEBHOOK_HOSTS", host.strip("[]"))
+    with pytest.raises(ValueError, match="private"):
+        alerts.validate_webhook(f"http://{host}/hook")
+
+
+def test_rule_webhook_resolving_to_private_address_is_not_posted(monkeypatch):
+    monkeypatch.setenv("LEO_ALERT_WEBHOOK_HOSTS", "hooks.example.com")
+    monkeypatch.setattr(socket, "getaddrinfo",
+                        lambda *a, **kw: [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.5", 443))])
+    posted = []
+    monkeypatch.setattr(alerts.requests, "post", lambda *a, **kw: posted.append(a))
+    with pytest.raises(ValueError, match="non-public"):
+        alerts._post("https://hooks.example.com/a", "{}")
+    assert posted == []
+
+
+def test_add_rules_rejects_disallowed_webhook():
+    with pytest.raises(ValueError, match="LEO_ALERT_WEBHOOK_HOSTS"):
+        alerts.add_rules([{"kind": "firms", "lat": LAT, "lon": LON, "webhook": "https://evil.example.com/"}])
+    assert alerts.list_rules()[0] == 0
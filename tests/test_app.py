@@ -0,0 +1,16 @@
+# backend/tests/test_app.py
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_the_app_starts_no_background_threads(tmp_path):
+    env = {k: v for k, v in os.environ.items() if k != "LEO_PREWARM"}
+    env["LEO_STATE_PATH"] = str(tmp_path / "state.sqlite")
+    out = subprocess.run(
+        [sys.executable, "-c", "import threading, app, asgi; print(sorted(t.name for t in threading.enumerate()))"],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.strip() == "['MainThread']"
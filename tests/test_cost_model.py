@@ -0,0 +1,65 @@
+# backend/tests/test_cost_model.py
+import math
+import re
+
+import pytest
+
+from utils import cost_model
+
+
+def test_defaults_round_trip():
+    params = cost_model.merge_params({})
+    assert params["years"] == 5 and isinstance(params["years"], int)
+    assert params["system_cost"] == 100_000_000.0
+    assert set(params["scenarios"]) == {"wildfire_prevention", "flood_prevention"}
+
+
+def test_scenario_overrides_merge_per_field():
+    params = cost_model.merge_params({"scenarios": {"flood_prevention": {"annual": {"dist": "fixed", "value": 3}}}})
+    flood = params["scenarios"]["flood_prevention"]
+    assert flood["annual"] == {"dist": "fixed", "value": 3}
+    assert flood["success"] == cost_model.DEFAULT_PARAMS["scenarios"]["flood_prevention"]["success"]
+
+
+@pytest.mark.parametrize("overrides, message", [
+    ({"scenarios": [1, 2]}, "scenarios must be"),
+    ({"scenarios": {"flood_prevention": 3}}, "scenarios must be"),
+    ({"scenarios": {"new": {"annual": {"dist": "poisson", "mean": 1}}}}, "scenario 'new' needs"),
+    ({"bogus": 1}, "unknown parameter 'bogus'"),
+    ({"years": 0}, "years must be 1..30"),
+    ({"years": 31}, "years must be 1..30"),
+    ({"years": "five"}, "years must be a number"),
+    ({"years": True}, "years must be a number"),
+    ({"system_cost": -1}, "system_cost must be >= 0.0"),
+    ({"system_cost": float("inf")}, "system_cost must be >= 0.0"),
+    ({"system_cost": None}, "system_cost must be a number"),
+    ({"discount_rate": 1.5}, "discount_rate must be 0.0..1.0"),
+    ({"discount_rate": float("nan")}, "discount_rate must be 0.0..1.0"),
+])
+def test_merge_params_rejects(overrides, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        cost_model.merge_params(overrides)
+
+
+def test_bad_distribution_names_the_field():
+    bad = {"scenarios": {"wildfire_prevention": {"success": {"dist": "beta", "mean": 0.5, "sd": 0.9}}}}
+    with pytest.raises(ValueError, match=r"wildfire_prevention\.success"):
+        cost_model.merge_params(bad)
+
+
+def test_point_estimate_uses_configured_years():
+    params = cost_model.merge_params({"years": 10, "system_cost": 1_000_000})
+    total, _, summary = cost_model.point_estimate(params)
+    assert summary["years"] == 10
+    assert math.isclose(summary["net_benefit"], total * 10 - 1_000_000)
+    assert math.isclose(summary["5_year_net_benefit"], total * 5 - 1_000_000)
+
+
+def test_run_is_deterministic_per_seed():
+    params = cost_model.merge_params({"years": 3})
+    a = cost_model.run(params, draws=2000, seed=7)
+    assert a == cost_model.run(params, draws=2000, seed=7)
+    assert a != cost_model.run(params, draws=2000, seed=8)
+    npv = a["npv"]
+    assert npv["p5"] <= npv["p25"] <= npv["p50"] <= npv["p75"] <= npv["p95"]
+    assert a["years"] == 3
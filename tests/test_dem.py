@@ -0,0 +1,77 @@
+# backend/tests/test_dem.py
+import json
+
+import numpy as np
+import pytest
+
+from utils import dem
+
+Z = np.array([[9, 8, 7],
+              [8, 5, 4],
+              [7, 4, 1]], dtype=np.float32)
+CODES = [[8, 7, 7],
+         [5, 8, 7],
+         [5, 5, 0]]
+ACC = [[1, 1, 1],
+       [1, 4, 2],
+       [1, 2, 9]]
+HAND = [[4, 3, 6],
+        [3, 0, 3],
+        [6, 3, 0]]
+
+
+def test_d8_steepest_descent_codes():
+    assert dem.d8_directions(Z, 1.0, 1.0).tolist() == CODES
+
+
+def test_d8_divides_drops_by_distance():
+    z = np.array([[5, 4], [4, 4]], dtype=np.float32)
+    assert dem.d8_directions(z, 1.0, 1.0)[0, 0] == 5        # straight drop 1 beats diagonal 1/sqrt(2); first tie wins
+    assert dem.d8_directions(z, 10.0, 1.0)[0, 0] == 7       # wide cells: south is the steeper way down
+    z[1, 1] = 3.5
+    assert dem.d8_directions(z, 1.0, 1.0)[0, 0] == 8        # diagonal 1.5/sqrt(2) beats 1
+
+
+def test_nodata_never_receives_flow():
+    z = Z.copy()
+    z[2, 2] = np.nan
+    code = dem.d8_directions(z, 1.0, 1.0)
+    down = dem.downstream_index(code)
+    assert 8 not in down[np.arange(9) != 8]
+
+
+def test_flow_accumulation_and_hand():
+    down = dem.downstream_index(dem.d8_directions(Z, 1.0, 1.0))
+    assert down.tolist() == [4, 4, 5, 4, 8, 8, 7, 8, 8]
+    acc = dem.flow_accumulation(down)
+    assert acc.reshape(3, 3).tolist() == ACC
+    assert dem.height_above_drainage(Z, down, acc, stream_cells=4).tolist() == HAND
+    # with no cell counted as channel everything drains to the pit
+    assert dem.height_above_drainage(Z, down, acc, stream_cells=100).ravel().tolist() == (Z.ravel() - 1).tolist()
+
+
+def test_accumulation_conserves_cells_on_a_random_surface():
+    z = np.random.default_rng(3).uniform(0, 100, (40, 50)).astype(np.float32)
+    down = dem.downstream_index(dem.d8_directions(z, 30.0, 30.0))
+    acc = dem.flow_accumulation(down)
+    sinks = down == np.arange(down.size)
+    assert acc[sinks].sum() == z.size
+    assert (acc[down] >= acc).all()
+
+
+def test_build_tile_and_sample(tmp_path, monkeypatch):
+    stem = str(tmp_path / "t")
+    np.save(stem + ".npy", Z)
+    with open(stem + ".json", "w") as f:
+        json.dump({"west": 10.0, "south": 0.0, "east": 10.03, "north": 0.03}, f)
+    info = dem.build_tile(stem, stream_cells=4)
+    assert info["max_acc"] == 9 and info["shape"] == [3, 3]
+    monkeypatch.setenv("LEO_DEM_DIR", str(tmp_path))
+    monkeypatch.setattr(dem, "_dem", None)
+    # cell centres of (row 0, col 2) and (row 2, col 2)
+    s = dem.get_dem().sample([0.025, 0.005, 1.0], [10.025, 10.025, 10.0])
+    assert s["elevation_m"][:2].tolist() == [7.0, 1.0]
+    assert s["hand_m"][:2].tolist() == [6.0, 0.0]
+    assert s["upstream_km2"][1] == pytest.approx(9 * dem.get_dem().tiles[0].cell_km2)
+    assert np.isnan(s["hand_m"][2])
+    assert dem.terrain_at(1.0, 10.0) is None
@@ -0,0 +1,86 @@
+# backend/tests/test_feature_store.py
+import asyncio
+
+import pytest
+import requests
+
+from utils import feature_store
+from utils.ratelimit import RateLimited
+
+LAT, LON = 35.5, -119.5
+NWS = feature_store.SOURCES["nws"][1]
+
+
+def _answer(rain):
+    return dict.fromkeys(NWS, 1.0) | {"rain_24h": rain}, {"grid_url": "g"}
+
+
+def _raise(e):
+    def fn(lat, lon):
+        raise e
+    return fn
+
+
+def _http_error(status):
+    r = requests.Response()
+    r.status_code = status
+    return requests.HTTPError(response=r)
+
+
+@pytest.fixture
+def nws(monkeypatch):
+    def use(fn):
+        monkeypatch.setitem(feature_store.SOURCES, "nws", (fn, NWS))
+    return use
+
+
+def _expire(monkeypatch):
+    monkeypatch.setattr(feature_store, "FRESH_S", 0.0)
+
+
+def test_fresh_record_is_served_without_recomputing(nws):
+    calls = []
+    nws(lambda lat, lon: calls.append(1) or _answer(5.0))
+    assert feature_store.get_features(LAT, LON, ("nws",)).get("rain_24h") == 5.0
+    assert feature_store.get_features(LAT, LON, ("nws",)).get("rain_24h") == 5.0
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("error", [RateLimited("nws", 5.0), _http_error(503), _http_error(429), ConnectionError()])
+def test_failed_source_keeps_old_values_and_stays_due(monkeypatch, nws, error):
+    nws(lambda lat, lon: _answer(5.0))
+    first = feature_store.get_features(LAT, LON, ("nws",))
+    _expire(monkeypatch)
+    nws(_raise(error))
+    rec = feature_store.get_features(LAT, LON, ("nws",))
+    assert rec.get("rain_24h") == 5.0
+    assert rec.meta["computed"]["nws"] == first.meta["computed"]["nws"]
+    monkeypatch.setattr(feature_store, "FRESH_S", 900.0)
+    assert feature_store.stale_sources(rec, ("nws",), now=first.meta["computed"]["nws"] + 1000) == ("nws",)
+
+
+def test_client_error_means_no_data(monkeypatch, nws):
+    nws(lambda lat, lon: _answer(5.0))
+    feature_store.get_features(LAT, LON, ("nws",))
+    _expire(monkeypatch)
+    nws(_raise(_http_error(404)))
+    rec = feature_store.get_features(LAT, LON, ("nws",))
+    assert rec.get("rain_24h") is None
+
+
+def test_failure_without_a_record_returns_an_empty_one(nws):
+    nws(_raise(ConnectionError()))
+    rec = feature_store.get_features(LAT, LON, ("nws",))
+    assert rec.get("rain_24h") is None and feature_store.read_cell(*rec.cell) is None
+
+
+def test_async_path_awaits_the_async_sources(monkeypatch):
+    async def asrc(lat, lon):
+        await asyncio.sleep(0)
+        return _answer(7.0)
+
+    monkeypatch.setitem(feature_store.SOURCES, "nws", (_raise(AssertionError("blocking path used")), NWS))
+    monkeypatch.setitem(feature_store.ASYNC_SOURCES, "nws", asrc)
+    rec = asyncio.run(feature_store.aget_features(LAT, LON, ("nws",)))
+    assert rec.get("rain_24h") == 7.0
+    assert feature_store.read_cell(*rec.cell).get("rain_24h") == 7.0
@@ -0,0 +1,104 @@
+# backend/tests/test_geometry.py
+import json
+import struct
+
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import mapping, shape
+
+from utils import geometry
+
+
+def _decode_polyline(text, digits):
+    """Google encoded polyline -> [(lon, lat)], the inverse of geometry.encode_polyline."""
+    values, shift, acc = [], 0, 0
+    for ch in text:
+        b = ord(ch) - 63
+        acc |= (b & 0x1F) << shift
+        shift += 5
+        if b < 0x20:
+            values.append(~(acc >> 1) if acc & 1 else acc >> 1)
+            shift = acc = 0
+    lat = np.cumsum(values[0::2]) / 10 ** digits
+    lon = np.cumsum(values[1::2]) / 10 ** digits
+    return list(zip(lon.tolist(), lat.tolist()))
+
+
+def test_encode_polyline_reference_example():
+    ring = [(-120.2, 38.5), (-120.95, 40.7), (-126.453, 43.252)]
+    assert geometry.encode_polyline(ring, 5) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+@pytest.mark.parametrize("digits", [4, 5, 6, 7])
+def test_polyline_round_trip(digits):
+    rng = np.random.default_rng(digits)
+    ring = [(round(x, digits), round(y, digits))
+            for x, y in zip(rng.uniform(-180, 180, 50), rng.uniform(-90, 90, 50))]
+    assert _decode_polyline(geometry.encode_polyline(ring, digits), digits) == pytest.approx(ring, abs=10 ** -digits / 2)
+
+
+def test_binary_round_trip():
+    fc = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {"k": 1},
+         "geometry": {"type": "Polygon", "coordinates": [[[0, 0], [1.5, 0], [1.5, 1], [0, 0]]]}},
+        {"type": "Feature", "properties": {"k": 2}, "geometry": {"type": "Point", "coordinates": [-2.25, 3.125]}},
+        {"type": "Feature", "properties": {"k": 3}, "geometry": None},
+    ]}
+    body, mimetype = geometry.encode_collection(fc, digits=3, fmt="binary")
+    assert mimetype == "application/octet-stream" and body[:4] == geometry.BINARY_MAGIC
+    version, digits, n = struct.unpack_from("<BBI", body, 4)
+    assert (version, digits) == (geometry.BINARY_VERSION, 3)
+    header = json.loads(body[10:10 + n])
+    deltas = np.frombuffer(body[10 + n:], dtype="<i4").reshape(-1, 2)
+    rings, at = [], 0
+    for f in header["features"]:
+        for count in (f["geometry"] or {}).get("rings", []):
+            rings.append((np.cumsum(deltas[at:at + count], axis=0) / 1000.0).tolist())
+            at += count
+    assert at == len(deltas)
+    assert rings == [[[0, 0], [1.5, 0], [1.5, 1], [0, 0]], [[-2.25, 3.125]]]
+    assert [f["properties"]["k"] for f in header["features"]] == [1, 2, 3]
+
+
+def _wiggly_pair():
+    """Two squares sharing a finely wiggled edge at x = 1."""
+    ys = np.linspace(0, 1, 41)
+    edge = [(1 + 0.001 * (-1) ** i, y) for i, y in enumerate(ys)]
+    left = [(0, 0), *edge, (0, 1), (0, 0)]
+    right = [(2, 0), (2, 1), *edge[::-1], (2, 0)]
+    return [mapping(shapely.Polygon(left)), mapping(shapely.Polygon(right))]
+
+
+def test_shared_edges_stay_shared():
+    a, b = (shape(g) for g in geometry.simplify_shared(_wiggly_pair(), 0.01))
+    assert len(a.exterior.coords) < 10 and len(b.exterior.coords) < 10
+    assert a.intersection(b).area == pytest.approx(0.0, abs=1e-12)          # no overlap
+    assert a.union(b).area == pytest.approx(2.0, abs=1e-3)                   # no gap
+    assert a.boundary.intersection(b.boundary).length == pytest.approx(1.0, abs=1e-2)
+
+
+def test_per_feature_simplify_runs_only_for_non_polygons(monkeypatch):
+    calls = []
+    real = geometry.simplify_geometry
+    monkeypatch.setattr(geometry, "simplify_geometry", lambda g, tol: calls.append(g["type"]) or real(g, tol))
+    line = {"type": "LineString", "coordinates": [[0, 0], [0.5, 0.0001], [1, 0]]}
+    out = geometry.simplify_shared([*_wiggly_pair(), line, None], 0.01)
+    assert calls == ["LineString"]
+    assert out[2]["coordinates"] == [[0.0, 0.0], [1.0, 0.0]]
+    assert out[3] is None
+
+
+def test_single_polygon_is_simplified_on_its_own():
+    poly = _wiggly_pair()[0]
+    out, = geometry.simplify_shared([poly], 0.01)
+    assert len(out["coordinates"][0]) < len(poly["coordinates"][0])
+
+
+def test_lod_options():
+    from werkzeug.datastructures import MultiDict
+    tol, digits, fmt = geometry.lod_options(MultiDict({"z": "8", "fmt": "polyline"}))
+    assert tol == pytest.approx(geometry.zoom_tolerance(8)) and digits == geometry.zoom_digits(8)
+    assert fmt == "polyline"
+    with pytest.raises(ValueError):
+        geometry.lod_options(MultiDict({"fmt": "svg"}))
@@ -0,0 +1,129 @@
+# backend/tests/test_incidents.py
+import datetime as dt
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+from utils import incidents
+
+DAY = "2026-10-18"
+NOW = dt.datetime(2026, 10, 18, 12, tzinfo=dt.timezone.utc).timestamp()
+BOX = (-119.6, 35.4, -119.4, 35.6)
+STEP = 0.008                # ~0.7 km of longitude at 35.5N, inside EPS_KM
+
+
+@pytest.fixture(autouse=True)
+def fresh_builds(monkeypatch):
+    monkeypatch.setattr(incidents, "_built", OrderedDict())
+
+
+def _csv(points, hhmm="0900"):
+    """FIRMS area CSV for (lat, lon) points, all acquired at DAY hhmm with frp 2."""
+    rows = ["latitude,longitude,acq_date,acq_time,frp"]
+    rows += [f"{lat},{lon},{DAY},{hhmm},2.0" for lat, lon in points]
+    return "\n".join(rows) + "\n"
+
+
+def _line(lon0, lon1, lat=35.5):
+    n = int(round((lon1 - lon0) / STEP)) + 1
+    return [(lat, round(lon0 + i * STEP, 5)) for i in range(n)]
+
+
+def _active():
+    return sorted(incidents.query(BOX, "active")[1], key=lambda r: r["lon"])
+
+
+def test_cluster_labels():
+    lat = np.array([35.5, 35.5, 35.5, 36.5, 36.5, 37.5])
+    lon = np.array([-119.5, -119.492, -119.484, -119.5, -119.492, -119.5])
+    t = np.zeros(6)
+    labels = incidents.cluster(lat, lon, t)
+    assert labels[0] == labels[1] == labels[2] >= 0
+    assert labels[3] == labels[4] >= 0 and labels[3] != labels[0]
+    assert labels[5] == -1                                      # a lone detection
+    t[1:3] = 3 * 86400.0                                        # three days apart: no longer neighbours
+    assert incidents.cluster(lat[:3], lon[:3], t[:3])[0] == -1
+
+
+def test_parse_detections_skips_bad_rows():
+    text = _csv([(35.5, -119.5)]) + "oops,-119.5,2026-10-18,0900,1\n35.6,-119.4,2026-10-18,1230,\n"
+    lat, lon, t, frp = incidents.parse_detections(text)
+    assert lat.tolist() == [35.5, 35.6]
+    assert t[1] - t[0] == 3.5 * 3600 and frp.tolist() == [2.0, 0.0]
+
+
+def test_snap_bbox_widens_to_tiles():
+    assert incidents.snap_bbox((-119.55, 35.42, -119.41, 35.6)) == (-119.6, 35.4, -119.4, 35.6)
+    assert incidents.snap_bbox((-180, -90, 180, 90)) == (-180.0, -90.0, 180.0, 90.0)
+
+
+def test_build_continues_the_same_incident():
+    assert incidents.build(BOX, text=_csv(_line(-119.52, -119.50)), now=NOW) == 1
+    first, = _active()
+    assert incidents.build(BOX, text=_csv(_line(-119.52, -119.50)), now=NOW) is None    # unchanged response
+    incidents.build(BOX, text=_csv(_line(-119.52, -119.47), "1500"), now=NOW + 6 * 3600)
+    grown, = _active()
+    assert grown["id"] == first["id"]
+    assert grown["area_km2"] > first["area_km2"]
+    assert grown["detections"] == len(_line(-119.52, -119.47))
+
+
+def test_bridging_cluster_merges_into_the_oldest():
+    incidents.build(BOX, text=_csv(_line(-119.56, -119.54)), now=NOW)
+    incidents.build(BOX, text=_csv(_line(-119.56, -119.54) + _line(-119.46, -119.44)), now=NOW)
+    a, b = _active()
+    incidents.build(BOX, text=_csv(_line(-119.56, -119.44), "1500"), now=NOW)
+    keep, = _active()
+    assert keep["id"] == a["id"]
+    merged = incidents.get_incident(b["id"])
+    assert merged["status"] == "merged" and merged["merged_into"] == a["id"]
+    assert keep["detections"] == len(_line(-119.56, -119.44))
+
+
+def test_split_starts_a_new_incident():
+    incidents.build(BOX, text=_csv(_line(-119.56, -119.44)), now=NOW)
+    whole, = _active()
+    incidents.build(BOX, text=_csv(_line(-119.56, -119.54) + _line(-119.46, -119.44), "1500"), now=NOW)
+    parts = _active()
+    assert len(parts) == 2
+    kept = [p for p in parts if p["id"] == whole["id"]]
+    split = [p for p in parts if p["id"] != whole["id"]]
+    assert len(kept) == 1 and split[0]["split_from"] == whole["id"]
+
+
+def test_clipped_build_keeps_detections_outside_the_box():
+    line = _line(-119.54, -119.46)                  # straddles the -119.5 tile edge
+    incidents.build(BOX, text=_csv(line), now=NOW)
+    whole, = _active()
+    east = [p for p in line if p[1] >= -119.5]
+    incidents.build((-119.5, 35.4, -119.3, 35.6), text=_csv(east), now=NOW)
+    after, = _active()
+    assert after["id"] == whole["id"]
+    assert after["detections"] == whole["detections"] == len(line)
+    assert after["lon"] == pytest.approx(whole["lon"], abs=1e-6)
+    assert after["bbox"][0] == pytest.approx(whole["bbox"][0], abs=1e-6)
+
+
+def test_built_digests_are_bounded(monkeypatch):
+    monkeypatch.setattr(incidents, "MAX_BUILT", 2)
+    boxes = [(-119.6, 35.4, -119.4, 35.6), (-118.6, 35.4, -118.4, 35.6), (-117.6, 35.4, -117.4, 35.6)]
+    for box in boxes:
+        incidents.build(box, text=_csv([]), now=NOW)
+    assert list(incidents._built) == [(incidents.snap_bbox(b), 1) for b in boxes[1:]]
+
+
+def test_route_lists_stored_incidents_when_the_build_fails(monkeypatch):
+    incidents.build(BOX, text=_csv(_line(-119.52, -119.50)), now=NOW)
+
+    def broken(bbox, days=1):
+        raise ConnectionError("FIRMS is down")
+
+    monkeypatch.setattr(incidents, "build", broken)
+    from app import create_app
+    r = create_app(preload=False).test_client().get("/api/incidents?bbox=-119.6,35.4,-119.4,35.6")
+    body = r.get_json()
+    assert r.status_code == 200
+    assert body["clusters_built"] is None
+    assert body["error"] == "incident build failed: ConnectionError"
+    assert body["total"] == 1
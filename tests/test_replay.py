@@ -0,0 +1,72 @@
+# backend/tests/test_replay.py
+import json
+import os
+
+import pytest
+import requests
+
+from utils import replay, upstream
+
+FIRMS = "https://firms.modaps.eosdis.nasa.gov/api/area/csv/{key}/VIIRS_SNPP_NRT/-120,35,-119,36/1"
+
+
+def _response(body, status=200):
+    r = requests.Response()
+    r.status_code, r._content = status, body
+    return r
+
+
+def test_redact_url_replaces_firms_path_key_and_key_params():
+    assert replay.redact_url(FIRMS.format(key="abc123")) == FIRMS.format(key="REDACTED")
+    assert (replay.redact_url("https://x.test/v1?lat=1&API_KEY=s3cret&token=t#frag")
+            == "https://x.test/v1?lat=1&API_KEY=REDACTED&token=REDACTED#frag")
+    assert replay.redact_url("https://x.test/v1?monkey=1") == "https://x.test/v1?monkey=1"
+
+
+def test_fixture_key_does_not_depend_on_credentials():
+    a = upstream._fixture_key("GET", FIRMS.format(key="one"), None, None, None, None)
+    b = upstream._fixture_key("GET", FIRMS.format(key="two"), None, None, None, None)
+    assert a == b
+    form = {"grant_type": "client_credentials", "client_id": "x", "client_secret": "y"}
+    other = {"grant_type": "client_credentials", "client_id": "z", "client_secret": "w"}
+    assert (upstream._fixture_key("POST", "https://auth.test/token", None, None, form, None)
+            == upstream._fixture_key("POST", "https://auth.test/token", None, None, other, None))
+
+
+def test_record_then_replay_with_another_key(monkeypatch, isolated_state):
+    calls = []
+    monkeypatch.setattr(upstream._session, "request",
+                        lambda *a, **kw: calls.append(a) or _response(b"latitude,longitude\n35.5,-119.5\n"))
+    monkeypatch.setenv("LEO_UPSTREAM_MODE", "record")
+    body = upstream.fetch("firms", FIRMS.format(key="recorder-key"), parse="text")
+    assert len(calls) == 1
+
+    index = os.path.join(isolated_state / "fixtures", replay.INDEX_NAME)
+    with open(index, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    assert [e["url"] for e in entries] == [FIRMS.format(key="REDACTED")]
+    assert "recorder-key" not in open(index, encoding="utf-8").read()
+
+    monkeypatch.setenv("LEO_UPSTREAM_MODE", "replay")
+    assert upstream.fetch("firms", FIRMS.format(key="someone-else"), parse="text") == body
+    assert len(calls) == 1
+    assert replay.replayed_at() == entries[0]["recorded_at"]
+
+
+def test_replay_miss_names_the_redacted_url(monkeypatch):
+    monkeypatch.setenv("LEO_UPSTREAM_MODE", "replay")
+    with pytest.raises(replay.ReplayMiss) as e:
+        upstream.fetch("firms", FIRMS.format(key="secret-key"), parse="text")
+    assert e.value.provider == "firms"
+    assert "secret-key" not in str(e.value)
+    assert "REDACTED" in str(e.value)
+
+
+def test_recorded_http_errors_replay_as_errors(monkeypatch):
+    monkeypatch.setattr(upstream._session, "request", lambda *a, **kw: _response(b"busy", 503))
+    monkeypatch.setenv("LEO_UPSTREAM_MODE", "record")
+    with pytest.raises(requests.HTTPError):
+        upstream.fetch("nws", "https://api.weather.gov/points/35,-119")
+    monkeypatch.setenv("LEO_UPSTREAM_MODE", "replay")
+    with pytest.raises(requests.HTTPError):
+        upstream.fetch("nws", "https://api.weather.gov/points/35,-119")
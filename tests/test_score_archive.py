@@ -0,0 +1,80 @@
+# backend/tests/test_score_archive.py
+import os
+import time
+
+import numpy as np
+
+from utils import score_archive
+
+DAY = 86400.0
+T0 = (time.time() // DAY - 1) * DAY          # yesterday 00:00 UTC, inside KEEP_DAYS
+BBOX = (-120.0, 35.0, -119.0, 36.0)
+
+
+def _log(rows):
+    """Insert (ts, kind, lat, lon, score) rows straight into the hot log."""
+    score_archive._db().executemany(
+        "INSERT INTO score_log (ts, kind, lat, lon, score, feats) VALUES (?, ?, ?, ?, ?, NULL)", rows)
+
+
+def _log_count():
+    return score_archive._db().execute("SELECT COUNT(*) FROM score_log").fetchone()[0]
+
+
+def test_record_many_skips_missing_scores_and_honours_switch(monkeypatch):
+    score_archive.record_many([("wildfire", 35.5, -119.5, 0.4, None), ("wildfire", 35.5, -119.5, None, None)])
+    assert _log_count() == 1
+    monkeypatch.setenv("LEO_ARCHIVE", "0")
+    score_archive.record("wildfire", 35.5, -119.5, 0.9)
+    assert _log_count() == 1
+
+
+def test_compact_moves_only_closed_hours():
+    _log([(T0 + 60, "wildfire", 35.5, -119.5, 0.1),
+          (T0 + 3600 + 60, "wildfire", 35.6, -119.4, 0.2),
+          (T0 + 7200 + 60, "wildfire", 35.7, -119.3, 0.3)])
+    assert score_archive.compact(now=T0 + 7200 + 120) == 2       # the third hour is still open
+    assert _log_count() == 1
+    (path, rows), = score_archive._db().execute("SELECT path, rows FROM score_partitions").fetchall()
+    assert rows == 2 and os.path.isdir(path)
+    assert path.startswith(os.environ["LEO_ARCHIVE_DIR"])
+
+
+def test_query_sees_every_row_once_across_partitions_and_log():
+    _log([(T0 + 60, "wildfire", 35.5, -119.5, 0.1), (T0 + 3660, "wildfire", 35.5, -119.5, 0.2)])
+    score_archive.compact(now=T0 + 3600)
+    _log([(T0 + 7260, "wildfire", 35.5, -119.5, 0.3)])
+    score_archive.compact(now=T0 + 3 * 3600)    # merges a second batch into the same day partition
+    _log([(T0 + 10860, "wildfire", 35.5, -119.5, 0.4)])
+
+    rows = score_archive.query("wildfire", BBOX, T0, T0 + DAY)
+    assert rows["ts"].tolist() == [T0 + 60, T0 + 3660, T0 + 7260, T0 + 10860]
+    assert np.allclose(rows["score"], [0.1, 0.2, 0.3, 0.4])
+    assert rows["feats"].shape == (4, len(score_archive.FEATURES))
+    assert score_archive._db().execute("SELECT rows FROM score_partitions").fetchone()[0] == 3
+
+
+def test_query_filters_kind_bbox_and_time():
+    _log([(T0 + 60, "wildfire", 35.5, -119.5, 0.1),
+          (T0 + 120, "flood", 35.5, -119.5, 0.2),
+          (T0 + 180, "wildfire", 37.5, -119.5, 0.3),       # north of the box
+          (T0 + 240, "wildfire", 35.5, -121.0, 0.4),       # west of the box
+          (T0 + 5 * 3600, "wildfire", 35.2, -119.8, 0.5)])
+    score_archive.compact(now=T0 + 3600)
+    for t1 in (T0 + 3600, T0 + DAY):
+        rows = score_archive.query("wildfire", BBOX, T0, t1)
+        expected = [0.1] if t1 == T0 + 3600 else [0.1, 0.5]
+        assert np.allclose(rows["score"], expected)
+    assert np.allclose(score_archive.query("flood", BBOX, T0, T0 + DAY)["score"], [0.2])
+    assert len(score_archive.query("crop", BBOX, T0, T0 + DAY)["ts"]) == 0
+
+
+def test_latest_per_cell_and_hourly_series():
+    _log([(T0 + 60, "wildfire", 35.51, -119.51, 0.2),
+          (T0 + 120, "wildfire", 35.52, -119.52, 0.6),     # same cell, later
+          (T0 + 3700, "wildfire", 35.81, -119.21, 0.4)])
+    rows = score_archive.query("wildfire", BBOX, T0, T0 + DAY)
+    assert rows["score"][score_archive.latest_per_cell(rows)].tolist() == [0.6, 0.4]
+    series = score_archive.hourly_series(rows)
+    assert [(h, n) for h, n, _, _ in series] == [(int(T0), 2), (int(T0) + 3600, 1)]
+    assert np.isclose(series[0][2], 0.4) and np.isclose(series[0][3], 0.6)
@@ -0,0 +1,50 @@
+# backend/tests/test_spread_assets.py
+import pytest
+from shapely.geometry import box, mapping
+
+from routes.spread import sector_assets
+from utils import assets
+
+
+def _asset(id, lon, lat):
+    return {"type": "Feature", "properties": {"id": id, "type": "hospital"},
+            "geometry": {"type": "Point", "coordinates": [lon, lat]}}
+
+
+def _sector(h, half_deg):
+    return {"type": "Feature", "properties": {"horizon_hours": h},
+            "geometry": mapping(box(-half_deg, -half_deg, half_deg, half_deg))}
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    # ~1.1 km per 0.01 deg near the equator
+    monkeypatch.setattr(assets, "_index", assets.AssetIndex([
+        _asset("core", 0.005, 0.0),         # inside both horizons
+        _asset("later", 0.015, 0.0),        # inside the 3 h sector only
+        _asset("near1", 0.025, 0.0),        # ~0.55 km beyond 3 h, ~1.7 km beyond 1 h
+        _asset("near3", 0.035, 0.0),        # ~1.7 km beyond 3 h
+        _asset("far", 0.2, 0.0),
+    ]))
+
+
+def test_reached_at_h_for_inside_and_near_assets(registry):
+    features = [_sector(1.0, 0.01), _sector(3.0, 0.02)]
+    rows, inside = sector_assets(features, near_km=2.0)
+    reached = {a["id"]: a["reached_at_h"] for a in rows}
+    assert inside == 2
+    assert reached == {"core": 1.0, "later": 3.0, "near1": 1.0, "near3": 3.0}
+
+
+def test_without_near_km_only_inside_assets(registry):
+    rows, inside = sector_assets([_sector(1.0, 0.01), _sector(3.0, 0.02)])
+    assert {a["id"]: a["reached_at_h"] for a in rows} == {"core": 1.0, "later": 3.0}
+
+
+@pytest.mark.parametrize("path", ["/api/spread/wildfire", "/api/spread/sectors"])
+@pytest.mark.parametrize("near_km", ["abc", "-1"])
+def test_bad_near_km_is_a_400(path, near_km):
+    from app import create_app
+    r = create_app(preload=False).test_client().get(f"{path}?lat=38.5&lon=-122.7&near_km={near_km}")
+    assert r.status_code == 400
+    assert "near_km" in r.get_json()["error"]
@@ -0,0 +1,60 @@
+# backend/tests/test_timeseries.py
+import numpy as np
+import pytest
+
+from utils import timeseries
+
+GAPPY = [1.0, None, 3.0, float("nan"), None, None, 8.0, 2.0, None, 5.0, 4.0, None, None, None, 9.0]
+
+
+def _online(updater, xs):
+    return [updater.update(x) for x in xs]
+
+
+def _nan_to_none(a):
+    return [None if np.isnan(v) else float(v) for v in a]
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 5, 20])
+def test_rolling_mean_matches_online_on_gappy_data(k):
+    batch = _nan_to_none(timeseries.rolling_mean(GAPPY, k))
+    online = _online(timeseries.RollingMean(k), GAPPY)
+    assert batch == pytest.approx(online)
+
+
+def test_rolling_mean_window_is_positional():
+    # the last 3 positions at the end are all missing
+    assert _nan_to_none(timeseries.rolling_mean([4.0, 2.0, None, None, None], 3)) == [4.0, 3.0, 3.0, 2.0, None]
+    assert timeseries.RollingMean(3).extend([4.0, 2.0, None, None, None]) is None
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 5, 20])
+def test_rolling_extrema_match_online_on_gappy_data(k):
+    online = _online(timeseries.RollingExtrema(k), GAPPY)
+    assert _nan_to_none(timeseries.rolling_min(GAPPY, k)) == [lo for lo, _ in online]
+    assert _nan_to_none(timeseries.rolling_max(GAPPY, k)) == [hi for _, hi in online]
+
+
+def test_ewma_matches_online_and_carries_gaps():
+    batch = _nan_to_none(timeseries.ewma(GAPPY, alpha=0.3))
+    online = _online(timeseries.EWMA(alpha=0.3), GAPPY)
+    assert batch == pytest.approx(online)
+    assert batch[4] == batch[2]
+
+
+def test_ewma_long_series_stays_finite():
+    x = np.sin(np.arange(20000) / 50.0)
+    y = timeseries.ewma(x, alpha=0.01)
+    assert np.isfinite(y).all()
+    assert y[-1] == pytest.approx(timeseries.EWMA(alpha=0.01).extend(x.tolist()))
+
+
+def test_smooth_series_uses_the_same_window():
+    from utils.data_processor import smooth_series
+    assert smooth_series(GAPPY, 3) == pytest.approx(list(timeseries.rolling_mean(GAPPY, 3)), nan_ok=True)
+
+
+def test_rolling_rejects_bad_k():
+    for fn in (timeseries.rolling_mean, timeseries.rolling_min, timeseries.rolling_max):
+        with pytest.raises(ValueError):
+            fn([1.0], 0)
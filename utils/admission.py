@@ -0,0 +1,246 @@
+# backend/utils/admission.py
+"""
+Admission control and end-to-end request deadlines.
+
+Every request gets a deadline: the client's X-Request-Deadline header
+(seconds), else DEFAULT_DEADLINE_S, capped at MAX_DEADLINE_S. It lives in a
+contextvar, so it follows the request into thread pools that copy the
+context (feature_store.compute_cell) and into asyncio tasks. utils.upstream
+gives each provider call only what is left: the timeout becomes
+min(timeout, remaining) and a rate-limit wait is cut off at the deadline.
+With less than MIN_CALL_S left a call is not started at all; it is answered
+from a stale cache entry if there is one, otherwise DeadlineExceeded
+reaches the caller's usual fallback.
+
+Endpoints that wait on providers are grouped into gates (GATES: name ->
+path prefixes, limit, queue). Per worker, a gate admits `limit` requests at
+a time and lets up to `queue` more wait for a slot, at most until their
+deadline or QUEUE_WAIT_S. Anything beyond that is turned away at once with
+503 and a Retry-After estimated from how long the gate's slots are held.
+A streamed response holds its slot until the body is done. Paths outside
+every gate (SSE, exports, static) are not limited. An event
+loop waits on sockets rather than threads, so the asgi.py gates are
+ASYNC_FACTOR times wider. LEO_GATE_<NAME>="limit,queue" overrides a gate;
+"0" disables it.
+"""
+from contextlib import contextmanager
+import contextvars
+import math
+import os
+import threading
+import time
+
+DEADLINE_HEADER = "X-Request-Deadline"
+DEFAULT_DEADLINE_S = float(os.getenv("LEO_DEFAULT_DEADLINE_S", "25"))
+MAX_DEADLINE_S = 120.0
+MIN_CALL_S = 0.25           # below this an upstream call cannot finish; fall back instead
+QUEUE_WAIT_S = 10.0
+ASYNC_FACTOR = 32
+
+# name -> (path prefixes, concurrent requests per worker, queued requests per worker)
+GATES = {
+    "risk": (("/api/wildfire-risk", "/api/flood-risk", "/api/ai/predict", "/api/spread", "/api/triage",
+              "/api/dashboard", "/api/incidents"), 8, 16),
+    "crop": (("/api/crop-health",), 3, 6),          # CDSE process calls take up to 45 s
+    "tiles": (("/api/tiles",), 6, 32),
+    "compute": (("/api/tasking/coverage", "/api/cost-savings", "/api/backtest", "/api/validate"), 2, 4),
+}
+
+_deadline = contextvars.ContextVar("leo_request_deadline", default=None)   # time.monotonic() value
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+# -----------------------------
+# Deadlines
+# -----------------------------
+@contextmanager
+def deadline(seconds):
+    """Work inside the block must finish within `seconds` (or the enclosing deadline, if sooner)."""
+    end = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(end if outer is None else min(outer, end))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left before the current deadline, or None without one."""
+    end = _deadline.get()
+    return None if end is None else end - time.monotonic()
+
+
+def budget(timeout):
+    """`timeout` capped to the time left; raises DeadlineExceeded when too little is left to try."""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left < MIN_CALL_S:
+        raise DeadlineExceeded(f"request deadline reached ({left:.2f}s left)")
+    return left if timeout is None else min(timeout, left)
+
+
+def request_deadline_s(value):
+    """Deadline in seconds from a header value, falling back to the default."""
+    try:
+        s = float(value)
+    except (TypeError, ValueError):
+        return DEFAULT_DEADLINE_S
+    return min(max(s, MIN_CALL_S), MAX_DEADLINE_S) if s == s else DEFAULT_DEADLINE_S
+
+
+# -----------------------------
+# Gates
+# -----------------------------
+class Gate:
+    """Concurrency limit with a bounded FIFO-ish wait queue, for threads and for one event loop."""
+
+    def __init__(self, name, limit, queue):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.rejected = 0
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._hold_s = 1.0      # EWMA of how long a slot is held
+        self._sem = None        # asyncio side
+        self._awaiting = 0
+
+    def enter(self, timeout):
+        """Take a slot, waiting up to `timeout`; False when the queue is full or the wait ran out."""
+        with self._cond:
+            if self._active < self.limit and not self._waiting:
+                self._active += 1
+                return True
+            if self._waiting >= self.queue:
+                self.rejected += 1
+                return False
+            self._waiting += 1
+            try:
+                end = time.monotonic() + timeout
+                while self._active >= self.limit:
+                    left = end - time.monotonic()
+                    if left <= 0:
+                        self.rejected += 1
+                        return False
+                    self._cond.wait(left)
+                self._active += 1
+                return True
+            finally:
+                self._waiting -= 1
+
+    def leave(self, held_s):
+        with self._cond:
+            self._active -= 1
+            self._hold_s += 0.2 * (held_s - self._hold_s)
+            self._cond.notify()
+
+    async def aenter(self, timeout):
+        import asyncio
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.limit * ASYNC_FACTOR)
+        if self._sem.locked() and self._awaiting >= self.queue * ASYNC_FACTOR:
+            self.rejected += 1
+            return False
+        self._awaiting += 1
+        try:
+            await asyncio.wait_for(self._sem.acquire(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        finally:
+            self._awaiting -= 1
+
+    def aleave(self, held_s):
+        self._hold_s += 0.2 * (held_s - self._hold_s)
+        self._sem.release()
+
+    def retry_after_s(self):
+        """Rough time for the work already queued ahead of a new request to drain."""
+        return max(1, math.ceil(self._hold_s * (self._waiting + self._awaiting / ASYNC_FACTOR + 1) / self.limit))
+
+    def stats(self):
+        return {"limit": self.limit, "queue": self.queue, "active": self._active, "waiting": self._waiting,
+                "rejected": self.rejected, "hold_s": round(self._hold_s, 3)}
+
+
+def _gate_limits(name, limit, queue):
+    env = os.getenv("LEO_GATE_" + name.upper())
+    if env is None:
+        return limit, queue
+    if env.strip() in ("", "0"):
+        return None
+    lim, _, q = env.partition(",")
+    return int(lim), int(q or lim)
+
+
+def _build_gates():
+    gates = []
+    for name, (prefixes, limit, queue) in GATES.items():
+        limits = _gate_limits(name, limit, queue)
+        if limits is not None:
+            gate = Gate(name, *limits)
+            gates.extend((p, gate) for p in prefixes)
+    return sorted(gates, key=lambda pg: len(pg[0]), reverse=True)
+
+
+_gates = _build_gates()
+
+
+def gate_for(path):
+    for prefix, gate in _gates:
+        if path == prefix or path.startswith(prefix + "/"):
+            return gate
+    return None
+
+
+# -----------------------------
+# Flask hooks
+# -----------------------------
+def install(app):
+    """Deadline and gate for every request of `app`; 503 when saturated, 504 past the deadline."""
+    from flask import g, jsonify, request
+
+    @app.before_request
+    def _admit():
+        seconds = request_deadline_s(request.headers.get(DEADLINE_HEADER))
+        g.leo_deadline = _deadline.set(time.monotonic() + seconds)
+        gate = gate_for(request.path)
+        if gate is None:
+            return None
+        if not gate.enter(min(QUEUE_WAIT_S, seconds)):
+            return jsonify({"status": "error", "message": f"too many {gate.name} requests in flight, retry later"}), \
+                503, {"Retry-After": str(gate.retry_after_s())}
+        g.leo_gate = (gate, time.monotonic())
+        return None
+
+    @app.after_request
+    def _hold_while_streaming(response):
+        # a streamed body is produced after teardown: keep the slot until the server closes it
+        if response.is_streamed:
+            held = g.pop("leo_gate", None)
+            if held is not None:
+                response.call_on_close(lambda: held[0].leave(time.monotonic() - held[1]))
+        return response
+
+    @app.teardown_request
+    def _release(exc=None):
+        held = g.pop("leo_gate", None)
+        if held is not None:
+            held[0].leave(time.monotonic() - held[1])
+        token = g.pop("leo_deadline", None)
+        if token is not None:
+            try:
+                _deadline.reset(token)
+            except ValueError:      # torn down from another context; the deadline dies with it
+                pass
+
+    @app.errorhandler(DeadlineExceeded)
+    def _deadline_exceeded(e):
+        return jsonify({"status": "error", "message": str(e)}), 504
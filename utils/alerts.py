@@ -0,0 +1,589 @@
+# backend/utils/alerts.py
+"""
+Alert rules over watched cells, evaluated incrementally.
+
+A rule is a condition at a location:
+
+  risk    wildfire or flood score >= `above` in any feature cell within
+          radius_km (default: just the cell holding the point)
+  firms   at least min_count FIRMS detections within within_km; notifies
+          again whenever a newer detection shows up
+  spread  a detection close enough that the spread sector facing the asset
+          (spread_api.spread_payload, asset weather) reaches it within
+          horizon_h
+
+Rules are indexed by feature-store cell (alert_index: cell -> rules). The
+evaluator runs on one worker per host, like the feature refresher. Each
+pass reads the cells the store wrote since its cursor
+(feature_store.updated_since) and skips those no rule covers or whose
+feature vector has not changed. It then evaluates only the rules indexed on
+the remaining cells, so a pass costs about the number of changed cells, not
+the number of rules. The evaluator also keeps rule cells in feature_access
+so the refresher keeps them current.
+
+State is edge-triggered per (rule, cell): "firing" is queued when a rule
+starts to hold (for firms, also when a newer detection arrives) and
+"resolved" when it stops. The alert_outbox rows are POSTed as JSON to the
+rule's webhook or LEO_ALERT_WEBHOOK, with exponential backoff up to
+MAX_ATTEMPTS. With neither webhook set a notification is only recorded in
+the outbox (status "recorded", listed by deliveries()).
+
+Webhooks are user input, so a rule may only name a URL whose host is in
+LEO_ALERT_WEBHOOK_HOSTS (comma-separated; ".example.com" allows
+subdomains) or is LEO_ALERT_WEBHOOK's host. Before each POST the host is
+resolved and the delivery fails unless every address is public; redirects
+are not followed. Only LEO_ALERT_WEBHOOK itself, set by the operator, may
+point at an internal address.
+"""
+import datetime as dt
+import fcntl
+import hashlib
+import ipaddress
+import json
+import math
+import os
+import socket
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+import requests
+
+from utils.ratelimit import PREFETCH, priority
+from utils.state_db import state_db
+
+RULE_KINDS = ("risk", "firms", "spread")
+RISK_MODES = ("wildfire", "flood")
+
+MAX_RULE_CELLS = 100
+EVAL_BATCH = 1000           # changed feature records per pass
+PENDING_BATCH = 500         # newly created rules per pass
+CURSOR_SLACK_S = 2.0        # re-read writes this close to the cursor; the digest dedupes them
+TOUCH_S = 1800.0            # < feature_store.ACTIVE_S
+EVAL_POLL_S = 15.0
+MAX_ATTEMPTS = 6
+BACKOFF_S = 30.0
+WEBHOOK_TIMEOUT_S = 5.0
+DELIVERY_BATCH = 50
+KEEP_DELIVERED_S = 7 * 86400
+
+LOCK_PATH = os.path.join(tempfile.gettempdir(), "leo_alerts.lock")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alert_rules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    kind TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    params TEXT NOT NULL,
+    webhook TEXT,
+    created_at REAL NOT NULL,
+    evaluated_at REAL
+);
+CREATE INDEX IF NOT EXISTS alert_rules_pending ON alert_rules (id) WHERE evaluated_at IS NULL;
+CREATE TABLE IF NOT EXISTS alert_index (
+    cy INTEGER NOT NULL,
+    cx INTEGER NOT NULL,
+    rule_id INTEGER NOT NULL,
+    PRIMARY KEY (cy, cx, rule_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS alert_index_rule ON alert_index (rule_id);
+CREATE TABLE IF NOT EXISTS alert_state (
+    rule_id INTEGER NOT NULL,
+    cy INTEGER NOT NULL,
+    cx INTEGER NOT NULL,
+    firing INTEGER NOT NULL,
+    value REAL,
+    mark TEXT,
+    changed_at REAL NOT NULL,
+    PRIMARY KEY (rule_id, cy, cx)
+);
+CREATE TABLE IF NOT EXISTS alert_cells (
+    cy INTEGER NOT NULL,
+    cx INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (cy, cx)
+);
+CREATE TABLE IF NOT EXISTS alert_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    rule_id INTEGER NOT NULL,
+    webhook TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_at REAL NOT NULL,
+    delivered_at REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS alert_outbox_due ON alert_outbox (next_at) WHERE delivered_at IS NULL;
+CREATE TABLE IF NOT EXISTS alert_meta (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+def _db():
+    return state_db(_SCHEMA)
+
+
+def default_webhook():
+    return os.getenv("LEO_ALERT_WEBHOOK") or None
+
+
+def webhook_hosts():
+    """Hosts a rule's own webhook may point at: LEO_ALERT_WEBHOOK_HOSTS plus the default webhook's host."""
+    hosts = {h.strip().lower() for h in os.getenv("LEO_ALERT_WEBHOOK_HOSTS", "").split(",") if h.strip()}
+    default = default_webhook()
+    if default:
+        hosts.add((urlsplit(default).hostname or "").lower())
+    return hosts
+
+
+def _public_ip(addr):
+    ip = ipaddress.ip_address(addr.split("%")[0])
+    return ip.is_global and not ip.is_multicast
+
+
+def validate_webhook(webhook):
+    """None or an http(s) URL on an allowed host that isn't a private address; raises ValueError."""
+    if webhook is None:
+        return webhook
+    if not isinstance(webhook, str):
+        raise ValueError("webhook must be an http(s) URL")
+    u = urlsplit(webhook)
+    host = (u.hostname or "").lower()
+    if u.scheme not in ("http", "https") or not host:
+        raise ValueError("webhook must be an http(s) URL")
+    allowed = webhook_hosts()
+    if not any(host == h or (h.startswith(".") and host.endswith(h)) for h in allowed):
+        raise ValueError("webhook host is not in LEO_ALERT_WEBHOOK_HOSTS")
+    try:
+        literal = not _public_ip(host)
+    except ValueError:
+        literal = False     # a name, checked again when it is resolved for delivery
+    if literal:
+        raise ValueError("webhook must not point at a private, loopback or link-local address")
+    return webhook
+
+
+def _check_resolves_public(webhook):
+    """Raise unless every address the webhook's host resolves to is public (rule webhooks only)."""
+    u = urlsplit(webhook)
+    port = u.port or (443 if u.scheme == "https" else 80)
+    for *_, sockaddr in socket.getaddrinfo(u.hostname, port, proto=socket.IPPROTO_TCP):
+        if not _public_ip(sockaddr[0]):
+            raise ValueError(f"webhook host {u.hostname} resolves to non-public address {sockaddr[0]}")
+
+
+def _km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _bearing(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    y = np.sin(lon2 - lon1) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(lon2 - lon1)
+    return np.degrees(np.arctan2(y, x)) % 360.0
+
+
+# -----------------------------
+# Rules
+# -----------------------------
+def validate_rule(spec):
+    """(kind, lat, lon, params, name, webhook) from a request body; raises ValueError."""
+    kind = str(spec.get("kind", "")).lower()
+    if kind not in RULE_KINDS:
+        raise ValueError(f"kind must be one of {', '.join(RULE_KINDS)}")
+    lat, lon = float(spec["lat"]), float(spec["lon"])
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("lat/lon out of range")
+    if kind == "risk":
+        mode = str(spec.get("mode", "wildfire")).lower()
+        if mode not in RISK_MODES:
+            raise ValueError(f"mode must be one of {', '.join(RISK_MODES)}")
+        params = {"mode": mode, "above": float(spec.get("above", 0.7)),
+                  "radius_km": float(spec.get("radius_km", 0.0))}
+    elif kind == "firms":
+        params = {"within_km": float(spec.get("within_km", 10.0)), "min_count": int(spec.get("min_count", 1))}
+        if not 0 < params["within_km"] <= 50:
+            raise ValueError("within_km must be in (0, 50]")    # FIRMS rows cover the 1 deg box
+    else:
+        params = {"horizon_h": float(spec.get("horizon_h", 3.0))}
+        if not 0 < params["horizon_h"] <= 24:
+            raise ValueError("horizon_h must be in (0, 24]")
+    webhook = validate_webhook(spec.get("webhook") or None)
+    return kind, lat, lon, params, spec.get("name"), webhook
+
+
+def rule_cells(kind, lat, lon, params):
+    """Feature-store cells a rule is indexed on."""
+    from utils.feature_store import CELL_DEG, cell_center, cell_of
+    cy, cx = cell_of(lat, lon)
+    radius = params.get("radius_km", 0.0) if kind == "risk" else 0.0
+    if radius <= 0:
+        return [(cy, cx)]
+    ry = math.ceil(radius / (111.32 * CELL_DEG))
+    rx = math.ceil(radius / (111.32 * CELL_DEG * max(0.05, math.cos(math.radians(lat)))))
+    cells = [(y, x) for y in range(cy - ry, cy + ry + 1) for x in range(cx - rx, cx + rx + 1)
+             if (y, x) == (cy, cx) or _km(lat, lon, *cell_center(y, x)) <= radius]
+    if len(cells) > MAX_RULE_CELLS:
+        raise ValueError(f"radius_km covers {len(cells)} cells, at most {MAX_RULE_CELLS}")
+    return cells
+
+
+def _row_to_rule(row):
+    rule_id, name, kind, lat, lon, params, webhook, created_at, evaluated_at = row
+    return {"id": rule_id, "name": name, "kind": kind, "lat": lat, "lon": lon, **json.loads(params),
+            "webhook": webhook, "created_at": created_at, "evaluated_at": evaluated_at}
+
+
+_RULE_COLS = "id, name, kind, lat, lon, params, webhook, created_at, evaluated_at"
+
+
+def add_rules(specs):
+    """Validate and store rules in one transaction; all or nothing. Returns the new ids."""
+    parsed = []
+    for i, spec in enumerate(specs):
+        try:
+            kind, lat, lon, params, name, webhook = validate_rule(spec)
+            parsed.append((kind, lat, lon, params, name, webhook, rule_cells(kind, lat, lon, params)))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"rule {i}: {e}" if len(specs) > 1 else str(e))
+    c = _db()
+    now = time.time()
+    ids = []
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        for kind, lat, lon, params, name, webhook, cells in parsed:
+            rule_id = c.execute(
+                "INSERT INTO alert_rules (name, kind, lat, lon, params, webhook, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, kind, lat, lon, json.dumps(params), webhook, now)).lastrowid
+            c.executemany("INSERT OR IGNORE INTO alert_index (cy, cx, rule_id) VALUES (?, ?, ?)",
+                          [(cy, cx, rule_id) for cy, cx in cells])
+            ids.append(rule_id)
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK")
+        raise
+    from utils.feature_store import touch_cells
+    touch_cells({cell for p in parsed for cell in p[6]})
+    return ids
+
+
+def get_rule(rule_id):
+    c = _db()
+    row = c.execute(f"SELECT {_RULE_COLS} FROM alert_rules WHERE id = ?", (rule_id,)).fetchone()
+    if row is None:
+        return None
+    rule = _row_to_rule(row)
+    rule["cells"] = [{"cy": cy, "cx": cx, "firing": bool(f), "value": v, "changed_at": t}
+                     for cy, cx, f, v, t in c.execute(
+                         "SELECT i.cy, i.cx, COALESCE(s.firing, 0), s.value, s.changed_at FROM alert_index i "
+                         "LEFT JOIN alert_state s ON s.rule_id = i.rule_id AND s.cy = i.cy AND s.cx = i.cx "
+                         "WHERE i.rule_id = ?", (rule_id,))]
+    return rule
+
+
+def list_rules(limit=100, offset=0):
+    c = _db()
+    rows = c.execute(f"SELECT {_RULE_COLS} FROM alert_rules ORDER BY id LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+    firing = dict(c.execute("SELECT rule_id, COUNT(*) FROM alert_state WHERE firing = 1 GROUP BY rule_id"))
+    total = c.execute("SELECT COUNT(*) FROM alert_rules").fetchone()[0]
+    return total, [{**_row_to_rule(r), "firing_cells": firing.get(r[0], 0)} for r in rows]
+
+
+def remove_rule(rule_id):
+    c = _db()
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        gone = c.execute("DELETE FROM alert_rules WHERE id = ?", (rule_id,)).rowcount > 0
+        c.execute("DELETE FROM alert_index WHERE rule_id = ?", (rule_id,))
+        c.execute("DELETE FROM alert_state WHERE rule_id = ?", (rule_id,))
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK")
+        raise
+    return gone
+
+
+# -----------------------------
+# Conditions: (holds, value, mark, details) for one rule at one cell, or None if unknown
+# -----------------------------
+def _risk_condition(rule, rec):
+    from utils.feature_store import cell_center
+    from utils.risk_grid import nan_if_none, wildfire_score
+    lat, lon = cell_center(*rec.cell)
+    if rule["mode"] == "wildfire":
+        value = float(wildfire_score(rec.get("firms_risk") or 0.0, nan_if_none(rec.get("humidity")),
+                                     nan_if_none(rec.get("wind"))))
+    else:
+        from routes.predictions import flood_payload
+        value = flood_payload(lat, lon, rec.nws_summary(), soil_moisture=rec.get("soil_moisture"))["data"]["flood_probability"]
+        if value is None:
+            return None
+    return value >= rule["above"], round(value, 3), None, {"mode": rule["mode"], "above": rule["above"]}
+
+
+def _detections(rule, rec):
+    """FIRMS (lat, lon, acquired) arrays near the rule point; None without FIRMS data."""
+    if rec.get("detections_24h") is None:
+        return None
+    if rec.get("detections_24h") == 0:
+        return np.empty(0), np.empty(0), []
+    from routes.predictions import firms_rows
+    rows = firms_rows(rule["lat"], rule["lon"])
+    if rows is None:
+        return None
+    lat, lon, acq = [], [], []
+    for row in rows:
+        try:
+            lat.append(float(row["latitude"]))
+            lon.append(float(row["longitude"]))
+        except (KeyError, ValueError):
+            continue
+        acq.append(f"{row.get('acq_date', '')}T{str(row.get('acq_time', '')).zfill(4)}")
+    return np.array(lat), np.array(lon), acq
+
+
+def _firms_condition(rule, rec):
+    det = _detections(rule, rec)
+    if det is None:
+        return None
+    lat, lon, acq = det
+    near = np.flatnonzero(_km(rule["lat"], rule["lon"], lat, lon) <= rule["within_km"]) if len(lat) else []
+    newest = max((acq[i] for i in near), default=None)
+    return len(near) >= rule["min_count"], len(near), newest, {"within_km": rule["within_km"], "newest": newest}
+
+
+def _spread_condition(rule, rec):
+    det = _detections(rule, rec)
+    if det is None:
+        return None
+    lat, lon, _ = det
+    if not len(lat):
+        return False, None, None, {"horizon_h": rule["horizon_h"]}
+    from spread_api import fetch_weather, spread_payload
+    weather = fetch_weather(rule["lat"], rule["lon"])
+    if not weather:
+        return None
+    h = rule["horizon_h"]
+    reach = spread_payload(rule["lat"], rule["lon"], h, weather)["r_dir_km"]    # independent of the origin
+    dist = _km(lat, lon, rule["lat"], rule["lon"])
+    sector = np.array(["N", "E", "S", "W"])[np.round(_bearing(lat, lon, rule["lat"], rule["lon"]) / 90.0).astype(int) % 4]
+    r = np.array([reach[s] for s in sector])
+    eta = np.where(r > 0, dist / np.maximum(r, 1e-9) * h, np.inf)
+    i = int(np.argmin(eta))
+    holds = bool(eta[i] <= h)
+    return holds, (round(float(eta[i]), 2) if np.isfinite(eta[i]) else None), None, {
+        "horizon_h": h, "nearest_km": round(float(dist.min()), 2),
+        "source": [round(float(lat[i]), 4), round(float(lon[i]), 4)], "sector": str(sector[i])}
+
+
+CONDITIONS = {"risk": _risk_condition, "firms": _firms_condition, "spread": _spread_condition}
+
+
+# -----------------------------
+# Evaluation
+# -----------------------------
+def _meta(c, key, default=0.0):
+    row = c.execute("SELECT value FROM alert_meta WHERE key = ?", (key,)).fetchone()
+    return default if row is None else row[0]
+
+
+def _rules_by_id(c, ids):
+    out = {}
+    ids = list(ids)
+    for a in range(0, len(ids), 500):
+        chunk = ids[a:a + 500]
+        rows = c.execute(f"SELECT {_RULE_COLS} FROM alert_rules WHERE id IN ({','.join('?' * len(chunk))})",
+                         chunk).fetchall()
+        out.update((r[0], _row_to_rule(r)) for r in rows)
+    return out
+
+
+def _evaluate(c, rule, rec, now):
+    """Apply one rule to one cell record; queues a notification on a state change."""
+    try:
+        result = CONDITIONS[rule["kind"]](rule, rec)
+    except Exception as e:
+        print("alert rule", rule["id"], "failed:", repr(e))
+        return False
+    if result is None:
+        return False
+    holds, value, mark, details = result
+    cy, cx = rec.cell
+    prev = c.execute("SELECT firing, mark, changed_at FROM alert_state WHERE rule_id = ? AND cy = ? AND cx = ?",
+                     (rule["id"], cy, cx)).fetchone()
+    was = bool(prev and prev[0])
+    event = None
+    if holds and (not was or (mark is not None and mark > (prev[1] or ""))):
+        event = "firing"
+    elif was and not holds:
+        event = "resolved"
+    c.execute("INSERT OR REPLACE INTO alert_state (rule_id, cy, cx, firing, value, mark, changed_at) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?)",
+              (rule["id"], cy, cx, int(holds), value, mark if holds else None,
+               now if event or prev is None else prev[2]))
+    if event:
+        from utils.feature_store import cell_center
+        payload = {
+            "event": event,
+            "rule": {k: v for k, v in rule.items() if k not in ("webhook", "evaluated_at")},
+            "cell": [round(v, 5) for v in cell_center(cy, cx)],
+            "value": value,
+            "details": details,
+            "at": dt.datetime.utcfromtimestamp(now).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+        webhook = rule["webhook"] or default_webhook()
+        # without a webhook the notification is only recorded: nothing is due for delivery
+        c.execute("INSERT INTO alert_outbox (rule_id, webhook, payload, created_at, next_at, delivered_at) "
+                  "VALUES (?, ?, ?, ?, ?, ?)",
+                  (rule["id"], webhook or "", json.dumps(payload), now, now, None if webhook else now))
+    return event is not None
+
+
+def evaluate_changed(limit=EVAL_BATCH):
+    """Evaluate rules on cells whose features changed since the last pass; returns (records read, events)."""
+    from utils.feature_store import updated_since
+    c = _db()
+    cursor = _meta(c, "cursor")
+    recs = updated_since(cursor - CURSOR_SLACK_S, limit)
+    if not recs:
+        return 0, 0
+    latest = {}
+    for rec in recs:
+        latest[rec.cell] = rec
+    now = time.time()
+    events = 0
+    for cell, rec in latest.items():
+        rule_ids = [r[0] for r in c.execute("SELECT rule_id FROM alert_index WHERE cy = ? AND cx = ?", cell)]
+        if not rule_ids:
+            continue
+        digest = hashlib.sha1(rec.values.tobytes()).hexdigest()
+        row = c.execute("SELECT digest FROM alert_cells WHERE cy = ? AND cx = ?", cell).fetchone()
+        if row and row[0] == digest:
+            continue
+        for rule in _rules_by_id(c, rule_ids).values():
+            events += _evaluate(c, rule, rec, now)
+        c.execute("INSERT OR REPLACE INTO alert_cells (cy, cx, digest) VALUES (?, ?, ?)", (*cell, digest))
+    c.execute("INSERT OR REPLACE INTO alert_meta (key, value) VALUES ('cursor', ?)",
+              (max(cursor, recs[-1].updated_at),))
+    return len(recs), events
+
+
+def evaluate_pending(limit=PENDING_BATCH):
+    """First evaluation of new rules against whatever the store already holds for their cells."""
+    from utils.feature_store import read_cell
+    c = _db()
+    rows = c.execute(f"SELECT {_RULE_COLS} FROM alert_rules WHERE evaluated_at IS NULL ORDER BY id LIMIT ?",
+                     (limit,)).fetchall()
+    now = time.time()
+    events = 0
+    for row in rows:
+        rule = _row_to_rule(row)
+        for cy, cx in c.execute("SELECT cy, cx FROM alert_index WHERE rule_id = ?", (rule["id"],)).fetchall():
+            rec = read_cell(cy, cx)
+            if rec is not None:
+                events += _evaluate(c, rule, rec, now)
+        c.execute("UPDATE alert_rules SET evaluated_at = ? WHERE id = ?", (now, rule["id"]))
+    return len(rows), events
+
+
+def touch_rule_cells():
+    from utils.feature_store import touch_cells
+    touch_cells(_db().execute("SELECT DISTINCT cy, cx FROM alert_index").fetchall())
+
+
+# -----------------------------
+# Delivery
+# -----------------------------
+def _post(webhook, payload):
+    if webhook != os.getenv("LEO_ALERT_WEBHOOK"):
+        validate_webhook(webhook)           # the allowlist may have changed since the rule was made
+        _check_resolves_public(webhook)
+    r = requests.post(webhook, data=payload, headers={"Content-Type": "application/json"},
+                      timeout=WEBHOOK_TIMEOUT_S, allow_redirects=False)
+    r.raise_for_status()
+    if r.is_redirect:
+        raise ValueError(f"webhook redirected to {r.headers.get('Location')!r}; redirects are not followed")
+
+
+def deliver_due(limit=DELIVERY_BATCH):
+    """POST due notifications; failures back off exponentially. Returns deliveries attempted."""
+    c = _db()
+    now = time.time()
+    rows = c.execute("SELECT id, webhook, payload, attempts FROM alert_outbox WHERE delivered_at IS NULL "
+                     "AND next_at <= ? AND attempts < ? ORDER BY next_at LIMIT ?",
+                     (now, MAX_ATTEMPTS, limit)).fetchall()
+    for out_id, webhook, payload, attempts in rows:
+        try:
+            _post(webhook, payload)
+            c.execute("UPDATE alert_outbox SET delivered_at = ?, attempts = ?, error = NULL WHERE id = ?",
+                      (time.time(), attempts + 1, out_id))
+        except Exception as e:
+            c.execute("UPDATE alert_outbox SET attempts = ?, next_at = ?, error = ? WHERE id = ?",
+                      (attempts + 1, time.time() + BACKOFF_S * 2 ** attempts, repr(e)[:500], out_id))
+    c.execute("DELETE FROM alert_outbox WHERE delivered_at < ?", (now - KEEP_DELIVERED_S,))
+    return len(rows)
+
+
+def deliveries(rule_id=None, limit=50):
+    where, args = ("WHERE rule_id = ?", (rule_id,)) if rule_id is not None else ("", ())
+    rows = _db().execute(
+        f"SELECT id, rule_id, webhook, payload, created_at, attempts, delivered_at, error FROM alert_outbox "
+        f"{where} ORDER BY id DESC LIMIT ?", (*args, limit)).fetchall()
+    return [{"id": i, "rule_id": r, "webhook": w or None, "payload": json.loads(p), "created_at": t, "attempts": a,
+             "status": ("delivered" if w else "recorded") if d else "failed" if a >= MAX_ATTEMPTS else "pending",
+             "delivered_at": d, "error": e}
+            for i, r, w, p, t, a, d, e in rows]
+
+
+# -----------------------------
+# Background evaluator
+# -----------------------------
+def run_once():
+    """One evaluator pass; returns True when there may be more work queued."""
+    read, _ = evaluate_changed()
+    pending, _ = evaluate_pending()
+    sent = deliver_due()
+    return read >= EVAL_BATCH or pending >= PENDING_BATCH or sent >= DELIVERY_BATCH
+
+
+_started = False
+
+
+def _lead_and_evaluate():
+    lock = open(LOCK_PATH, "w")
+    while True:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            break
+        except OSError:
+            time.sleep(60)
+    next_touch = 0.0
+    while True:
+        busy = False
+        try:
+            if time.time() >= next_touch:
+                touch_rule_cells()
+                next_touch = time.time() + TOUCH_S
+            with priority(PREFETCH):
+                busy = run_once()
+        except Exception as e:
+            print("alert evaluation failed:", repr(e))
+        time.sleep(1.0 if busy else EVAL_POLL_S)
+
+
+def start_alert_engine():
+    """Start the evaluator thread once per process (LEO_PREWARM=0 disables it too)."""
+    global _started
+    if _started or os.getenv("LEO_PREWARM", "1") == "0":
+        return
+    _started = True
+    threading.Thread(target=_lead_and_evaluate, name="leo-alerts", daemon=True).start()
@@ -0,0 +1,241 @@
+# backend/utils/cost_model.py
+"""
+Monte Carlo cost/benefit model behind /api/cost-savings.
+
+A scenario gives a distribution for each of
+
+  damage_without   mean damage per incident without early warning ($)
+  damage_with      mean damage per incident with it ($)
+  success          fraction of incidents where the warning works
+  annual           incidents per year
+
+as {"dist": ..., params}:
+
+  fixed       value
+  uniform     low, high
+  triangular  low, mode, high
+  normal      mean, sd                (clipped at 0)
+  lognormal   mean, sigma             (mean of the distribution, log-space sigma)
+  beta        mean, sd                (for fractions)
+  poisson     mean                    (counts)
+
+Each draw samples the damages and success once and the incident count for
+every year of the horizon, so
+
+  savings[year] = incidents[year] * (damage_without - damage_with) * success
+
+summed over scenarios. Draws run in CHUNK-sized blocks of one seeded
+Generator, so the bands are reproducible and keyed by a hash of the
+parameters; results are kept in the shared response cache.
+"""
+import hashlib
+import json
+import math
+
+import numpy as np
+
+MODEL_VERSION = 1
+DEFAULT_DRAWS = 1_000_000
+MAX_DRAWS = 5_000_000
+CHUNK = 200_000
+PERCENTILES = (5, 25, 50, 75, 95)
+RESULT_TTL_S = 7 * 86400
+
+DEFAULT_PARAMS = {
+    "scenarios": {
+        "wildfire_prevention": {
+            "damage_without": {"dist": "lognormal", "mean": 50_000_000, "sigma": 0.8},
+            "damage_with": {"dist": "lognormal", "mean": 5_000_000, "sigma": 0.8},
+            "success": {"dist": "beta", "mean": 0.85, "sd": 0.08},
+            "annual": {"dist": "poisson", "mean": 100},
+        },
+        "flood_prevention": {
+            "damage_without": {"dist": "lognormal", "mean": 25_000_000, "sigma": 0.7},
+            "damage_with": {"dist": "lognormal", "mean": 2_500_000, "sigma": 0.7},
+            "success": {"dist": "beta", "mean": 0.75, "sd": 0.1},
+            "annual": {"dist": "poisson", "mean": 150},
+        },
+    },
+    "system_cost": 100_000_000,
+    "discount_rate": 0.05,
+    "years": 5,
+}
+
+FIELDS = ("damage_without", "damage_with", "success", "annual")
+
+
+def _beta_ab(mean, sd):
+    var = sd * sd
+    if not (0 < mean < 1) or not (0 < var < mean * (1 - mean)):
+        raise ValueError("beta needs 0 < mean < 1 and 0 < sd^2 < mean * (1 - mean)")
+    k = mean * (1 - mean) / var - 1
+    return mean * k, (1 - mean) * k
+
+
+def dist_mean(d):
+    kind = d.get("dist")
+    if kind == "fixed":
+        return float(d["value"])
+    if kind == "uniform":
+        return (d["low"] + d["high"]) / 2.0
+    if kind == "triangular":
+        return (d["low"] + d["mode"] + d["high"]) / 3.0
+    if kind in ("normal", "lognormal", "beta", "poisson"):
+        return float(d["mean"])
+    raise ValueError(f"unknown distribution {kind!r}")
+
+
+def sample(rng, d, size):
+    kind = d.get("dist")
+    if kind == "fixed":
+        return np.full(size, float(d["value"]))
+    if kind == "uniform":
+        return rng.uniform(d["low"], d["high"], size)
+    if kind == "triangular":
+        return rng.triangular(d["low"], d["mode"], d["high"], size)
+    if kind == "normal":
+        return np.maximum(rng.normal(d["mean"], d["sd"], size), 0.0)
+    if kind == "lognormal":
+        s = float(d["sigma"])
+        return rng.lognormal(math.log(d["mean"]) - s * s / 2.0, s, size)
+    if kind == "beta":
+        return rng.beta(*_beta_ab(d["mean"], d["sd"]), size)
+    if kind == "poisson":
+        return rng.poisson(d["mean"], size).astype(float)
+    raise ValueError(f"unknown distribution {kind!r}")
+
+
+def merge_params(overrides):
+    """DEFAULT_PARAMS with a request's overrides merged in per scenario field; raises ValueError."""
+    params = json.loads(json.dumps(DEFAULT_PARAMS))
+    for k, v in (overrides or {}).items():
+        if k == "scenarios":
+            if not isinstance(v, dict) or not all(isinstance(sc, dict) for sc in v.values()):
+                raise ValueError("scenarios must be {name: {field: distribution}}")
+            for name, sc in v.items():
+                params["scenarios"][name] = {**params["scenarios"].get(name, {}), **sc}
+        elif k in params:
+            params[k] = v
+        else:
+            raise ValueError(f"unknown parameter {k!r}")
+    for name, sc in params["scenarios"].items():
+        missing = [f for f in FIELDS if f not in sc]
+        if missing:
+            raise ValueError(f"scenario {name!r} needs {', '.join(missing)}")
+        for f in FIELDS:
+            try:
+                dist_mean(sc[f])
+                sample(np.random.default_rng(0), sc[f], 1)    # rejects bad parameters up front
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"{name}.{f}: {e!r}")
+    params["years"] = _number(params, "years", 1, 30, int)
+    params["system_cost"] = _number(params, "system_cost", 0.0, math.inf)
+    params["discount_rate"] = _number(params, "discount_rate", 0.0, 1.0)
+    return params
+
+
+def _number(params, key, lo, hi, cast=float):
+    try:
+        if isinstance(params[key], bool):
+            raise TypeError
+        v = cast(params[key])
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{key} must be a number")
+    if not (math.isfinite(v) and lo <= v <= hi):
+        raise ValueError(f"{key} must be {lo}..{hi}" if math.isfinite(hi) else f"{key} must be >= {lo}")
+    return v
+
+
+def params_hash(params, draws, seed):
+    blob = json.dumps([MODEL_VERSION, params, draws, seed], sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def point_estimate(params):
+    """The old expected-value figures, from the distribution means."""
+    total = 0.0
+    details = {}
+    for name, sc in params["scenarios"].items():
+        per = (dist_mean(sc["damage_without"]) - dist_mean(sc["damage_with"])) * dist_mean(sc["success"])
+        ann = per * dist_mean(sc["annual"])
+        total += ann
+        details[name] = {"savings_per_incident": per, "annual_savings": ann,
+                         "success_rate": dist_mean(sc["success"])}
+    cost = float(params["system_cost"])
+    years = int(params["years"])
+    return total, details, {
+        "system_cost": cost,
+        "payback_period_months": round(cost / total * 12, 1) if total > 0 else None,
+        "years": years,
+        "net_benefit": total * years - cost,
+        "5_year_net_benefit": total * 5 - cost,   # fixed horizon, kept for existing clients
+    }
+
+
+def simulate(params, draws=DEFAULT_DRAWS, seed=0):
+    """Per-draw arrays: annual savings, payback months, NPV, and {scenario: annual savings}."""
+    rng = np.random.default_rng(seed)
+    years = int(params["years"])
+    cost = float(params["system_cost"])
+    disc = (1.0 + float(params["discount_rate"])) ** -np.arange(1, years + 1)
+    annual = np.empty(draws)
+    npv = np.empty(draws)
+    per_scenario = {name: np.empty(draws) for name in params["scenarios"]}
+    for a in range(0, draws, CHUNK):
+        n = min(CHUNK, draws - a)
+        total = np.zeros((n, years))
+        for name, sc in params["scenarios"].items():
+            per = ((sample(rng, sc["damage_without"], n) - sample(rng, sc["damage_with"], n))
+                   * np.clip(sample(rng, sc["success"], n), 0.0, 1.0))
+            s = sample(rng, sc["annual"], (n, years)) * per[:, None]
+            per_scenario[name][a:a + n] = s.mean(axis=1)
+            total += s
+        annual[a:a + n] = total.mean(axis=1)
+        npv[a:a + n] = total @ disc - cost
+    with np.errstate(divide="ignore"):
+        payback = np.where(annual > 0, cost / annual * 12.0, np.inf)
+    return annual, payback, npv, per_scenario
+
+
+def bands(x, digits=0):
+    q = np.percentile(x, PERCENTILES, method="nearest")
+    out = {f"p{p}": (round(float(v), digits) if np.isfinite(v) else None) for p, v in zip(PERCENTILES, q)}
+    finite = x[np.isfinite(x)]
+    out["mean"] = round(float(finite.mean()), digits) if finite.size == x.size else None
+    return out
+
+
+def run(params, draws=DEFAULT_DRAWS, seed=0):
+    annual, payback, npv, per_scenario = simulate(params, draws, seed)
+    return {
+        "draws": draws,
+        "seed": seed,
+        "years": int(params["years"]),
+        "discount_rate": float(params["discount_rate"]),
+        "annual_savings": bands(annual),
+        "payback_period_months": bands(payback, 1),
+        "npv": bands(npv),
+        "probability_npv_positive": round(float((npv > 0).mean()), 4),
+        "scenarios": {name: {"annual_savings": bands(v)} for name, v in per_scenario.items()},
+    }
+
+
+def cached_run(params, draws=DEFAULT_DRAWS, seed=0):
+    """run() through the shared cache, keyed by the parameter hash; returns (result, cached)."""
+    from utils.shared_cache import get_cache
+    key = "cost-model:" + params_hash(params, draws, seed)
+    cache = get_cache()
+    if cache is not None:
+        try:
+            hit = cache.get(key)
+            if hit:
+                return json.loads(hit[0]), True
+        except Exception:
+            pass
+    result = run(params, draws, seed)
+    if cache is not None:
+        try:
+            cache.set(key, "cost-model", json.dumps(result).encode("utf-8"), RESULT_TTL_S)
+        except Exception:
+            pass
+    return result, False
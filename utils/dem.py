@@ -0,0 +1,238 @@
+# backend/utils/dem.py
+"""
+Terrain indexes for the flood model, read from a local DEM tile set.
+
+LEO_DEM_DIR holds one tile per pair of files:
+
+  <name>.npy    2-D elevation in metres, row 0 at the north edge
+  <name>.json   {"west": .., "south": .., "east": .., "north": .., "nodata": optional}
+
+`python -m utils.dem build` precomputes, once per tile,
+
+  <name>.d8.npy    D8 flow direction (0 = sink/edge, 1..8 index into OFFSETS)
+  <name>.acc.npy   flow accumulation in cells (the cell itself included)
+  <name>.hand.npy  height above nearest drainage in metres
+
+Requests only open the arrays with mmap_mode="r" and index them, so no
+terrain work happens per request and forked workers share the page cache.
+Tiles should be hydrologically conditioned (depressions filled) upstream;
+unfilled pits simply become their own drainage.
+"""
+import json
+import math
+import os
+
+import numpy as np
+
+DEFAULT_DEM_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "dem")
+
+# Cells draining at least this many cells count as channel for HAND
+STREAM_CELLS = int(os.getenv("LEO_DEM_STREAM_CELLS", "100"))
+
+# (drow, dcol) for D8 codes 1..8
+OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+_DR = np.array([0] + [o[0] for o in OFFSETS])
+_DC = np.array([0] + [o[1] for o in OFFSETS])
+
+DERIVED = ("d8", "acc", "hand")
+
+
+# -----------------------------
+# Precompute
+# -----------------------------
+def cell_size_m(bounds, shape):
+    """(dx, dy) of one cell in metres at the tile's mid latitude."""
+    west, south, east, north = bounds
+    rows, cols = shape
+    dy = (north - south) / rows * 111320.0
+    dx = (east - west) / cols * 111320.0 * math.cos(math.radians((north + south) / 2.0))
+    return dx, dy
+
+
+def d8_directions(z, dx, dy):
+    """Steepest-descent neighbour code per cell; 0 where nothing is lower."""
+    rows, cols = z.shape
+    zp = np.pad(z, 1, constant_values=np.nan)
+    best = np.zeros(z.shape, dtype=np.float32)
+    code = np.zeros(z.shape, dtype=np.uint8)
+    for k, (dr, dc) in enumerate(OFFSETS, start=1):
+        zn = zp[1 + dr:1 + dr + rows, 1 + dc:1 + dc + cols]
+        with np.errstate(invalid="ignore"):
+            drop = (z - zn) / math.hypot(dr * dy, dc * dx)
+            better = drop > best          # NaN (nodata, off-tile) never wins
+        best[better] = drop[better]
+        code[better] = k
+    return code
+
+
+def downstream_index(code):
+    """Flat index of each cell's receiver; sinks point to themselves."""
+    rows, cols = code.shape
+    r = np.arange(rows)[:, None] + _DR[code]
+    c = np.arange(cols)[None, :] + _DC[code]
+    return (r * cols + c).ravel()
+
+
+def flow_accumulation(down):
+    """
+    Cells draining through each cell. Kahn's topological order in batched
+    rounds: every round pushes the whole frontier of finished cells one step
+    downstream, so the loop runs once per step of the longest flow path.
+    """
+    n = down.size
+    own = np.arange(n)
+    flows = down != own
+    acc = np.ones(n, dtype=np.float64)
+    indeg = np.bincount(down[flows], minlength=n)
+    frontier = np.flatnonzero(flows & (indeg == 0))
+    while frontier.size:
+        tgt = down[frontier]
+        np.add.at(acc, tgt, acc[frontier])
+        np.subtract.at(indeg, tgt, 1)
+        cand = np.unique(tgt)
+        frontier = cand[flows[cand] & (indeg[cand] == 0)]
+    return acc
+
+
+def height_above_drainage(z, down, acc, stream_cells=STREAM_CELLS):
+    """Elevation above the first channel cell (or pit) reached downstream, by pointer jumping."""
+    n = down.size
+    target = np.where(acc >= stream_cells, np.arange(n), down)
+    for _ in range(64):
+        nxt = target[target]
+        if np.array_equal(nxt, target):
+            break
+        target = nxt
+    flat = z.ravel()
+    return np.maximum(flat - flat[target], 0.0).reshape(z.shape)
+
+
+def _save(path, arr):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+
+def build_tile(stem, stream_cells=STREAM_CELLS):
+    """Compute and persist d8/acc/hand next to <stem>.npy."""
+    with open(stem + ".json") as f:
+        meta = json.load(f)
+    z = np.load(stem + ".npy").astype(np.float32)
+    if meta.get("nodata") is not None:
+        z[z == meta["nodata"]] = np.nan
+    bounds = (meta["west"], meta["south"], meta["east"], meta["north"])
+    dx, dy = cell_size_m(bounds, z.shape)
+    code = d8_directions(z, dx, dy)
+    down = downstream_index(code)
+    acc = flow_accumulation(down)
+    hand = height_above_drainage(z, down, acc, stream_cells)
+    _save(stem + ".d8.npy", code)
+    _save(stem + ".acc.npy", acc.reshape(z.shape).astype(np.float32))
+    _save(stem + ".hand.npy", hand.astype(np.float32))
+    return {"tile": os.path.basename(stem), "shape": list(z.shape),
+            "cell_m": [round(dx, 1), round(dy, 1)], "max_acc": int(acc.max())}
+
+
+def tile_stems(root):
+    if not os.path.isdir(root):
+        return []
+    return sorted(os.path.join(root, n[:-5]) for n in os.listdir(root)
+                  if n.endswith(".json") and os.path.exists(os.path.join(root, n[:-5] + ".npy")))
+
+
+# -----------------------------
+# Lookup
+# -----------------------------
+class DemTile:
+    def __init__(self, stem):
+        with open(stem + ".json") as f:
+            meta = json.load(f)
+        self.name = os.path.basename(stem)
+        self.bounds = (meta["west"], meta["south"], meta["east"], meta["north"])
+        self.nodata = meta.get("nodata")
+        self.elevation = np.load(stem + ".npy", mmap_mode="r")
+        self.layers = {k: np.load(f"{stem}.{k}.npy", mmap_mode="r") for k in DERIVED}
+        dx, dy = cell_size_m(self.bounds, self.elevation.shape)
+        self.cell_km2 = dx * dy / 1e6
+
+    def rowcol(self, lats, lons):
+        """Pixel indexes and an inside-tile mask."""
+        west, south, east, north = self.bounds
+        rows, cols = self.elevation.shape
+        r = np.floor((north - lats) / (north - south) * rows).astype(np.int64)
+        c = np.floor((lons - west) / (east - west) * cols).astype(np.int64)
+        inside = (r >= 0) & (r < rows) & (c >= 0) & (c < cols)
+        return np.clip(r, 0, rows - 1), np.clip(c, 0, cols - 1), inside
+
+
+class DemSet:
+    def __init__(self, root):
+        self.root = root
+        self.tiles = []
+        for stem in tile_stems(root):
+            if all(os.path.exists(f"{stem}.{k}.npy") for k in DERIVED):
+                self.tiles.append(DemTile(stem))
+
+    def sample(self, lats, lons):
+        """Terrain index arrays at the points (NaN outside every tile)."""
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        shape = np.broadcast(lats, lons).shape
+        lats, lons = np.broadcast_to(lats, shape), np.broadcast_to(lons, shape)
+        out = {k: np.full(shape, np.nan) for k in ("elevation_m", "hand_m", "upstream_km2")}
+        todo = np.ones(shape, dtype=bool)
+        for t in self.tiles:
+            r, c, inside = t.rowcol(lats, lons)
+            hit = inside & todo
+            if not hit.any():
+                continue
+            rr, cc = r[hit], c[hit]
+            elev = np.asarray(t.elevation[rr, cc], dtype=float)
+            if t.nodata is not None:
+                elev[elev == t.nodata] = np.nan
+            out["elevation_m"][hit] = elev
+            out["hand_m"][hit] = np.where(np.isnan(elev), np.nan, t.layers["hand"][rr, cc])
+            out["upstream_km2"][hit] = np.where(np.isnan(elev), np.nan,
+                                                t.layers["acc"][rr, cc] * t.cell_km2)
+            todo &= ~hit
+        return out
+
+
+_dem = None
+
+
+def get_dem():
+    global _dem
+    if _dem is None:
+        _dem = DemSet(os.getenv("LEO_DEM_DIR", DEFAULT_DEM_DIR))
+    return _dem
+
+
+def terrain_at(lat, lon):
+    """Scalar terrain indexes for one point, or None without DEM coverage."""
+    dem = get_dem()
+    if not dem.tiles:
+        return None
+    s = dem.sample(lat, lon)
+    if np.isnan(s["hand_m"]):
+        return None
+    return {k: float(v) for k, v in s.items()}
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Precompute flood terrain indexes for a DEM tile set")
+    ap.add_argument("command", choices=("build", "info"))
+    ap.add_argument("--dir", default=os.getenv("LEO_DEM_DIR", DEFAULT_DEM_DIR))
+    ap.add_argument("--stream-cells", type=int, default=STREAM_CELLS)
+    args = ap.parse_args()
+    stems = tile_stems(args.dir)
+    if not stems:
+        raise SystemExit(f"no <name>.npy + <name>.json tiles in {args.dir}")
+    for stem in stems:
+        if args.command == "build":
+            print(json.dumps(build_tile(stem, args.stream_cells)))
+        else:
+            built = all(os.path.exists(f"{stem}.{k}.npy") for k in DERIVED)
+            print(f"{os.path.basename(stem)}: {'built' if built else 'not built'}")
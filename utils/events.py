@@ -0,0 +1,120 @@
+# backend/utils/events.py
+"""
+In-process publish/subscribe for Server-Sent Events.
+
+Subscribers hold a bounded queue per connection. Sources are functions
+registered for a topic prefix ("task:", "risk:"); one pump thread per
+process calls each source once per interval for every topic that has at
+least one subscriber and publishes the result only when it changed, so a
+single upstream refresh is fanned out to every listener of that topic.
+"""
+from collections import defaultdict
+import queue
+import threading
+import time
+
+
+class Subscription:
+    def __init__(self, broker, topics, maxsize=64):
+        self.broker = broker
+        self.topics = list(topics)
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def get(self, timeout=None):
+        """(topic, data) or None on timeout."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    def __init__(self):
+        self._subs = defaultdict(set)
+        self._last = {}
+        self._sources = {}            # prefix -> [fn, interval_s, next_due]
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pump = None
+
+    # -- subscribers --
+    def subscribe(self, topics):
+        sub = Subscription(self, topics)
+        with self._lock:
+            for t in sub.topics:
+                self._subs[t].add(sub)
+                if t in self._last:
+                    sub.queue.put_nowait((t, self._last[t]))
+        self._ensure_pump()
+        self.wake()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            for t in sub.topics:
+                subs = self._subs.get(t)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subs[t]
+                        self._last.pop(t, None)
+
+    def active_topics(self, prefix=""):
+        with self._lock:
+            return [t for t in self._subs if t.startswith(prefix)]
+
+    def publish(self, topic, data):
+        """Fan `data` out to the topic's subscribers unless it equals the last value."""
+        with self._lock:
+            if self._last.get(topic) == data:
+                return False
+            self._last[topic] = data
+            subs = list(self._subs.get(topic, ()))
+        for sub in subs:
+            try:
+                sub.queue.put_nowait((topic, data))
+            except queue.Full:
+                pass   # slow client; it will get the next change
+        return True
+
+    # -- sources --
+    def add_source(self, prefix, fn, interval_s):
+        """fn(topic) -> JSON-able value (or None to skip) for every active topic with prefix."""
+        self._sources[prefix] = [fn, interval_s, 0.0]
+
+    def wake(self, prefix=None):
+        """Make sources run now (all, or just the one for `prefix`)."""
+        for p, src in self._sources.items():
+            if prefix is None or p == prefix:
+                src[2] = 0.0
+        self._wake.set()
+
+    def _ensure_pump(self):
+        if self._pump is None or not self._pump.is_alive():
+            self._pump = threading.Thread(target=self._run, name="leo-events", daemon=True)
+            self._pump.start()
+
+    def _run(self):
+        while True:
+            now = time.time()
+            next_due = now + 5.0
+            for prefix, src in list(self._sources.items()):
+                fn, interval, due = src
+                if due <= now:
+                    for topic in self.active_topics(prefix):
+                        try:
+                            data = fn(topic)
+                        except Exception:
+                            data = None
+                        if data is not None:
+                            self.publish(topic, data)
+                    src[2] = due = time.time() + interval
+                next_due = min(next_due, due)
+            self._wake.wait(max(0.05, next_due - time.time()))
+            self._wake.clear()
+
+
+broker = Broker()
@@ -0,0 +1,488 @@
+# backend/utils/feature_store.py
+"""
+Materialized per-cell features shared by every risk endpoint.
+
+The world is cut into CELL_DEG grid cells and hourly buckets. A record is
+one float32 vector in FEATURES order (NaN = unavailable) plus a small meta
+JSON (which providers answered, when each source was last computed, the NWS
+grid URL), stored in the shared state DB so every worker reads the same
+numbers. Features are computed at the cell centre from the same cached
+provider calls the endpoints used to make themselves, so
+/api/wildfire-risk, /api/flood-risk, /api/crop-health and /api/ai/predict
+agree for a location.
+
+Callers name the sources they need (WILDFIRE_SOURCES, ...). A read
+computes inline only those that are missing or stale and merges them into
+the cell's record, so a risk click never waits on the CDSE NDVI call. A
+source that fails (shed, past the deadline, 429/5xx, network) is left out
+of the merge: the cell keeps its previous values and the source stays due,
+so the next read retries it. aget_features() is the asyncio twin used by
+asgi.py; its sources are awaited together on utils.upstream.afetch. A
+background refresher (one per host, like the prewarmer) recomputes the
+sources of cells read within ACTIVE_S before they go stale, oldest first
+and a few per pass, and drops old buckets. Reads record access at most
+once per TOUCH_EVERY_S per cell and process.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import fcntl
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from utils.ratelimit import PREFETCH, priority
+from utils.state_db import state_db
+
+FEATURES = (
+    "temperature",      # degC, 24 h mean (NWS)
+    "humidity",         # %, 24 h mean (NWS)
+    "wind",             # km/h, 24 h mean (NWS)
+    "rain_6h",          # mm QPF (NWS)
+    "rain_24h",
+    "rain_72h",
+    "soil_moisture",    # volumetric %, 3-9 cm, 24 h mean (open-meteo)
+    "vpd",              # kPa, 24 h mean (open-meteo)
+    "ndvi",             # 30-day Sentinel-2 mosaic over the whole cell (CDSE)
+    "detections_24h",   # FIRMS detections in the 1 deg box
+    "firms_risk",       # distance-weighted FIRMS proxy at the cell centre
+)
+INDEX = {n: i for i, n in enumerate(FEATURES)}
+
+CELL_DEG = float(os.getenv("LEO_FEATURE_CELL_DEG", "0.05"))
+BUCKET_S = 3600
+FRESH_S = float(os.getenv("LEO_FEATURE_FRESH_S", "900"))
+ACTIVE_S = 6 * 3600
+KEEP_BUCKETS = 48
+REFRESH_AT = 0.8
+REFRESH_BATCH = 20
+REFRESH_POLL_S = 30.0
+TOUCH_EVERY_S = 600.0       # per process; well under ACTIVE_S
+
+LOCK_PATH = os.path.join(tempfile.gettempdir(), "leo_features.lock")
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feature_cells (
+    cy INTEGER NOT NULL,
+    cx INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    vals BLOB NOT NULL,
+    meta TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (cy, cx, bucket)
+);
+CREATE INDEX IF NOT EXISTS feature_cells_updated ON feature_cells (updated_at);
+CREATE TABLE IF NOT EXISTS feature_access (
+    cy INTEGER NOT NULL,
+    cx INTEGER NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (cy, cx)
+);
+"""
+
+
+def _db():
+    return state_db(_SCHEMA)
+
+
+def cell_of(lat, lon):
+    return math.floor(lat / CELL_DEG), math.floor(lon / CELL_DEG)
+
+
+def cell_center(cy, cx):
+    return (cy + 0.5) * CELL_DEG, (cx + 0.5) * CELL_DEG
+
+
+class FeatureRecord:
+    def __init__(self, cell, values, meta, updated_at):
+        self.cell = cell
+        self.values = values
+        self.meta = meta
+        self.updated_at = updated_at
+
+    def get(self, name):
+        v = float(self.values[INDEX[name]])
+        return None if math.isnan(v) else v
+
+    def as_dict(self):
+        return {n: self.get(n) for n in FEATURES}
+
+    def nws_summary(self):
+        """(precip_mm, rh, wind, temp, grid_url) for the 24 h window."""
+        return (self.get("rain_24h"), self.get("humidity"), self.get("wind"),
+                self.get("temperature"), self.meta.get("grid_url"))
+
+
+# -----------------------------
+# Sources (cell centre, cached provider calls)
+# -----------------------------
+def _nws_features(series):
+    q = "quantitativePrecipitation"
+    return {
+        "temperature": series.mean("temperature", 24),
+        "humidity": series.mean("relativeHumidity", 24),
+        "wind": series.mean("windSpeed", 24),
+        "rain_6h": series.total(q, 6),
+        "rain_24h": series.total(q, 24),
+        "rain_72h": series.total(q, 72),
+    }, {"grid_url": series.grid_url}
+
+
+def _src_nws(lat, lon):
+    from utils.nws_grid import get_grid
+    return _nws_features(get_grid(lat, lon))
+
+
+async def _asrc_nws(lat, lon):
+    from utils.nws_grid import aget_grid
+    return _nws_features(await aget_grid(lat, lon))
+
+
+def _firms_features(lat, lon, rows):
+    from utils.risk_grid import firms_arrays, firms_risk
+    if rows is None:
+        return {}, {}
+    risk = float(firms_risk(lat, lon, firms_arrays(rows))) if rows else 0.0
+    return {"detections_24h": len(rows), "firms_risk": risk}, {"firms": True}
+
+
+def _src_firms(lat, lon):
+    from routes.predictions import load_firms_rows
+    return _firms_features(lat, lon, load_firms_rows(lat, lon))
+
+
+async def _asrc_firms(lat, lon):
+    from routes.predictions import aload_firms_rows
+    return _firms_features(lat, lon, await aload_firms_rows(lat, lon))
+
+
+def _open_meteo_params(lat, lon):
+    return {"latitude": round(lat, 2), "longitude": round(lon, 2),
+            "hourly": "soil_moisture_3_to_9cm,vapour_pressure_deficit",
+            "forecast_days": 1, "timezone": "UTC"}
+
+
+def _open_meteo_features(j):
+    h = j.get("hourly", {})
+
+    def mean(k):
+        a = np.array([np.nan if v is None else v for v in h.get(k, [])[:24]], dtype=float)
+        return float(np.nanmean(a)) if np.isfinite(a).any() else None
+
+    sm = mean("soil_moisture_3_to_9cm")
+    return {"soil_moisture": None if sm is None else sm * 100.0,
+            "vpd": mean("vapour_pressure_deficit")}, {"open_meteo": True}
+
+
+def _src_open_meteo(lat, lon):
+    from utils.upstream import fetch
+    return _open_meteo_features(fetch("open-meteo", OPEN_METEO_URL, timeout=6, params=_open_meteo_params(lat, lon)))
+
+
+async def _asrc_open_meteo(lat, lon):
+    from utils.upstream import afetch
+    return _open_meteo_features(await afetch("open-meteo", OPEN_METEO_URL, timeout=6,
+                                             params=_open_meteo_params(lat, lon)))
+
+
+def _src_ndvi(lat, lon):
+    from routes.predictions import get_cdse_token_inline, ndvi_from_sentinel_inline, crop_window
+    token = get_cdse_token_inline()
+    if not token:
+        return {}, {}
+    ndvi = ndvi_from_sentinel_inline(*crop_window(lat, lon, CELL_DEG / 2.0), token)
+    return {"ndvi": ndvi}, {"cdse": ndvi is not None}
+
+
+async def _asrc_ndvi(lat, lon):
+    from routes.predictions import aget_cdse_token, andvi_from_sentinel, crop_window
+    token = await aget_cdse_token()
+    if not token:
+        return {}, {}
+    ndvi = await andvi_from_sentinel(*crop_window(lat, lon, CELL_DEG / 2.0), token)
+    return {"ndvi": ndvi}, {"cdse": ndvi is not None}
+
+
+# name -> (function, features it fills)
+SOURCES = {
+    "nws": (_src_nws, ("temperature", "humidity", "wind", "rain_6h", "rain_24h", "rain_72h")),
+    "firms": (_src_firms, ("detections_24h", "firms_risk")),
+    "open_meteo": (_src_open_meteo, ("soil_moisture", "vpd")),
+    "ndvi": (_src_ndvi, ("ndvi",)),
+}
+# name -> non-blocking twin on utils.upstream.afetch (asgi.py)
+ASYNC_SOURCES = {"nws": _asrc_nws, "firms": _asrc_firms, "open_meteo": _asrc_open_meteo, "ndvi": _asrc_ndvi}
+WILDFIRE_SOURCES = ("nws", "firms")
+FLOOD_SOURCES = ("nws",)
+AI_SOURCES = ("nws", "open_meteo")
+CROP_SOURCES = ("ndvi",)
+
+
+def _failed(e):
+    """True when a source error says nothing about the cell (shed, deadline, 429, 5xx, network)."""
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    if status is None or status == 429 or status >= 500:
+        print("feature source failed:", repr(e))
+        return True
+    return False        # a 4xx answer (e.g. NWS outside the US) means the source has no data here
+
+
+def _run_source(fn, lat, lon):
+    """fn's (values, meta), or None when it failed and the cell's old values should stand."""
+    try:
+        return fn(lat, lon)
+    except Exception as e:
+        return None if _failed(e) else ({}, {})
+
+
+async def _arun_source(fn, lat, lon):
+    try:
+        return await fn(lat, lon)
+    except Exception as e:
+        return None if _failed(e) else ({}, {})
+
+
+def _collect(sources, results):
+    values, meta, done = {}, {}, []
+    for name, res in zip(sources, results):
+        if res is None:
+            continue
+        vals, m = res
+        for k in SOURCES[name][1]:
+            values[k] = vals.get(k)
+        meta.update(m)
+        done.append(name)
+    return values, meta, tuple(done)
+
+
+def compute_cell(cy, cx, sources=tuple(SOURCES)):
+    """
+    ({feature: value or None}, meta, sources that answered) for a cell; the
+    sources run in parallel and a failed one contributes nothing.
+    """
+    lat, lon = cell_center(cy, cx)
+    with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+        # each source runs in a copy of the caller's context (refresh flag, priority, deadline)
+        futures = [pool.submit(contextvars.copy_context().run, _run_source, SOURCES[name][0], lat, lon)
+                   for name in sources]
+        return _collect(sources, [f.result() for f in futures])
+
+
+async def acompute_cell(cy, cx, sources=tuple(SOURCES)):
+    """compute_cell() with the sources awaited together on the event loop."""
+    import asyncio
+    lat, lon = cell_center(cy, cx)
+    return _collect(sources, await asyncio.gather(*(_arun_source(ASYNC_SOURCES[name], lat, lon)
+                                                    for name in sources)))
+
+
+# -----------------------------
+# Store
+# -----------------------------
+def _record(cy, cx, row):
+    vals, meta, updated_at = row
+    return FeatureRecord((cy, cx), np.frombuffer(vals, dtype=np.float32), json.loads(meta), updated_at)
+
+
+def _latest(c, cy, cx):
+    return c.execute("SELECT vals, meta, updated_at FROM feature_cells WHERE cy = ? AND cx = ? "
+                     "ORDER BY bucket DESC LIMIT 1", (cy, cx)).fetchone()
+
+
+def _default_sources(cy, cx, sources):
+    if sources is None:
+        rec = read_cell(cy, cx)
+        sources = tuple((rec.meta.get("computed") if rec else None) or SOURCES)
+    return sources
+
+
+def _store(cy, cx, values, meta, done):
+    """
+    Merge the sources that answered into the cell's latest record. The
+    merge re-reads the record inside the write transaction, so concurrent
+    refreshes of different sources keep each other's values; sources that
+    failed keep their old values and computed time, so the next read
+    retries them.
+    """
+    if not done:
+        rec = read_cell(cy, cx)
+        return rec or FeatureRecord((cy, cx), np.full(len(FEATURES), np.nan, dtype=np.float32), {}, time.time())
+    now = time.time()
+    c = _db()
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        row = _latest(c, cy, cx)
+        if row is None:
+            vec, merged = np.full(len(FEATURES), np.nan, dtype=np.float32), {}
+        else:
+            vec, merged = np.frombuffer(row[0], dtype=np.float32).copy(), json.loads(row[1])
+        for k, v in values.items():
+            vec[INDEX[k]] = np.nan if v is None else v
+        merged.update(meta)
+        merged["computed"] = {**merged.get("computed", {}), **{name: now for name in done}}
+        c.execute(
+            "INSERT OR REPLACE INTO feature_cells (cy, cx, bucket, vals, meta, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (cy, cx, int(now // BUCKET_S), vec.tobytes(), json.dumps(merged), now))
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK")
+        raise
+    return FeatureRecord((cy, cx), vec, merged, now)
+
+
+def refresh_cell(cy, cx, sources=None):
+    """Recompute `sources` (default: those the record already has, else all) and merge them into the cell."""
+    return _store(cy, cx, *compute_cell(cy, cx, _default_sources(cy, cx, sources)))
+
+
+async def arefresh_cell(cy, cx, sources=None):
+    return _store(cy, cx, *await acompute_cell(cy, cx, _default_sources(cy, cx, sources)))
+
+
+def read_cell(cy, cx):
+    row = _latest(_db(), cy, cx)
+    return None if row is None else _record(cy, cx, row)
+
+
+def stale_sources(rec, sources, now=None):
+    """Those of `sources` the record lacks or computed FRESH_S or more ago."""
+    now = time.time() if now is None else now
+    computed = rec.meta.get("computed", {}) if rec is not None else {}
+    return tuple(s for s in sources if now - computed.get(s, 0.0) >= FRESH_S)
+
+
+_touched = {}   # (cy, cx) -> last feature_access write from this process
+
+
+def _touch(cy, cx, now):
+    if now - _touched.get((cy, cx), 0.0) < TOUCH_EVERY_S:
+        return
+    if len(_touched) > 100000:
+        _touched.clear()
+    _touched[(cy, cx)] = now
+    _db().execute("INSERT OR REPLACE INTO feature_access (cy, cx, accessed_at) VALUES (?, ?, ?)", (cy, cx, now))
+
+
+def _read(lat, lon, sources):
+    cy, cx = cell_of(lat, lon)
+    now = time.time()
+    _touch(cy, cx, now)
+    rec = read_cell(cy, cx)
+    return cy, cx, rec, stale_sources(rec, sources, now)
+
+
+def get_features(lat, lon, sources=WILDFIRE_SOURCES):
+    """
+    FeatureRecord for the cell holding (lat, lon) with `sources` current:
+    any of them missing or stale is computed inline and merged. Other
+    features are whatever the record already holds (maybe stale or NaN).
+    """
+    cy, cx, rec, due = _read(lat, lon, sources)
+    return refresh_cell(cy, cx, due) if due else rec
+
+
+async def aget_features(lat, lon, sources=WILDFIRE_SOURCES):
+    """get_features() with the due sources fetched through upstream.afetch."""
+    cy, cx, rec, due = _read(lat, lon, sources)
+    return await arefresh_cell(cy, cx, due) if due else rec
+
+
+def updated_since(since, limit=1000):
+    """Records written after `since`, oldest write first (change feed for utils.alerts)."""
+    rows = _db().execute(
+        "SELECT cy, cx, vals, meta, updated_at FROM feature_cells WHERE updated_at > ? "
+        "ORDER BY updated_at LIMIT ?", (since, limit)).fetchall()
+    return [_record(row[0], row[1], row[2:]) for row in rows]
+
+
+def touch_cells(cells):
+    """Count (cy, cx) cells as read now, so the refresher keeps them current."""
+    now = time.time()
+    _db().executemany("INSERT OR REPLACE INTO feature_access (cy, cx, accessed_at) VALUES (?, ?, ?)",
+                      [(cy, cx, now) for cy, cx in cells])
+
+
+# -----------------------------
+# Background refresh
+# -----------------------------
+def refresh_due(limit=REFRESH_BATCH):
+    """Recompute the sources about to go stale in up to `limit` recently read cells; returns cells done."""
+    now = time.time()
+    cutoff = now - REFRESH_AT * FRESH_S
+    c = _db()
+    rows = c.execute(
+        "SELECT a.cy, a.cx, f.meta FROM feature_access a LEFT JOIN feature_cells f "
+        "ON f.cy = a.cy AND f.cx = a.cx "
+        "AND f.bucket = (SELECT MAX(bucket) FROM feature_cells g WHERE g.cy = a.cy AND g.cx = a.cx) "
+        "WHERE a.accessed_at > ?", (now - ACTIVE_S,)).fetchall()
+    due = []
+    for cy, cx, meta in rows:
+        # cells queued without a record (alert rules, watched areas) get the risk sources
+        computed = (json.loads(meta).get("computed") if meta else None) or dict.fromkeys(WILDFIRE_SOURCES, 0.0)
+        stale = tuple(s for s, t in computed.items() if t < cutoff)
+        if stale:
+            due.append((min(computed[s] for s in stale), cy, cx, stale))
+    due.sort()
+    for _, cy, cx, sources in due[:limit]:
+        refresh_cell(cy, cx, sources)
+    c.execute("DELETE FROM feature_cells WHERE bucket < ?", (int(now // BUCKET_S) - KEEP_BUCKETS,))
+    c.execute("DELETE FROM feature_access WHERE accessed_at < ?", (now - ACTIVE_S,))
+    return min(len(due), limit)
+
+
+def mark_due(lat, lon):
+    """Queue the cell for the next refresher pass without making reads recompute inline."""
+    cy, cx = cell_of(lat, lon)
+    now = time.time()
+    c = _db()
+    c.execute("INSERT OR REPLACE INTO feature_access (cy, cx, accessed_at) VALUES (?, ?, ?)", (cy, cx, now))
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        row = c.execute("SELECT bucket, meta FROM feature_cells WHERE cy = ? AND cx = ? "
+                        "ORDER BY bucket DESC LIMIT 1", (cy, cx)).fetchone()
+        if row is not None:
+            meta = json.loads(row[1])
+            # due for the refresher (older than REFRESH_AT * FRESH_S), still fresh for reads
+            aged = now - REFRESH_AT * FRESH_S - 1.0
+            meta["computed"] = {s: min(t, aged) for s, t in meta.get("computed", {}).items()}
+            c.execute("UPDATE feature_cells SET meta = ? WHERE cy = ? AND cx = ? AND bucket = ?",
+                      (json.dumps(meta), cy, cx, row[0]))
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK")
+        raise
+
+
+_started = False
+
+
+def _lead_and_refresh():
+    lock = open(LOCK_PATH, "w")
+    while True:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            break
+        except OSError:
+            time.sleep(60)
+    while True:
+        try:
+            with priority(PREFETCH):
+                done = refresh_due()
+        except Exception as e:
+            print("feature refresh failed:", repr(e))
+            done = 0
+        time.sleep(1.0 if done >= REFRESH_BATCH else REFRESH_POLL_S)
+
+
+def start_feature_refresher():
+    """Start the refresher thread once per process (LEO_PREWARM=0 disables it too)."""
+    global _started
+    if _started or os.getenv("LEO_PREWARM", "1") == "0":
+        return
+    _started = True
+    threading.Thread(target=_lead_and_refresh, name="leo-features", daemon=True).start()
@@ -0,0 +1,204 @@
+# backend/utils/geometry.py
+"""
+Output stage for GeoJSON responses: level-of-detail simplification,
+coordinate quantization and compact encodings.
+
+  z=<zoom> or tol=<degrees>  topology-preserving simplify (shapely) to half
+                             a screen pixel at that zoom; polygons of one
+                             collection are simplified on their shared
+                             arcs, so adjacent sectors stay gap-free
+  q=<digits>                 decimal places kept (defaults from the zoom)
+  fmt=geojson|polyline|binary
+
+polyline replaces every ring with a Google encoded-polyline string
+(delta + zigzag varint text, lat/lon order) at 10**q precision.
+
+binary is "LEOG" | u8 version | u8 q | u32 header_len | header JSON |
+int32 LE (dx, dy) deltas for every ring in header order. The header is the
+FeatureCollection with each geometry's coordinates replaced by ring point
+counts, e.g. {"type": "Polygon", "rings": [27]}.
+"""
+import json
+import math
+import struct
+
+TILE_PX = 256
+BINARY_MAGIC = b"LEOG"
+BINARY_VERSION = 1
+
+
+def zoom_tolerance(z):
+    """Degrees covered by half a pixel at zoom z (equatorial, conservative)."""
+    return 360.0 / (TILE_PX * 2 ** float(z)) / 2.0
+
+
+def zoom_digits(z):
+    """Decimal places that resolve a quarter pixel at zoom z."""
+    deg_per_px = 360.0 / (TILE_PX * 2 ** float(z))
+    return max(1, min(7, math.ceil(-math.log10(deg_per_px / 4.0))))
+
+
+def lod_options(args):
+    """Parse z/tol/q/fmt from request args into (tolerance, digits, fmt)."""
+    z = args.get("z", type=float)
+    tol = args.get("tol", type=float)
+    digits = args.get("q", type=int)
+    fmt = (args.get("fmt") or "geojson").lower()
+    if fmt not in ("geojson", "polyline", "binary"):
+        raise ValueError("fmt must be geojson, polyline or binary")
+    if tol is None and z is not None:
+        tol = zoom_tolerance(z)
+    if digits is None:
+        digits = zoom_digits(z) if z is not None else (7 if fmt == "geojson" else 6)
+    # 7 digits keeps absolute lon * 10**q inside int32 for the binary format
+    return tol, max(0, min(digits, 7)), fmt
+
+
+def _quantize(coords, digits):
+    if coords and isinstance(coords[0], (int, float)):
+        return [round(c, digits) for c in coords]
+    return [_quantize(c, digits) for c in coords]
+
+
+def simplify_geometry(geom, tolerance):
+    from shapely.geometry import shape, mapping
+    g = shape(geom)
+    s = g.simplify(tolerance, preserve_topology=True)
+    if s.is_empty:
+        return geom
+    out = mapping(s)
+    # mapping() yields tuples; keep plain lists for json/quantize
+    return json.loads(json.dumps(out))
+
+
+def simplify_shared(geoms, tolerance):
+    """
+    Simplify a collection's polygons along shared arcs: the boundaries are
+    noded into arcs between junctions and simplified together (topology
+    preserving, arc ends fixed), so every arc is simplified once and arcs
+    never cross. The arcs are polygonized back into faces and each polygon
+    is rebuilt from the faces it covered. Neighbours then keep exactly the
+    same edge instead of each drifting by up to `tolerance` on its own.
+    Slivers narrower than `tolerance` between near-coincident input edges
+    collapse. Other geometries, and collections where a polygon would
+    lose all its faces, fall back to simplify_geometry() per feature.
+    """
+    import shapely
+    from shapely.geometry import mapping
+    poly_at = [i for i, g in enumerate(geoms) if g and g.get("type") in ("Polygon", "MultiPolygon")]
+    shared = set(poly_at) if len(poly_at) >= 2 else set()
+    out = [simplify_geometry(g, tolerance) if g and i not in shared else g for i, g in enumerate(geoms)]
+    if not shared:
+        return out
+
+    def per_feature():
+        for i in poly_at:
+            out[i] = simplify_geometry(geoms[i], tolerance)
+        return out
+
+    polys = shapely.make_valid(shapely.from_geojson([json.dumps(geoms[i]) for i in poly_at]))
+    arcs = shapely.line_merge(shapely.unary_union(shapely.boundary(polys)))
+    faces = shapely.get_parts(shapely.polygonize(shapely.get_parts(
+        shapely.simplify(arcs, tolerance, preserve_topology=True))))
+    faces = faces[shapely.area(faces) > 0]
+    if not len(faces):
+        return per_feature()
+    tree = shapely.STRtree(faces)
+    rebuilt = []
+    for k in range(len(poly_at)):
+        cand = faces[tree.query(polys[k])]
+        mine = cand[shapely.area(shapely.intersection(cand, polys[k])) > 0.5 * shapely.area(cand)]
+        g = shapely.union_all(mine) if len(mine) else None
+        if g is None or g.is_empty or g.geom_type not in ("Polygon", "MultiPolygon"):
+            return per_feature()
+        rebuilt.append(g)
+    for i, g in zip(poly_at, rebuilt):
+        out[i] = json.loads(json.dumps(mapping(g)))
+    return out
+
+
+def apply_lod(fc, tolerance=None, digits=7):
+    """New FeatureCollection with simplified, quantized geometries."""
+    features = []
+    src = fc.get("features", [])
+    geoms = [f.get("geometry") for f in src]
+    if tolerance:
+        geoms = simplify_shared(geoms, tolerance)
+    for f, geom in zip(src, geoms):
+        if geom:
+            geom = {**geom, "coordinates": _quantize(geom["coordinates"], digits)}
+        features.append({**f, "geometry": geom})
+    return {**fc, "features": features}
+
+
+def _rings(geom):
+    t = geom["type"]
+    c = geom["coordinates"]
+    if t == "Point":
+        return [[c]]
+    if t in ("LineString", "MultiPoint"):
+        return [c]
+    if t in ("Polygon", "MultiLineString"):
+        return list(c)
+    if t == "MultiPolygon":
+        return [ring for poly in c for ring in poly]
+    raise ValueError(f"unsupported geometry {t}")
+
+
+def encode_polyline(ring, digits):
+    scale = 10 ** digits
+    out = []
+    prev_lat = prev_lon = 0
+    for lon, lat in ring:
+        ilat, ilon = int(round(lat * scale)), int(round(lon * scale))
+        for d in (ilat - prev_lat, ilon - prev_lon):
+            v = ~(d << 1) if d < 0 else (d << 1)
+            while v >= 0x20:
+                out.append(chr((0x20 | (v & 0x1F)) + 63))
+                v >>= 5
+            out.append(chr(v + 63))
+        prev_lat, prev_lon = ilat, ilon
+    return "".join(out)
+
+
+def to_polyline(fc, digits):
+    features = []
+    for f in fc.get("features", []):
+        geom = f.get("geometry")
+        if geom:
+            geom = {"type": geom["type"], "precision": digits,
+                    "polylines": [encode_polyline(r, digits) for r in _rings(geom)]}
+        features.append({**f, "geometry": geom})
+    return {**fc, "features": features}
+
+
+def to_binary(fc, digits):
+    import numpy as np
+    scale = 10 ** digits
+    header_features = []
+    chunks = []
+    for f in fc.get("features", []):
+        geom = f.get("geometry")
+        if geom:
+            rings = _rings(geom)
+            header_geom = {"type": geom["type"], "rings": [len(r) for r in rings]}
+            for r in rings:
+                pts = np.rint(np.asarray(r, dtype=np.float64) * scale).astype(np.int64)
+                deltas = np.diff(pts, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+                chunks.append(deltas.astype("<i4").tobytes())
+        else:
+            header_geom = None
+        header_features.append({**f, "geometry": header_geom})
+    header = json.dumps({**fc, "features": header_features}, separators=(",", ":")).encode()
+    return (BINARY_MAGIC + struct.pack("<BBI", BINARY_VERSION, digits, len(header))
+            + header + b"".join(chunks))
+
+
+def encode_collection(fc, tolerance=None, digits=7, fmt="geojson"):
+    """(body, mimetype) for a FeatureCollection after the LOD stage."""
+    fc = apply_lod(fc, tolerance, digits)
+    if fmt == "binary":
+        return to_binary(fc, digits), "application/octet-stream"
+    if fmt == "polyline":
+        fc = to_polyline(fc, digits)
+    return json.dumps(fc, separators=(",", ":")), "application/json"
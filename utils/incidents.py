@@ -0,0 +1,567 @@
+# backend/utils/incidents.py
+"""
+Fire incidents built from FIRMS detections.
+
+A build clusters the detections of one FIRMS response (a bbox, up to 10
+days) DBSCAN-style: two detections are neighbours when they are within
+EPS_KM and EPS_H of each other; a detection with at least MIN_PTS
+neighbours (itself included) is a core point, core points that are
+neighbours share a cluster, and other detections join the cluster of a
+core neighbour or stay unclustered. Neighbours are found through a grid
+hash with EPS_KM cells in a local km frame, so each detection is compared
+only with the detections of its 3x3 cells; the pairs come out of sorted
+cell keys and are joined by vectorized union-find. A day of global VIIRS
+(a few hundred thousand detections) clusters in about a second. The grid
+does not wrap at the antimeridian.
+
+Each cluster is then matched to the stored incidents whose footprint it
+touches (within EPS_KM):
+
+  - each stored incident goes to the touching cluster nearest to it (by gap,
+    then overlap, then centroid distance)
+  - a cluster given one incident continues it (same id); given several, it
+    continues the oldest and the others are "merged" into it
+  - a cluster that touches incidents but was given none is a split and
+    starts a new id with split_from set
+  - anything else is a new incident
+
+The footprint is the union of every cluster hull matched to the incident,
+so it keeps the burned extent after old detections leave the FIRMS window.
+growth_km2_h is the footprint growth between the two latest detection
+times. Incidents without detections for EXPIRE_H go "out". Rebuilding from
+an unchanged FIRMS response is skipped, so repeated requests are cheap.
+
+Builds run on a fixed TILE_DEG tiling: the requested bbox is widened to
+whole tiles, and an incident's detection stats (count, FRP, centroid,
+first/last seen) are kept per tile in incident_parts. A build replaces only
+the parts of the tiles it covered, so an incident straddling the box edge
+keeps the stats of its detections outside the box instead of shrinking to
+the clipped cluster.
+"""
+from collections import OrderedDict
+import csv
+import datetime as dt
+import hashlib
+import io
+import math
+import os
+import time
+
+import numpy as np
+
+from utils.state_db import state_db
+
+EPS_KM = float(os.getenv("LEO_INCIDENT_EPS_KM", "1.5"))
+EPS_H = float(os.getenv("LEO_INCIDENT_EPS_H", "24"))
+MIN_PTS = int(os.getenv("LEO_INCIDENT_MIN_PTS", "2"))
+EXPIRE_H = 48.0
+MAX_DAYS = 10               # FIRMS area API limit
+TILE_DEG = 0.1              # build tiling; point_bbox boxes are already whole tiles
+MAX_BUILT = 1024            # (bbox, days) digests remembered per process
+
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LON = 111.320
+
+STATUSES = ("active", "merged", "out")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    status TEXT NOT NULL,
+    merged_into INTEGER,
+    split_from INTEGER,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    west REAL NOT NULL,
+    south REAL NOT NULL,
+    east REAL NOT NULL,
+    north REAL NOT NULL,
+    area_km2 REAL NOT NULL,
+    growth_km2_h REAL,
+    frp_total REAL NOT NULL,
+    detections INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    footprint BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS incidents_active ON incidents (south, north) WHERE status = 'active';
+CREATE TABLE IF NOT EXISTS incident_parts (
+    incident_id INTEGER NOT NULL,
+    ty INTEGER NOT NULL,
+    tx INTEGER NOT NULL,
+    detections INTEGER NOT NULL,
+    frp_total REAL NOT NULL,
+    lat_sum REAL NOT NULL,
+    lon_sum REAL NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (incident_id, ty, tx)
+);
+"""
+
+
+def _db():
+    return state_db(_SCHEMA)
+
+
+def pixel_km():
+    """Nominal detection footprint side of FIRMS_SOURCE (MODIS 1 km, VIIRS 375 m)."""
+    from routes.predictions import FIRMS_SOURCE
+    return 1.0 if "MODIS" in FIRMS_SOURCE.upper() else 0.375
+
+
+# -----------------------------
+# Detections
+# -----------------------------
+def parse_detections(text):
+    """(lat, lon, t, frp) arrays from a FIRMS area CSV; t is the acquisition time in epoch seconds."""
+    reader = csv.reader(io.StringIO(text or ""))
+    header = next(reader, None) or []
+    try:
+        ilat, ilon = header.index("latitude"), header.index("longitude")
+        idate, itime = header.index("acq_date"), header.index("acq_time")
+    except ValueError:
+        return tuple(np.empty(0) for _ in range(4))
+    ifrp = header.index("frp") if "frp" in header else None
+    days = {}
+    lat, lon, t, frp = [], [], [], []
+    for row in reader:
+        try:
+            y, x = float(row[ilat]), float(row[ilon])
+            day = days.get(row[idate])
+            if day is None:
+                day = days[row[idate]] = dt.datetime.strptime(row[idate], "%Y-%m-%d").replace(
+                    tzinfo=dt.timezone.utc).timestamp()
+            hhmm = int(row[itime])
+        except (IndexError, ValueError):
+            continue
+        lat.append(y)
+        lon.append(x)
+        t.append(day + (hhmm // 100) * 3600 + (hhmm % 100) * 60)
+        try:
+            frp.append(float(row[ifrp]) if ifrp is not None else 0.0)
+        except ValueError:
+            frp.append(0.0)
+    return np.array(lat), np.array(lon), np.array(t), np.array(frp)
+
+
+# -----------------------------
+# Clustering
+# -----------------------------
+_KEY_OFF = 1 << 20          # grid index offset; cells of >= 2 m stay within +-2^20 around the globe
+_KEY_STRIDE = 1 << 21
+_HALF_NEIGHBOURS = ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1))   # (dy, dx); the other half is symmetric
+
+
+def _neighbour_pairs(x, y, t, eps_km, eps_s):
+    """(i, j) index arrays of every neighbour pair, each pair once."""
+    key = (np.floor(y / eps_km).astype(np.int64) + _KEY_OFF) * _KEY_STRIDE + \
+        (np.floor(x / eps_km).astype(np.int64) + _KEY_OFF)
+    order = np.argsort(key, kind="stable")
+    skey = key[order]
+    cells, begin, size = np.unique(skey, return_index=True, return_counts=True)
+    pos = np.arange(len(skey))
+    out_i, out_j = [], []
+    for dy, dx in _HALF_NEIGHBOURS:
+        target = skey + dy * _KEY_STRIDE + dx
+        k = np.minimum(np.searchsorted(cells, target), len(cells) - 1)
+        cnt = np.where(cells[k] == target, size[k], 0)
+        src = np.repeat(pos, cnt)
+        dst = np.repeat(begin[k], cnt) + (np.arange(cnt.sum()) - np.repeat(np.cumsum(cnt) - cnt, cnt))
+        if dy == 0 and dx == 0:
+            keep = src < dst
+            src, dst = src[keep], dst[keep]
+        i, j = order[src], order[dst]
+        near = ((x[i] - x[j]) ** 2 + (y[i] - y[j]) ** 2 <= eps_km * eps_km) & (np.abs(t[i] - t[j]) <= eps_s)
+        out_i.append(i[near])
+        out_j.append(j[near])
+    return np.concatenate(out_i), np.concatenate(out_j)
+
+
+def _components(n, a, b):
+    """Root per node of the graph with edges (a, b): union by smaller root, then full path compression."""
+    parent = np.arange(n)
+    while len(a):
+        ra, rb = parent[a], parent[b]
+        diff = ra != rb
+        if not diff.any():
+            break
+        a, b, ra, rb = a[diff], b[diff], ra[diff], rb[diff]
+        # hooking roots onto smaller roots keeps the forest acyclic
+        np.minimum.at(parent, np.maximum(ra, rb), np.minimum(ra, rb))
+        while True:
+            up = parent[parent]
+            if np.array_equal(up, parent):
+                break
+            parent = up
+    return parent
+
+
+def cluster(lat, lon, t, eps_km=EPS_KM, eps_h=EPS_H, min_pts=MIN_PTS):
+    """Cluster label per detection (0..k-1, -1 unclustered); O(n) for bounded detection density."""
+    n = len(lat)
+    if not n:
+        return np.empty(0, dtype=np.int64)
+    y = lat * KM_PER_DEG_LAT
+    x = lon * KM_PER_DEG_LON * np.cos(np.radians(lat))
+    i, j = _neighbour_pairs(x, y, t, eps_km, eps_h * 3600.0)
+    degree = np.bincount(i, minlength=n) + np.bincount(j, minlength=n) + 1
+    core = degree >= min_pts
+    both = core[i] & core[j]
+    root = _components(n, i[both], j[both])
+    label = np.where(core, root, -1)
+    # border points take a core neighbour's cluster
+    for src, dst in ((i, j), (j, i)):
+        edge = core[src] & ~core[dst]
+        label[dst[edge]] = root[src[edge]]
+    out = np.full(n, -1, dtype=np.int64)
+    member = label >= 0
+    out[member] = np.unique(label[member], return_inverse=True)[1]
+    return out
+
+
+def tile_of(lat, lon):
+    """(ty, tx) integer TILE_DEG tile indices; rounding first keeps tile-edge values on their tile."""
+    return (np.floor(np.round(np.asarray(lat) / TILE_DEG, 6)).astype(np.int64),
+            np.floor(np.round(np.asarray(lon) / TILE_DEG, 6)).astype(np.int64))
+
+
+def _parts(lab, lat, lon, t, frp):
+    """Per (cluster, tile) detection stats, as arrays sorted by cluster."""
+    ty, tx = tile_of(lat, lon)
+    keys, inv = np.unique(np.column_stack((lab, ty, tx)), axis=0, return_inverse=True)
+    inv = inv.ravel()
+    m = len(keys)
+    order = np.argsort(inv, kind="stable")
+    count = np.bincount(inv, minlength=m)
+    starts = np.concatenate(([0], np.cumsum(count)[:-1])) if m else np.empty(0, dtype=np.int64)
+    st = t[order]
+    return {
+        "cluster": keys[:, 0], "ty": keys[:, 1], "tx": keys[:, 2], "detections": count,
+        "frp_total": np.bincount(inv, frp, minlength=m),
+        "lat_sum": np.bincount(inv, lat, minlength=m),
+        "lon_sum": np.bincount(inv, lon, minlength=m),
+        "first_seen": np.minimum.reduceat(st, starts) if m else np.empty(0),
+        "last_seen": np.maximum.reduceat(st, starts) if m else np.empty(0),
+    }
+
+
+def summarize(labels, lat, lon, t, frp):
+    """Per-cluster arrays: hull (lon/lat), centroid, FRP total, count, first/last seen, per-tile parts."""
+    import shapely
+    member = labels >= 0
+    lab, lat, lon, t, frp = labels[member], lat[member], lon[member], t[member], frp[member]
+    k = int(lab.max()) + 1 if len(lab) else 0
+    count = np.bincount(lab, minlength=k)
+    order = np.argsort(lab, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(count)[:-1])) if k else np.empty(0, dtype=np.int64)
+    st = t[order]
+    # convex hull grown by half a detection pixel, so lone and collinear detections still cover an area
+    hull = shapely.buffer(shapely.convex_hull(shapely.multipoints(np.column_stack((lon[order], lat[order])),
+                                                                  indices=lab[order])),
+                          pixel_km() / 2.0 / KM_PER_DEG_LAT, quad_segs=2) if k else np.empty(0, dtype=object)
+    return {
+        "hull": hull,
+        "lat": np.bincount(lab, lat, minlength=k) / np.maximum(count, 1),
+        "lon": np.bincount(lab, lon, minlength=k) / np.maximum(count, 1),
+        "frp_total": np.bincount(lab, frp, minlength=k),
+        "detections": count,
+        "first_seen": np.minimum.reduceat(st, starts) if k else np.empty(0),
+        "last_seen": np.maximum.reduceat(st, starts) if k else np.empty(0),
+        "parts": _parts(lab, lat, lon, t, frp),
+    }
+
+
+def _area_km2(geoms, lat):
+    """Area in km² of lon/lat geometries around latitudes `lat`."""
+    import shapely
+    return shapely.area(geoms) * KM_PER_DEG_LAT * KM_PER_DEG_LON * np.cos(np.radians(lat))
+
+
+# -----------------------------
+# Tracking
+# -----------------------------
+def _active_in(c, bbox, pad_deg=0.0):
+    west, south, east, north = bbox
+    return c.execute(
+        "SELECT id, first_seen, last_seen, area_km2, growth_km2_h, footprint FROM incidents "
+        "WHERE status = 'active' AND north >= ? AND south <= ? AND east >= ? AND west <= ?",
+        (south - pad_deg, north + pad_deg, west - pad_deg, east + pad_deg)).fetchall()
+
+
+def _match(cl, prev, eps_km):
+    """[(stored index or None, merged indices, split_from id)] per cluster."""
+    import shapely
+    k = len(cl["hull"])
+    out = [(None, [], None)] * k
+    if not prev or not k:
+        return out
+    footprints = shapely.from_wkb([p[5] for p in prev])
+    a, b = shapely.STRtree(footprints).query(cl["hull"], predicate="dwithin", distance=eps_km / KM_PER_DEG_LAT)
+    # each stored incident goes to the cluster it is closest to, overlaps most, then is centred nearest
+    gap = shapely.distance(cl["hull"][a], footprints[b])
+    overlap = shapely.area(shapely.intersection(cl["hull"][a], footprints[b]))
+    centre = shapely.distance(shapely.centroid(cl["hull"][a]), shapely.centroid(footprints[b]))
+    best = {}
+    for i in np.lexsort((centre, -overlap, gap, b)).tolist():
+        best.setdefault(int(b[i]), int(a[i]))
+    won = {}
+    for j, i in best.items():
+        won.setdefault(i, []).append(j)
+    for i, js in won.items():
+        js.sort(key=lambda j: prev[j][1])      # the oldest keeps its id, the others merge into it
+        out[i] = (js[0], js[1:], None)
+    for i, j in zip(a.tolist(), b.tolist()):
+        if i not in won and out[i][2] is None:
+            out[i] = (None, [], prev[j][0])
+    return out
+
+
+_PART_COLS = "incident_id, ty, tx, detections, frp_total, lat_sum, lon_sum, first_seen, last_seen"
+
+
+def _move_parts(c, src, dst):
+    """Fold incident src's parts into dst (merges), summing parts on the same tile."""
+    c.execute(f"INSERT INTO incident_parts ({_PART_COLS}) SELECT ?, ty, tx, detections, frp_total, lat_sum, "
+              "lon_sum, first_seen, last_seen FROM incident_parts WHERE incident_id = ? "
+              "ON CONFLICT (incident_id, ty, tx) DO UPDATE SET detections = detections + excluded.detections, "
+              "frp_total = frp_total + excluded.frp_total, lat_sum = lat_sum + excluded.lat_sum, "
+              "lon_sum = lon_sum + excluded.lon_sum, first_seen = MIN(first_seen, excluded.first_seen), "
+              "last_seen = MAX(last_seen, excluded.last_seen)", (dst, src))
+    c.execute("DELETE FROM incident_parts WHERE incident_id = ?", (src,))
+
+
+def _put_parts(c, iid, parts, rows, tiles):
+    """Replace iid's parts inside the build's tile range with the cluster's parts `rows`."""
+    (ty0, tx0), (ty1, tx1) = tiles
+    c.execute("DELETE FROM incident_parts WHERE incident_id = ? AND ty BETWEEN ? AND ? AND tx BETWEEN ? AND ?",
+              (iid, ty0, ty1, tx0, tx1))
+    c.executemany(f"INSERT INTO incident_parts ({_PART_COLS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                  [(iid, int(parts["ty"][r]), int(parts["tx"][r]), int(parts["detections"][r]),
+                    float(parts["frp_total"][r]), float(parts["lat_sum"][r]), float(parts["lon_sum"][r]),
+                    float(parts["first_seen"][r]), float(parts["last_seen"][r])) for r in rows])
+
+
+def _part_stats(c, iid):
+    """(lat, lon, frp_total, detections, first_seen, last_seen) over all of iid's parts."""
+    n, frp, lat_sum, lon_sum, first, last = c.execute(
+        "SELECT SUM(detections), SUM(frp_total), SUM(lat_sum), SUM(lon_sum), MIN(first_seen), MAX(last_seen) "
+        "FROM incident_parts WHERE incident_id = ?", (iid,)).fetchone()
+    return lat_sum / n, lon_sum / n, frp, n, first, last
+
+
+def track(cl, bbox, now=None, eps_km=EPS_KM):
+    """
+    Match clusters to stored incidents in `bbox` (whole TILE_DEG tiles) and
+    write them; returns the ids, one per cluster.
+    """
+    import shapely
+    now = time.time() if now is None else now
+    west, south, east, north = bbox
+    # tiles whose parts this build replaces: those entirely inside the bbox
+    (ty0, tx0), (ty1, tx1) = ((int(v) for v in tile_of(south, west)),
+                              (int(v) - 1 for v in tile_of(north, east)))
+    tiles = ((ty0, tx0), (ty1, tx1))
+    parts = cl["parts"]
+    part_rows = np.split(np.arange(len(parts["cluster"])),
+                         np.searchsorted(parts["cluster"], np.arange(1, len(cl["hull"]))))
+    c = _db()
+    ids = []
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        prev = _active_in(c, bbox, pad_deg=eps_km / KM_PER_DEG_LAT)
+        matches = _match(cl, prev, eps_km)
+        prev_geom = shapely.from_wkb([p[5] for p in prev]) if prev else []
+        footprints = [cl["hull"][a] if keep is None else
+                      shapely.union_all([cl["hull"][a], prev_geom[keep], *(prev_geom[m] for m in merged)])
+                      for a, (keep, merged, _) in enumerate(matches)]
+        areas = _area_km2(np.array(footprints, dtype=object), cl["lat"]) if footprints else []
+        bounds = shapely.bounds(np.array(footprints, dtype=object)) if footprints else []
+        for a, (keep, merged, split_from) in enumerate(matches):
+            first, last, area = float(cl["first_seen"][a]), float(cl["last_seen"][a]), float(areas[a])
+            stats = (float(cl["lat"][a]), float(cl["lon"][a]), float(cl["frp_total"][a]), int(cl["detections"][a]))
+            if keep is None:
+                growth = area / ((last - first) / 3600.0) if last > first else None
+            else:
+                iid = prev[keep][0]
+                _, _, prev_last, prev_area, growth, _ = prev[keep]
+                if last > prev_last:
+                    growth = (area - prev_area) / ((last - prev_last) / 3600.0)
+                for m in merged:
+                    _move_parts(c, prev[m][0], iid)
+                _put_parts(c, iid, parts, part_rows[a], tiles)
+                # stats over every tile, so detections outside this build's box still count
+                *stats, part_first, part_last = _part_stats(c, iid)
+                first = min(first, part_first, *(prev[m][1] for m in (keep, *merged)))
+                last = max(last, part_last, prev_last)
+            lat, lon, frp_total, detections = stats
+            row = (lat, lon, *bounds[a].tolist(), round(area, 4),
+                   None if growth is None else round(growth, 4), round(frp_total, 2),
+                   int(detections), first, last, now, shapely.to_wkb(footprints[a]))
+            if keep is None:
+                cur = c.execute(
+                    "INSERT INTO incidents (status, split_from, lat, lon, west, south, east, north, area_km2, "
+                    "growth_km2_h, frp_total, detections, first_seen, last_seen, updated_at, footprint) "
+                    "VALUES ('active', ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (split_from, *row))
+                _put_parts(c, cur.lastrowid, parts, part_rows[a], tiles)
+                ids.append(cur.lastrowid)
+                continue
+            c.execute(
+                "UPDATE incidents SET lat = ?, lon = ?, west = ?, south = ?, east = ?, north = ?, area_km2 = ?, "
+                "growth_km2_h = ?, frp_total = ?, detections = ?, first_seen = ?, last_seen = ?, updated_at = ?, "
+                "footprint = ? WHERE id = ?", (*row, iid))
+            c.executemany("UPDATE incidents SET status = 'merged', merged_into = ?, updated_at = ? WHERE id = ?",
+                          [(iid, now, prev[m][0]) for m in merged])
+            ids.append(iid)
+        c.execute("UPDATE incidents SET status = 'out', updated_at = ? WHERE status = 'active' "
+                  "AND last_seen < ? AND north >= ? AND south <= ? AND east >= ? AND west <= ?",
+                  (now, now - EXPIRE_H * 3600.0, south, north, west, east))
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK")
+        raise
+    return ids
+
+
+# -----------------------------
+# Builds
+# -----------------------------
+_built = OrderedDict()     # (bbox, days) -> digest of the FIRMS response last built; LRU of MAX_BUILT
+
+
+def snap_bbox(bbox):
+    """bbox widened to whole TILE_DEG tiles (within ±180/±90)."""
+    west, south, east, north = (round(float(v) / TILE_DEG, 6) for v in bbox)
+    return (max(-180.0, round(math.floor(west) * TILE_DEG, 6)), max(-90.0, round(math.floor(south) * TILE_DEG, 6)),
+            min(180.0, round(math.ceil(east) * TILE_DEG, 6)), min(90.0, round(math.ceil(north) * TILE_DEG, 6)))
+
+
+def _bbox_str(bbox):
+    return ",".join(f"{v:g}" for v in bbox)
+
+
+def firms_text(bbox, days=1):
+    """FIRMS area CSV for the bbox, or None without a key."""
+    from routes.predictions import FIRMS_URL, FIRMS_SOURCE
+    from utils.upstream import fetch
+    key = os.getenv("FIRMS_KEY")
+    if not key:
+        return None
+    url = FIRMS_URL.format(MAP_KEY=key, SOURCE=FIRMS_SOURCE, BBOX=_bbox_str(bbox), DAYS=days)
+    return fetch("firms", url, timeout=60, parse="text")
+
+
+def build(bbox, days=1, text=None, now=None):
+    """
+    Cluster the FIRMS detections in bbox (widened to whole tiles; fetched
+    unless `text` is given) and update the stored incidents. Returns the
+    number of clusters, or None when there is no FIRMS data or the response
+    was already built.
+    """
+    bbox = snap_bbox(bbox)
+    if text is None:
+        text = firms_text(bbox, days)
+        if text is None:
+            return None
+    digest = hashlib.sha1(text.encode()).hexdigest()
+    if _built.get((bbox, days)) == digest:
+        _built.move_to_end((bbox, days))
+        return None
+    lat, lon, t, frp = parse_detections(text)
+    # FIRMS matches the box inclusively; a detection on the far edge belongs to the next tile
+    west, south, east, north = bbox
+    inside = (lat >= south) & (lat < north) & (lon >= west) & (lon < east) if len(lat) else np.zeros(0, bool)
+    lat, lon, t, frp = lat[inside], lon[inside], t[inside], frp[inside]
+    cl = summarize(cluster(lat, lon, t), lat, lon, t, frp)
+    track(cl, bbox, now)
+    _built[(bbox, days)] = digest
+    _built.move_to_end((bbox, days))
+    while len(_built) > MAX_BUILT:
+        _built.popitem(last=False)
+    return len(cl["hull"])
+
+
+def point_bbox(lat, lon):
+    """The 1° box routes.predictions.firms_rows fetches around a point, so both share one FIRMS call."""
+    lat, lon = round(lat, 1), round(lon, 1)
+    return (lon - 1.0, lat - 1.0, lon + 1.0, lat + 1.0)
+
+
+# -----------------------------
+# Queries
+# -----------------------------
+_COLUMNS = ("id", "status", "merged_into", "split_from", "lat", "lon", "west", "south", "east", "north",
+            "area_km2", "growth_km2_h", "frp_total", "detections", "first_seen", "last_seen", "updated_at")
+
+
+def _km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _iso(ts):
+    return dt.datetime.fromtimestamp(ts, dt.timezone.utc).strftime("%Y-%m-%dT%H:%MZ")
+
+
+def _row(row, footprint=None):
+    inc = dict(zip(_COLUMNS, row))
+    inc["lat"], inc["lon"] = round(inc["lat"], 5), round(inc["lon"], 5)
+    inc["bbox"] = [round(inc.pop(k), 5) for k in ("west", "south", "east", "north")]
+    inc["radius_km"] = round(math.sqrt(inc["area_km2"] / math.pi), 3)
+    for k in ("first_seen", "last_seen", "updated_at"):
+        inc[k] = _iso(inc[k])
+    if footprint is not None:
+        import shapely
+        inc["footprint"] = _geometry(shapely.from_wkb(footprint))
+    return inc
+
+
+def _geometry(geom):
+    import shapely
+    from shapely.geometry import mapping
+    return mapping(shapely.set_precision(geom, 1e-5))
+
+
+def query(bbox, status="active", limit=500, footprint=False):
+    """(total, incidents) intersecting bbox, hottest (FRP) first."""
+    west, south, east, north = bbox
+    c = _db()
+    where = "north >= ? AND south <= ? AND east >= ? AND west <= ?"
+    args = [south, north, west, east]
+    if status:
+        where = "status = ? AND " + where
+        args.insert(0, status)
+    total = c.execute(f"SELECT COUNT(*) FROM incidents WHERE {where}", args).fetchone()[0]
+    rows = c.execute(f"SELECT {', '.join(_COLUMNS)}, footprint FROM incidents WHERE {where} "
+                     f"ORDER BY frp_total DESC LIMIT ?", (*args, limit)).fetchall()
+    return total, [_row(r[:-1], r[-1] if footprint else None) for r in rows]
+
+
+def get_incident(incident_id, footprint=False):
+    row = _db().execute(f"SELECT {', '.join(_COLUMNS)}, footprint FROM incidents WHERE id = ?",
+                        (incident_id,)).fetchone()
+    return None if row is None else _row(row[:-1], row[-1] if footprint else None)
+
+
+def near(lat, lon, within_km, limit=5):
+    """Active incidents whose centroid is within within_km of the point, nearest first, each with distance_km."""
+    dlat = within_km / KM_PER_DEG_LAT
+    dlon = within_km / (KM_PER_DEG_LON * max(0.05, math.cos(math.radians(lat))))
+    _, rows = query((lon - dlon, lat - dlat, lon + dlon, lat + dlat), limit=1000)
+    if not rows:
+        return []
+    dist = _km(lat, lon, np.array([r["lat"] for r in rows]), np.array([r["lon"] for r in rows]))
+    for inc, d in zip(rows, np.round(dist, 3).tolist()):
+        inc["distance_km"] = d
+    return sorted((r for r in rows if r["distance_km"] <= within_km), key=lambda r: r["distance_km"])[:limit]
+
+
+def around(lat, lon, within_km, limit=5):
+    """near() after building the point's FIRMS box; [] when FIRMS is unavailable."""
+    try:
+        build(point_bbox(lat, lon))
+    except Exception as e:
+        print("incident build failed:", repr(e))
+    return near(lat, lon, within_km, limit)
@@ -0,0 +1,169 @@
+# backend/utils/model_runtime.py
+"""
+Versioned risk models scored with NumPy.
+
+An artifact (models/risk_v1.json, or LEO_MODEL_PATH) lists the feature
+vector -- name, default for missing values, display format -- and one head
+per mode. A head is either
+
+  {"type": "linear", "intercept": b, "terms": [[feature, weight], ...]}
+  {"type": "trees", "base": b, "learning_rate": lr, "trees": [tree, ...]}
+
+where a tree is flat node arrays: feature (-1 at leaves), threshold, left,
+right and value (every node, for path attribution). Heads output a logit;
+score = sigmoid(logit).
+
+score() takes an (n, n_features) matrix and returns scores and per-feature
+logit contributions for every requested mode in one call: linear heads are
+one matrix product, trees walk all rows a level at a time. Tree
+contributions are path-attributed (the change in node value at every split
+is charged to that split's feature). The artifact is re-read when its mtime
+changes, so retrained weights go live without a deploy.
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  "models", "risk_v1.json")
+RELOAD_CHECK_S = 5.0
+
+
+class Model:
+    def __init__(self, spec):
+        self.version = spec["version"]
+        self.features = [f["name"] for f in spec["features"]]
+        self.index = {n: i for i, n in enumerate(self.features)}
+        self.specs = {f["name"]: f for f in spec["features"]}
+        self.heads = {}
+        for mode, h in spec["heads"].items():
+            if h["type"] == "linear":
+                w = np.zeros(len(self.features))
+                for name, weight in h["terms"]:
+                    w[self.index[name]] = weight
+                head = {"type": "linear", "intercept": float(h.get("intercept", 0.0)), "weights": w}
+            elif h["type"] == "trees":
+                head = {"type": "trees", "base": float(h.get("base", 0.0)),
+                        "learning_rate": float(h.get("learning_rate", 1.0)),
+                        "trees": [{k: np.asarray(t[k], dtype=float if k in ("threshold", "value") else int)
+                                   for k in ("feature", "threshold", "left", "right", "value")}
+                                  for t in h["trees"]]}
+                for t in head["trees"]:
+                    if t["feature"].max() >= len(self.features):
+                        raise ValueError(f"{mode}: tree feature index out of range")
+            else:
+                raise ValueError(f"{mode}: unknown head type {h['type']!r}")
+            head["terms"] = [n for n, _ in h.get("terms", [])] or self.features
+            head["rationale"] = h.get("rationale", "")
+            self.heads[mode] = head
+
+    # -- features --
+    def matrix(self, rows):
+        """(n, n_features) float matrix from dicts; None/missing take the artifact defaults."""
+        X = np.full((len(rows), len(self.features)), np.nan)
+        for i, row in enumerate(rows):
+            for name, v in row.items():
+                j = self.index.get(name)
+                if j is not None and v is not None:
+                    X[i, j] = v
+        for name, j in self.index.items():
+            missing = np.isnan(X[:, j])
+            if not missing.any():
+                continue
+            spec = self.specs[name]
+            if "default_from" in spec:
+                X[missing, j] = X[missing, self.index[spec["default_from"]]]
+            else:
+                X[missing, j] = spec.get("default", 0.0)
+        return X
+
+    def format_value(self, name, v):
+        return self.specs[name].get("format", "{:.2f}").format(v)
+
+    # -- scoring --
+    def _linear(self, head, X):
+        contrib = X * head["weights"]
+        return head["intercept"] + contrib.sum(axis=1), contrib
+
+    def _trees(self, head, X):
+        n = X.shape[0]
+        rows = np.arange(n)
+        lr = head["learning_rate"]
+        logit = np.full(n, head["base"])
+        contrib = np.zeros_like(X)
+        for t in head["trees"]:
+            node = np.zeros(n, dtype=int)
+            logit += lr * t["value"][0]
+            while True:
+                f = t["feature"][node]
+                live = f >= 0
+                if not live.any():
+                    break
+                go_left = X[rows, np.maximum(f, 0)] <= t["threshold"][node]
+                nxt = np.where(live, np.where(go_left, t["left"][node], t["right"][node]), node)
+                delta = lr * (t["value"][nxt] - t["value"][node])
+                np.add.at(contrib, (rows[live], f[live]), delta[live])
+                logit += np.where(live, delta, 0.0)
+                node = nxt
+        return logit, contrib
+
+    def score(self, X, modes=None):
+        """{mode: (score[n], logit[n], contributions[n, n_features])}."""
+        X = np.asarray(X, dtype=float)
+        out = {}
+        for mode in modes or self.heads:
+            head = self.heads[mode]
+            logit, contrib = (self._linear if head["type"] == "linear" else self._trees)(head, X)
+            out[mode] = (np.clip(1.0 / (1.0 + np.exp(-logit)), 0.0, 1.0), logit, contrib)
+        return out
+
+
+class ModelRuntime:
+    """Holds the current Model and swaps it when the artifact file changes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._model = None
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        mtime = os.path.getmtime(self.path)
+        with open(self.path, encoding="utf-8") as f:
+            model = Model(json.load(f))
+        self._model, self._mtime = model, mtime
+
+    def get(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._load()
+        elif time.time() - self._checked > RELOAD_CHECK_S:
+            self._checked = time.time()
+            try:
+                mtime = os.path.getmtime(self.path)
+                if mtime != self._mtime:
+                    with self._lock:
+                        try:
+                            self._load()
+                        except Exception:
+                            self._mtime = mtime   # don't retry until the file changes again
+                            raise
+            except Exception as e:
+                # a bad or half-written artifact keeps the current model serving
+                print("model reload failed:", repr(e))
+        return self._model
+
+
+_runtime = None
+
+
+def get_model():
+    global _runtime
+    if _runtime is None:
+        _runtime = ModelRuntime(os.getenv("LEO_MODEL_PATH", DEFAULT_MODEL_PATH))
+    return _runtime.get()
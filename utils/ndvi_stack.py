@@ -0,0 +1,195 @@
+# backend/utils/ndvi_stack.py
+"""
+Multi-date NDVI stack from a single CDSE process request.
+
+The window is cut into fixed time bins. One evalscript with ORBIT
+mosaicking sees every acquisition in the window at once, drops cloud,
+shadow and snow pixels (SCL), and writes the per-bin maximum NDVI (a
+max-value composite) into its own output band. Bins are packed four to an
+RGBA PNG response and the whole set comes back as one tar, so N dates cost
+one upstream call instead of N.
+
+Band values: 0 = no valid observation, 1..255 = NDVI -1..1.
+"""
+import datetime as dt
+import io
+import json
+import math
+import tarfile
+
+import numpy as np
+
+MAX_BINS = 24
+BANDS_PER_PNG = 4
+# SCL classes excluded from the composite: cloud shadow, cloud med/high, cirrus, snow
+MASKED_SCL = (3, 8, 9, 10, 11)
+
+_EVALSCRIPT = """
+//VERSION=3
+const BINS = %(bins)s;
+const N = BINS.length;
+const OUT = %(outputs)d;
+const MASKED = %(masked)s;
+function setup() {
+  let outputs = [];
+  for (let i = 0; i < OUT; i++) outputs.push({ id: "t" + i, bands: 4, sampleType: "UINT8" });
+  return { input: [{ bands: ["B04", "B08", "SCL", "dataMask"] }], output: outputs, mosaicking: "ORBIT" };
+}
+function evaluatePixel(samples, scenes) {
+  let best = new Array(OUT * 4).fill(0);
+  for (let i = 0; i < samples.length; i++) {
+    let s = samples[i];
+    if (!s.dataMask || MASKED.includes(s.SCL)) continue;
+    let d = s.B08 + s.B04;
+    if (d === 0) continue;
+    let t = new Date(scenes.orbits[i].dateFrom).getTime();
+    for (let b = 0; b < N; b++) {
+      if (t >= BINS[b][0] && t < BINS[b][1]) {
+        let v = Math.max(1, Math.min(255, Math.round(((s.B08 - s.B04) / d + 1) * 127) + 1));
+        if (v > best[b]) best[b] = v;
+        break;
+      }
+    }
+  }
+  let out = {};
+  for (let i = 0; i < OUT; i++) out["t" + i] = best.slice(i * 4, i * 4 + 4);
+  return out;
+}
+"""
+
+
+def _iso(t):
+    return t.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def time_bins(days=90, step_days=15, end=None):
+    """
+    [(from, to)] datetimes, oldest first. The end snaps forward to a multiple
+    of step_days since the epoch, so the request (and the baseline a year
+    earlier) keeps one cache key for step_days instead of changing daily.
+    """
+    if end is None:
+        epoch = dt.datetime(1970, 1, 1)
+        tomorrow = (dt.datetime.utcnow() - epoch).days + 1
+        end = epoch + dt.timedelta(days=int(math.ceil(tomorrow / float(step_days)) * step_days))
+    n = max(1, int(math.ceil(days / float(step_days))))
+    if n > MAX_BINS:
+        raise ValueError(f"{n} bins requested, at most {MAX_BINS}")
+    step = dt.timedelta(days=step_days)
+    return [(end - (n - i) * step, end - (n - i - 1) * step) for i in range(n)]
+
+
+def shift_bins(bins, days):
+    d = dt.timedelta(days=days)
+    return [(a + d, b + d) for a, b in bins]
+
+
+def stack_payload(bbox, bins, width=64, height=None):
+    epoch = dt.datetime(1970, 1, 1)
+    edges = [[int((a - epoch).total_seconds() * 1000), int((b - epoch).total_seconds() * 1000)]
+             for a, b in bins]
+    outputs = int(math.ceil(len(bins) / float(BANDS_PER_PNG)))
+    return {
+        "input": {
+            "bounds": {"bbox": bbox, "properties": {"crs": "http://www.opengis.net/def/crs/EPSG/0/4326"}},
+            "data": [{"type": "sentinel-2-l2a",
+                      "dataFilter": {"timeRange": {"from": _iso(bins[0][0]), "to": _iso(bins[-1][1])},
+                                     "maxCloudCoverage": 80}}],
+        },
+        "output": {"width": width, "height": height or width,
+                   "responses": [{"identifier": f"t{i}", "format": {"type": "image/png"}}
+                                 for i in range(outputs)]},
+        "evalscript": _EVALSCRIPT % {"bins": json.dumps(edges), "outputs": outputs,
+                                     "masked": json.dumps(list(MASKED_SCL))},
+    }
+
+
+def decode_stack(content, n_bins):
+    """(t, y, x) float32 NDVI with NaN where a bin had no valid observation."""
+    from PIL import Image
+    pngs = {}
+    with tarfile.open(fileobj=io.BytesIO(content), mode="r:*") as tar:
+        for m in tar.getmembers():
+            if m.isfile() and m.name.endswith(".png"):
+                pngs[m.name.rsplit("/", 1)[-1][:-4]] = tar.extractfile(m).read()
+    layers = []
+    for i in range(int(math.ceil(n_bins / float(BANDS_PER_PNG)))):
+        img = Image.open(io.BytesIO(pngs[f"t{i}"]))
+        arr = np.asarray(img.convert("RGBA"), dtype=np.uint8)
+        layers.append(np.moveaxis(arr, -1, 0))
+    raw = np.concatenate(layers, axis=0)[:n_bins].astype(np.float32)
+    return np.where(raw == 0, np.nan, (raw - 1.0) / 127.0 - 1.0)
+
+
+# -----------------------------
+# Statistics
+# -----------------------------
+def stack_stats(stack):
+    """Per-bin mean/median/p10/p90/valid_fraction as arrays of length t."""
+    flat = stack.reshape(stack.shape[0], -1)
+    valid = np.isfinite(flat)
+    count = valid.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count > 0, np.nansum(flat, axis=1) / count, np.nan)
+    pct = np.full((3, flat.shape[0]), np.nan)
+    has = count > 0
+    if has.any():
+        pct[:, has] = np.nanpercentile(flat[has], [10, 50, 90], axis=1)
+    return {"mean": mean, "p10": pct[0], "median": pct[1], "p90": pct[2],
+            "valid_fraction": count / float(flat.shape[1])}
+
+
+def trend_per_30d(bins, mean):
+    """Least-squares NDVI slope per 30 days over the bins that have data."""
+    centers = np.array([((a - bins[0][0]) + (b - a) / 2).total_seconds() / 86400.0 for a, b in bins])
+    ok = np.isfinite(mean)
+    if ok.sum() < 2:
+        return None
+    return float(np.polyfit(centers[ok], mean[ok], 1)[0] * 30.0)
+
+
+def pixel_anomaly(stack, baseline):
+    """Per-bin mean of (current - baseline) over pixels valid in both."""
+    diff = (stack - baseline).reshape(stack.shape[0], -1)
+    ok = np.isfinite(diff)
+    n = ok.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, np.where(ok, diff, 0.0).sum(axis=1) / n, np.nan)
+
+
+def growth_stage(latest, trend):
+    if latest is None:
+        return None
+    if trend is not None and trend > 0.03:
+        return "green-up"
+    if trend is not None and trend < -0.03:
+        return "senescence"
+    return "peak" if latest > 0.6 else "dormant" if latest < 0.25 else "vegetative"
+
+
+def _num(v, nd=3):
+    return None if v is None or not np.isfinite(v) else round(float(v), nd)
+
+
+def series_summary(bins, stack, baseline=None):
+    stats = stack_stats(stack)
+    base_mean = stack_stats(baseline)["mean"] if baseline is not None else np.full(len(bins), np.nan)
+    anomaly = pixel_anomaly(stack, baseline) if baseline is not None else np.full(len(bins), np.nan)
+    dates = []
+    for i, (a, b) in enumerate(bins):
+        dates.append({
+            "from": _iso(a), "to": _iso(b),
+            "mean": _num(stats["mean"][i]), "median": _num(stats["median"][i]),
+            "p10": _num(stats["p10"][i]), "p90": _num(stats["p90"][i]),
+            "valid_fraction": round(float(stats["valid_fraction"][i]), 3),
+            "baseline_mean": _num(base_mean[i]), "anomaly": _num(anomaly[i]),
+        })
+    trend = trend_per_30d(bins, stats["mean"])
+    last = next((d for d in reversed(dates) if d["mean"] is not None), None)
+    return {
+        "dates": dates,
+        "trend_per_30d": _num(trend, 4),
+        "latest": last,
+        "anomaly": last["anomaly"] if last else None,
+        "growth_stage": growth_stage(last["mean"] if last else None, trend),
+    }
@@ -0,0 +1,190 @@
+# backend/utils/nws_grid.py
+"""
+Parsed weather.gov gridpoint store.
+
+A forecastGridData response is expanded once into hourly float32 arrays per
+layer, aligned on a common UTC hour axis. NWS values carry ISO-8601
+"start/duration" validTime intervals of varying length: state layers
+(temperature, RH, wind, ...) are repeated over every hour of their
+interval, accumulation layers (QPF, snowfall) are spread evenly across it.
+Series are kept per grid cell (office/gridX/gridY), so every endpoint that
+needs NWS data shares one parse and can ask for any window.
+
+Windows default to starting at the current hour. Under LEO_UPSTREAM_MODE=
+replay a series' clock is pinned to its response's recorded_at instead, so
+replayed windows cover the same hours they did when recorded.
+"""
+from collections import OrderedDict
+import datetime as dt
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from utils.timeseries import series_mean, series_total
+from utils.replay import replayed_at
+from utils.upstream import fetch, afetch, nws_headers, is_refreshing
+
+NWS_POINTS = "https://api.weather.gov/points/{lat},{lon}"
+
+ACCUMULATED = {"quantitativePrecipitation", "snowfallAmount", "iceAccumulation"}
+
+GRID_TTL_S = int(os.getenv("LEO_NWS_GRID_TTL", "900"))
+POINTS_TTL_S = int(os.getenv("LEO_NWS_POINTS_TTL", "86400"))
+MAX_CELLS = int(os.getenv("LEO_NWS_MAX_CELLS", "2048"))
+
+_DURATION = re.compile(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+
+def parse_valid_time(vt):
+    """'2024-06-01T12:00:00+00:00/PT3H' -> (start epoch hour, hours)."""
+    start_s, dur_s = vt.split("/")
+    start = dt.datetime.fromisoformat(start_s.replace("Z", "+00:00"))
+    m = _DURATION.match(dur_s)
+    if not m:
+        raise ValueError(f"bad duration {dur_s!r}")
+    d, h, mi, s = (int(x or 0) for x in m.groups())
+    hours = max(1, round(d * 24 + h + mi / 60.0 + s / 3600.0))
+    return int(start.timestamp() // 3600), hours
+
+
+class GridSeries:
+    """Hourly arrays for one grid cell; index 0 is epoch hour `start_hour`.
+
+    `pinned_now` (the recorded_at of a replayed response) replaces the wall
+    clock as the default window start.
+    """
+
+    def __init__(self, grid_url, start_hour, layers, units, fetched_at=None, pinned_now=None):
+        self.grid_url = grid_url
+        self.start_hour = start_hour
+        self.layers = layers
+        self.units = units
+        self.fetched_at = fetched_at or time.time()
+        self.pinned_now = pinned_now
+
+    def now(self):
+        return self.pinned_now if self.pinned_now is not None else time.time()
+
+    @classmethod
+    def from_response(cls, g, grid_url, pinned_now=None):
+        props = g.get("properties", {})
+        parsed = {}
+        for name, layer in props.items():
+            if not isinstance(layer, dict) or not isinstance(layer.get("values"), list):
+                continue
+            spans = []
+            for v in layer["values"]:
+                val = v.get("value")
+                if not isinstance(val, (int, float)) or isinstance(val, bool):
+                    continue
+                try:
+                    spans.append((*parse_valid_time(v["validTime"]), float(val)))
+                except (KeyError, ValueError):
+                    continue
+            if spans:
+                parsed[name] = (spans, layer.get("uom"))
+        if not parsed:
+            return cls(grid_url, int((pinned_now or time.time()) // 3600), {}, {}, pinned_now=pinned_now)
+
+        start = min(s for spans, _ in parsed.values() for s, _, _ in spans)
+        end = max(s + n for spans, _ in parsed.values() for s, n, _ in spans)
+        layers, units = {}, {}
+        for name, (spans, uom) in parsed.items():
+            arr = np.full(end - start, np.nan, dtype=np.float32)
+            accum = name in ACCUMULATED
+            for s, n, val in spans:
+                arr[s - start:s - start + n] = val / n if accum else val
+            layers[name] = arr
+            units[name] = uom
+        return cls(grid_url, start, layers, units, pinned_now=pinned_now)
+
+    @property
+    def hours(self):
+        return max((a.size for a in self.layers.values()), default=0)
+
+    def window(self, layer, hours=24, start=None):
+        """Hourly values of `layer` for [start, start+hours); start defaults to self.now()."""
+        arr = self.layers.get(layer)
+        if arr is None:
+            return np.empty(0, dtype=np.float32)
+        if start is None:
+            start = self.now()
+        if isinstance(start, dt.datetime):
+            start = start.timestamp()
+        i0 = max(0, int(start // 3600) - self.start_hour)
+        return arr[i0:i0 + int(hours)]
+
+    def total(self, layer, hours=24, start=None):
+        w = self.window(layer, hours, start)
+        return series_total(w) if w.size else None
+
+    def mean(self, layer, hours=24, start=None):
+        return series_mean(self.window(layer, hours, start))
+
+
+class _TTLCache:
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._d = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._d.get(key)
+            if hit is None or time.time() - hit[0] > self.ttl:
+                return None
+            self._d.move_to_end(key)
+            return hit[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._d[key] = (time.time(), value)
+            self._d.move_to_end(key)
+            while len(self._d) > self.maxsize:
+                self._d.popitem(last=False)
+
+
+_points = _TTLCache(POINTS_TTL_S, MAX_CELLS * 8)
+_grids = _TTLCache(GRID_TTL_S, MAX_CELLS)
+
+
+def _point_key(lat, lon):
+    # weather.gov resolves /points at 4 decimals; anything finer is the same cell
+    return round(lat, 4), round(lon, 4)
+
+
+def get_grid(lat, lon):
+    """GridSeries for the NWS cell covering (lat, lon); raises on provider errors."""
+    pkey = _point_key(lat, lon)
+    grid_url = _points.get(pkey)
+    if grid_url is None:
+        p = fetch("nws", NWS_POINTS.format(lat=pkey[0], lon=pkey[1]), timeout=15,
+                  headers=nws_headers(), ttl=POINTS_TTL_S)
+        grid_url = p["properties"]["forecastGridData"]
+        _points.put(pkey, grid_url)
+    series = None if is_refreshing() else _grids.get(grid_url)
+    if series is None:
+        g = fetch("nws", grid_url, timeout=20, headers=nws_headers("application/geo+json"))
+        series = GridSeries.from_response(g, grid_url, pinned_now=replayed_at())
+        _grids.put(grid_url, series)
+    return series
+
+
+async def aget_grid(lat, lon):
+    pkey = _point_key(lat, lon)
+    grid_url = _points.get(pkey)
+    if grid_url is None:
+        p = await afetch("nws", NWS_POINTS.format(lat=pkey[0], lon=pkey[1]), timeout=15,
+                         headers=nws_headers(), ttl=POINTS_TTL_S)
+        grid_url = p["properties"]["forecastGridData"]
+        _points.put(pkey, grid_url)
+    series = None if is_refreshing() else _grids.get(grid_url)
+    if series is None:
+        g = await afetch("nws", grid_url, timeout=20, headers=nws_headers("application/geo+json"))
+        series = GridSeries.from_response(g, grid_url, pinned_now=replayed_at())
+        _grids.put(grid_url, series)
+    return series
@@ -0,0 +1,195 @@
+# backend/utils/orbits.py
+"""
+Fleet ground tracks and swath coverage over an area of interest.
+
+Satellites fly circular orbits with J2 secular drift (node regression and
+the along-track rate change), over a spherical Earth rotating from the GMST
+at the element epoch -- plenty for planning-scale revisit statistics. The
+default fleet is LEO-SAT-001..012: three sun-synchronous planes at 550 km,
+four satellites each; LEO_FLEET_PATH may point at a JSON list of
+{"id", "alt_km", "inc_deg", "raan_deg", "phase_deg", "swath_km"} instead.
+
+coverage() works in three vectorized steps:
+
+  1. propagate every satellite on a COARSE_STEP_S grid over the window and
+     keep the steps whose sub-point is within reach of the AOI
+  2. re-propagate only those stretches, all passes in one batch, at the
+     longest step whose swath-radius circles still join into the full
+     swath band to within half a cell (2 * sqrt(half_swath * res))
+  3. swath test: sample unit vectors @ cell unit vectors, thresholded at
+     the half-swath angle, OR-reduced per pass (np.logical_or.reduceat)
+
+Revisits per cell are passes that covered it; the max gap runs from the
+window start through each covering pass to the window end.
+"""
+import datetime as dt
+import json
+import math
+import os
+
+import numpy as np
+
+MU_KM3_S2 = 398600.4418
+R_EARTH_KM = 6378.137
+J2 = 1.08263e-3
+OMEGA_EARTH = 7.2921159e-5        # rad/s
+
+COARSE_STEP_S = 30.0
+MAX_CELLS_SIDE = 200
+CHUNK_ELEMS = 8_000_000           # samples x cells per swath-test block
+ELEMENT_EPOCH = dt.datetime(2025, 1, 1)
+
+
+def default_fleet():
+    fleet = []
+    for plane in range(3):
+        for slot in range(4):
+            fleet.append({"id": f"LEO-SAT-{plane * 4 + slot + 1:03d}", "alt_km": 550.0, "inc_deg": 97.6,
+                          "raan_deg": 120.0 * plane, "phase_deg": 90.0 * slot + 30.0 * plane,
+                          "swath_km": 120.0})
+    return fleet
+
+
+def load_fleet():
+    path = os.getenv("LEO_FLEET_PATH")
+    if not path:
+        return default_fleet()
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Fleet:
+    """Orbital elements as arrays, one entry per satellite."""
+
+    def __init__(self, sats, epoch=ELEMENT_EPOCH):
+        self.ids = [s["id"] for s in sats]
+        self.epoch = epoch
+        a = R_EARTH_KM + np.array([s["alt_km"] for s in sats], dtype=float)
+        inc = np.radians([s["inc_deg"] for s in sats])
+        n = np.sqrt(MU_KM3_S2 / a ** 3)
+        k = 0.75 * J2 * (R_EARTH_KM / a) ** 2
+        self.inc = inc
+        self.raan0 = np.radians([s["raan_deg"] for s in sats])
+        self.u0 = np.radians([s["phase_deg"] for s in sats])
+        self.raan_rate = -2.0 * k * n * np.cos(inc)
+        self.u_rate = n * (1.0 + k * (5.0 * np.cos(inc) ** 2 - 1.0) + k * (3.0 * np.cos(inc) ** 2 - 1.0))
+        self.ground_speed = R_EARTH_KM * n                      # km/s, close enough for step sizing
+        self.half_swath = np.array([s["swath_km"] for s in sats], dtype=float) / 2.0
+        jd = 2440587.5 + epoch.replace(tzinfo=dt.timezone.utc).timestamp() / 86400.0
+        self.gmst0 = math.radians((280.46061837 + 360.98564736629 * (jd - 2451545.0)) % 360.0)
+
+    def seconds(self, when):
+        return (when - self.epoch).total_seconds()
+
+    def subpoints(self, sat, t):
+        """Earth-fixed unit vectors (..., 3) under satellites `sat` at epoch seconds `t` (broadcast)."""
+        u = self.u0[sat] + self.u_rate[sat] * t
+        raan = self.raan0[sat] + self.raan_rate[sat] * t - (self.gmst0 + OMEGA_EARTH * t)
+        inc = self.inc[sat]
+        cu, su, cr, sr, ci = np.cos(u), np.sin(u), np.cos(raan), np.sin(raan), np.cos(inc)
+        return np.stack([cr * cu - sr * su * ci, sr * cu + cr * su * ci, su * np.sin(inc)], axis=-1)
+
+
+def unit_vectors(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def aoi_grid(geom, res_km):
+    """Cell centres over the geometry's bounds: (lats[h], lons[w], inside[h, w], res_km)."""
+    import shapely
+    west, south, east, north = geom.bounds
+    coslat = max(0.05, math.cos(math.radians((south + north) / 2.0)))
+    span_km = max((north - south) * 111.32, (east - west) * 111.32 * coslat)
+    res_km = max(res_km, span_km / MAX_CELLS_SIDE)
+    dlat = res_km / 111.32
+    dlon = dlat / coslat
+    h = max(1, math.ceil((north - south) / dlat))
+    w = max(1, math.ceil((east - west) / dlon))
+    lats = north - (np.arange(h) + 0.5) * (north - south) / h
+    lons = west + (np.arange(w) + 0.5) * (east - west) / w
+    xx, yy = np.meshgrid(lons, lats)
+    inside = shapely.contains_xy(geom, xx, yy)
+    if not inside.any():
+        # AOI thinner than a cell: keep the cell under its representative point
+        p = geom.representative_point()
+        inside[int(np.argmin(np.abs(lats - p.y))), int(np.argmin(np.abs(lons - p.x)))] = True
+    return lats, lons, inside, res_km
+
+
+def _runs(mask):
+    """(sat, first, last) index triples of True runs along axis 1 of a 2-D mask."""
+    padded = np.pad(mask.astype(np.int8), ((0, 0), (1, 1)))
+    d = np.diff(padded, axis=1)
+    sat_s, start = np.nonzero(d == 1)
+    _, stop = np.nonzero(d == -1)
+    return sat_s, start, stop - 1
+
+
+def coverage(fleet, geom, start, end, res_km=5.0):
+    """Revisit counts, max gaps and the covering passes of every satellite over `geom`."""
+    lats, lons, inside, res_km = aoi_grid(geom, res_km)
+    cells = unit_vectors(*np.meshgrid(lats, lons, indexing="ij"))[inside]          # (C, 3)
+    t0, t1 = fleet.seconds(start), fleet.seconds(end)
+    n_sat = len(fleet.ids)
+
+    # 1. coarse track, keep steps within reach of the AOI
+    tc = np.arange(t0, t1 + COARSE_STEP_S, COARSE_STEP_S)
+    centre = unit_vectors(float(lats.mean()), float(lons.mean()))
+    aoi_radius = float(np.arccos(np.clip(cells @ centre, -1.0, 1.0)).max()) * R_EARTH_KM
+    sub = fleet.subpoints(np.arange(n_sat)[:, None], tc[None, :])                  # (S, T, 3)
+    reach = aoi_radius + fleet.half_swath + fleet.ground_speed * COARSE_STEP_S
+    near = sub @ centre >= np.cos(reach / R_EARTH_KM)[:, None]
+    sat_of, first, last = _runs(near)
+
+    # 2. fine samples for every pass, one propagation call
+    step = np.minimum(2.0 * np.sqrt(fleet.half_swath * res_km), fleet.half_swath) / fleet.ground_speed  # (S,)
+    lo = np.maximum(tc[first] - COARSE_STEP_S, t0)
+    hi = np.minimum(tc[last] + COARSE_STEP_S, t1)
+    counts = np.ceil((hi - lo) / step[sat_of]).astype(int) + 1
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    k = np.arange(counts.sum()) - np.repeat(starts, counts)
+    pass_of = np.repeat(np.arange(len(counts)), counts)
+    sat_f = sat_of[pass_of]
+    tf = np.minimum(lo[pass_of] + k * step[sat_f], hi[pass_of])
+    subf = fleet.subpoints(sat_f, tf)                                             # (N, 3)
+
+    # 3. swath test, reduced per pass
+    thr = np.cos(fleet.half_swath[sat_f] / R_EARTH_KM)
+    hit = np.zeros((len(counts), len(cells)), dtype=bool)
+    budget = max(1, CHUNK_ELEMS // len(cells))
+    a = 0
+    while a < len(counts):
+        # whole passes per block, about `budget` samples each
+        b = max(a + 1, int(np.searchsorted(ends, starts[a] + budget, side="right")))
+        s0, s1 = starts[a], ends[b - 1]
+        inside_swath = (subf[s0:s1] @ cells.T) >= thr[s0:s1, None]
+        hit[a:b] = np.logical_or.reduceat(inside_swath, starts[a:b] - s0, axis=0)
+        a = b
+
+    covering = hit.any(axis=1)
+    hit, sat_of, lo, hi = hit[covering], sat_of[covering], lo[covering], hi[covering]
+    order = np.argsort(lo, kind="stable")
+    hit, sat_of, lo, hi = hit[order], sat_of[order], lo[order], hi[order]
+    mid = (lo + hi) / 2.0
+
+    # revisits and max gap per cell
+    revisits = hit.sum(axis=0)
+    if len(mid):
+        last_seen = np.maximum.accumulate(np.where(hit, mid[:, None], -np.inf), axis=0)
+        prev = np.vstack([np.full((1, len(cells)), t0), np.maximum(last_seen[:-1], t0)])
+        gaps = np.where(hit, mid[:, None] - prev, 0.0).max(axis=0)
+        max_gap = np.maximum(gaps, t1 - np.maximum(last_seen[-1], t0))
+    else:
+        max_gap = np.full(len(cells), t1 - t0)
+
+    rev_grid = np.full(inside.shape, -1, dtype=int)
+    gap_grid = np.full(inside.shape, np.nan)
+    rev_grid[inside] = revisits
+    gap_grid[inside] = max_gap / 3600.0
+    passes = [{"satellite": fleet.ids[s], "start": fleet.epoch + dt.timedelta(seconds=float(a)),
+               "end": fleet.epoch + dt.timedelta(seconds=float(b)), "cells": int(h.sum())}
+              for s, a, b, h in zip(sat_of, lo, hi, hit)]
+    return {"lats": lats, "lons": lons, "res_km": res_km, "revisits": rev_grid,
+            "max_gap_h": gap_grid, "passes": passes, "hours": (t1 - t0) / 3600.0}
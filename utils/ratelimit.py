@@ -0,0 +1,178 @@
+# backend/utils/ratelimit.py
+"""
+Outbound rate limiting per provider, shared by every worker on the host.
+
+Each provider has a token bucket (rate per second, burst) kept in the state
+DB and updated in one IMMEDIATE transaction per attempt, so all gunicorn
+workers draw from the same budget. Priorities are enforced by headroom:
+
+  INTERACTIVE  may take the last token
+  PREFETCH     only while RESERVE[PREFETCH] of the burst stays free
+  BATCH        only while RESERVE[BATCH] of the burst stays free
+
+and while an interactive caller anywhere is waiting for a token, lower
+priorities stand aside. A caller waits (queues) up to MAX_WAIT_S for its
+priority and is then shed with RateLimited. A 429 from the provider
+empties the bucket until its Retry-After has passed.
+
+LEO_RATE_<PROVIDER>="rate,burst" overrides the defaults; "0" disables.
+"""
+from contextlib import contextmanager
+import contextvars
+import os
+import time
+
+from utils.state_db import state_db
+
+INTERACTIVE, PREFETCH, BATCH = 0, 1, 2
+
+# (tokens per second, burst)
+PROVIDER_RATES = {
+    "nws": (5.0, 20),
+    "firms": (5.0, 20),          # MAP_KEY allows 5000 calls / 10 min
+    "open-meteo": (1.3, 30),     # free tier: 5000 calls / hour
+    "cdse": (2.0, 10),
+}
+RESERVE = {INTERACTIVE: 0.0, PREFETCH: 0.3, BATCH: 0.6}
+MAX_WAIT_S = {INTERACTIVE: 3.0, PREFETCH: 15.0, BATCH: 60.0}
+DEFAULT_RETRY_AFTER_S = 30.0
+
+_priority = contextvars.ContextVar("leo_upstream_priority", default=INTERACTIVE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ratelimit (
+    provider TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    blocked_until REAL NOT NULL,
+    interactive_until REAL NOT NULL
+)
+"""
+
+
+class RateLimited(Exception):
+    def __init__(self, provider, wait_s):
+        super().__init__(f"{provider} rate limit: retry in {wait_s:.1f}s")
+        self.provider = provider
+        self.retry_after = wait_s
+
+
+@contextmanager
+def priority(level):
+    """Calls made inside the block (this thread/task) use `level`."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+def provider_rate(provider):
+    """(rate, burst), or None when the provider is unlimited."""
+    env = os.getenv("LEO_RATE_" + provider.upper().replace("-", "_"))
+    if env is not None:
+        if env.strip() in ("", "0"):
+            return None
+        rate, _, burst = env.partition(",")
+        return float(rate), float(burst or rate)
+    return PROVIDER_RATES.get(provider)
+
+
+def _db():
+    return state_db(_SCHEMA)
+
+
+def try_acquire(provider, level=None):
+    """Take one token if allowed; returns 0.0 on success, else seconds until worth retrying."""
+    limits = provider_rate(provider)
+    if limits is None:
+        return 0.0
+    rate, burst = limits
+    level = current_priority() if level is None else level
+    now = time.time()
+    c = _db()
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        row = c.execute("SELECT tokens, updated_at, blocked_until, interactive_until FROM ratelimit "
+                        "WHERE provider = ?", (provider,)).fetchone()
+        tokens, updated, blocked, inter = row if row else (burst, now, 0.0, 0.0)
+        tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+        floor = RESERVE[level] * burst
+        if blocked > now:
+            wait = blocked - now
+        elif level != INTERACTIVE and inter > now:
+            wait = inter - now
+        elif tokens - 1.0 >= floor:
+            tokens -= 1.0
+            wait = 0.0
+        else:
+            wait = (floor + 1.0 - tokens) / rate
+            if level == INTERACTIVE:
+                inter = max(inter, now + wait + 0.1)
+        c.execute("INSERT OR REPLACE INTO ratelimit (provider, tokens, updated_at, blocked_until, "
+                  "interactive_until) VALUES (?, ?, ?, ?, ?)", (provider, tokens, now, blocked, inter))
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK")
+        raise
+    return wait
+
+
+def _check(provider, level, wait, deadline):
+    if time.time() + wait > deadline:
+        raise RateLimited(provider, wait)
+    return min(wait, 0.5)
+
+
+def acquire(provider, level=None, max_wait=None):
+    """Block until a token is granted or raise RateLimited once MAX_WAIT_S (or max_wait) would be exceeded."""
+    level = current_priority() if level is None else level
+    deadline = time.time() + min(MAX_WAIT_S[level], MAX_WAIT_S[level] if max_wait is None else max_wait)
+    while True:
+        wait = try_acquire(provider, level)
+        if wait == 0.0:
+            return
+        time.sleep(_check(provider, level, wait, deadline))
+
+
+async def aacquire(provider, level=None, max_wait=None):
+    import asyncio
+    level = current_priority() if level is None else level
+    deadline = time.time() + min(MAX_WAIT_S[level], MAX_WAIT_S[level] if max_wait is None else max_wait)
+    while True:
+        # try_acquire takes a write lock with a busy timeout; keep it off the event loop
+        wait = await asyncio.to_thread(try_acquire, provider, level)
+        if wait == 0.0:
+            return
+        await asyncio.sleep(_check(provider, level, wait, deadline))
+
+
+def retry_after_s(headers):
+    v = (headers or {}).get("Retry-After")
+    try:
+        return max(1.0, float(v))
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER_S
+
+
+def penalize(provider, seconds):
+    """Provider said 429: no worker calls it again for `seconds`."""
+    if provider_rate(provider) is None:
+        return
+    now = time.time()
+    c = _db()
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        row = c.execute("SELECT blocked_until, interactive_until FROM ratelimit WHERE provider = ?",
+                        (provider,)).fetchone()
+        blocked, inter = row if row else (0.0, 0.0)
+        c.execute("INSERT OR REPLACE INTO ratelimit (provider, tokens, updated_at, blocked_until, "
+                  "interactive_until) VALUES (?, 0, ?, ?, ?)", (provider, now, max(blocked, now + seconds), inter))
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK")
+        raise
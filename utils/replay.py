@@ -0,0 +1,271 @@
+# backend/utils/replay.py
+"""
+Record/replay archive for provider responses (LEO_UPSTREAM_MODE).
+
+  live     default; providers are called over the network
+  record   live calls that skip cache reads, and every response (HTTP
+           errors included) is appended to the archive in LEO_FIXTURE_DIR
+  replay   no network, cache or rate limiting: responses come from the
+           archive and a request that was never recorded raises ReplayMiss
+           into the caller's usual fallback
+
+The archive is one pack file of zlib blobs per provider plus index.jsonl,
+one line per response: request key, status, recorded latency, offset and
+size in the pack. Workers append under a flock on the index; replay loads
+the index once per process and preads blobs. The latest recording of a
+request wins; `python -m utils.replay compact` drops the superseded ones.
+
+Keys are upstream.cache_key() over the redacted url (FIRMS MAP_KEY and key
+query parameters replaced) with credential form fields blanked, the index
+stores that redacted url, and JSON bodies are stored compact with access
+tokens replaced, so an archive can be shared and replays whatever key is
+configured (replaying CDSE still needs some CDSE_CLIENT_ID/SECRET set).
+Requests that carry dates (CDSE time ranges) only match on the day they
+were recorded. Replayed responses expose their recorded_at through
+replayed_at(), so consumers that window by "now" (utils.nws_grid) can pin
+their clock to the recording.
+
+LEO_REPLAY_LATENCY: "0" (default, full speed), "recorded", or a fixed ms.
+"""
+import contextvars
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+import zlib
+
+DEFAULT_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   "data", "fixtures")
+INDEX_NAME = "index.jsonl"
+MODES = ("live", "record", "replay")
+SECRET_FIELDS = ("client_id", "client_secret", "password", "username", "refresh_token")
+SECRET_PARAMS = ("map_key", "api_key", "apikey", "key", "token", "access_token")
+REDACTED = "REDACTED"
+
+# FIRMS carries its MAP_KEY as a path segment: /api/area/csv/<MAP_KEY>/<SOURCE>/...
+_FIRMS_KEY_PATH = re.compile(r"(/api/(?:area|country)/csv/)[^/]+/")
+_SECRET_QUERY = re.compile(r"([?&](?:%s)=)[^&#]*" % "|".join(SECRET_PARAMS), re.IGNORECASE)
+
+_replayed_at = contextvars.ContextVar("leo_replayed_at", default=None)
+
+
+class ReplayMiss(LookupError):
+    def __init__(self, provider, url):
+        super().__init__(f"no recorded {provider} response for {url}")
+        self.provider = provider
+
+
+def upstream_mode():
+    m = os.getenv("LEO_UPSTREAM_MODE", "live").strip().lower()
+    if m not in MODES:
+        raise ValueError(f"LEO_UPSTREAM_MODE must be one of {', '.join(MODES)}")
+    return m
+
+
+def fixture_dir():
+    return os.getenv("LEO_FIXTURE_DIR", DEFAULT_FIXTURE_DIR)
+
+
+def redact_form(data):
+    """Form body with credential values blanked, so keys don't depend on (or leak) secrets."""
+    if not isinstance(data, dict):
+        return data
+    return {k: ("" if k in SECRET_FIELDS else v) for k, v in data.items()}
+
+
+def redact_url(url):
+    """URL with API keys in the path or query replaced, for fixture keys and the index."""
+    url = _FIRMS_KEY_PATH.sub(r"\1%s/" % REDACTED, url)
+    return _SECRET_QUERY.sub(r"\1" + REDACTED, url)
+
+
+def replayed_at():
+    """recorded_at of the last response replayed in this context, else None (live/record)."""
+    return _replayed_at.get()
+
+
+def normalize(content):
+    """Compact JSON with tokens replaced; other bodies are stored as-is."""
+    try:
+        obj = json.loads(content)
+    except ValueError:
+        return content
+    if isinstance(obj, dict) and "access_token" in obj:
+        obj["access_token"] = "replay"
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class Archive:
+    def __init__(self, path):
+        self.path = path
+        self._index = None
+        self._fds = {}
+        self._lock = threading.Lock()
+
+    def _pack_path(self, provider):
+        return os.path.join(self.path, provider + ".pack")
+
+    # -- write --
+    def append(self, provider, key, method, url, status, latency_ms, content):
+        blob = zlib.compress(normalize(content), 6)
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, INDEX_NAME), "a", encoding="utf-8") as idx:
+            fcntl.flock(idx, fcntl.LOCK_EX)
+            try:
+                with open(self._pack_path(provider), "ab") as pack:
+                    offset = pack.seek(0, os.SEEK_END)
+                    pack.write(blob)
+                idx.write(json.dumps({
+                    "key": key, "provider": provider, "method": method.upper(), "url": redact_url(url),
+                    "status": status, "latency_ms": round(latency_ms, 1),
+                    "offset": offset, "size": len(blob), "recorded_at": round(time.time(), 3),
+                }, separators=(",", ":")) + "\n")
+            finally:
+                fcntl.flock(idx, fcntl.LOCK_UN)
+
+    # -- read --
+    def entries(self):
+        """Index lines in file order; a torn last line (writer killed mid-append) is skipped."""
+        try:
+            f = open(os.path.join(self.path, INDEX_NAME), encoding="utf-8")
+        except FileNotFoundError:
+            return []
+        out = []
+        with f:
+            for line in f:
+                try:
+                    out.append(json.loads(line))
+                except ValueError:
+                    continue
+        return out
+
+    def _load(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = {e["key"]: e for e in self.entries()}
+        return self._index
+
+    def lookup(self, key):
+        """(status, latency_ms, body bytes, recorded_at) of the latest recording of `key`, else None."""
+        e = self._load().get(key)
+        if e is None:
+            return None
+        return e["status"], e["latency_ms"], self.read(e), e["recorded_at"]
+
+    def read(self, e):
+        fd = self._fds.get(e["provider"])
+        if fd is None:
+            with self._lock:
+                fd = self._fds.get(e["provider"])
+                if fd is None:
+                    fd = self._fds[e["provider"]] = os.open(self._pack_path(e["provider"]), os.O_RDONLY)
+        return zlib.decompress(os.pread(fd, e["size"], e["offset"]))
+
+    def __len__(self):
+        return len(self._load())
+
+
+_archives = {}
+
+
+def get_archive():
+    path = fixture_dir()
+    a = _archives.get(path)
+    if a is None:
+        a = _archives[path] = Archive(path)
+    return a
+
+
+# -----------------------------
+# Hooks used by utils.upstream
+# -----------------------------
+def record(provider, key, method, url, status, latency_ms, content):
+    try:
+        get_archive().append(provider, key, method, url, status, latency_ms, content)
+    except Exception as e:
+        print("fixture record failed:", repr(e))   # recording must never fail the request
+
+
+def _replay_delay(latency_ms):
+    v = os.getenv("LEO_REPLAY_LATENCY", "0").strip().lower()
+    if v == "recorded":
+        return latency_ms / 1000.0
+    return float(v) / 1000.0
+
+
+def _answer(provider, url, hit):
+    if hit is None:
+        raise ReplayMiss(provider, redact_url(url))
+    status, _, content, recorded_at = hit
+    _replayed_at.set(recorded_at)
+    if status >= 400:
+        import requests
+        r = requests.Response()
+        r.status_code, r._content, r.url = status, content, url
+        r.raise_for_status()
+    return content
+
+
+def replayed(provider, key, url):
+    """Recorded body for a request, after the simulated latency; raises like a live call would."""
+    hit = get_archive().lookup(key)
+    delay = _replay_delay(hit[1]) if hit else 0.0
+    if delay > 0:
+        time.sleep(delay)
+    return _answer(provider, url, hit)
+
+
+async def areplayed(provider, key, url):
+    import asyncio
+    hit = get_archive().lookup(key)
+    delay = _replay_delay(hit[1]) if hit else 0.0
+    if delay > 0:
+        await asyncio.sleep(delay)
+    return _answer(provider, url, hit)
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def info(archive):
+    stats = {}
+    for e in archive.entries():
+        s = stats.setdefault(e["provider"], {"responses": 0, "keys": set(), "errors": 0, "bytes": 0, "ms": []})
+        s["responses"] += 1
+        s["keys"].add(e["key"])
+        s["errors"] += e["status"] >= 400
+        s["bytes"] += e["size"]
+        s["ms"].append(e["latency_ms"])
+    return {p: {"responses": s["responses"], "requests": len(s["keys"]), "errors": s["errors"],
+                "packed_bytes": s["bytes"], "median_latency_ms": sorted(s["ms"])[len(s["ms"]) // 2]}
+            for p, s in sorted(stats.items())}
+
+
+def compact(archive):
+    """Rewrite the packs keeping only the latest recording per request (run while nothing records)."""
+    entries = archive.entries()
+    latest = {e["key"]: e for e in entries}
+    tmp = Archive(archive.path + ".compact")
+    for e in sorted(latest.values(), key=lambda e: e["recorded_at"]):
+        blob = archive.read(e)
+        tmp.append(e["provider"], e["key"], e["method"], e["url"], e["status"], e["latency_ms"], blob)
+    for name in os.listdir(tmp.path):
+        os.replace(os.path.join(tmp.path, name), os.path.join(archive.path, name))
+    os.rmdir(tmp.path)
+    return len(entries) - len(latest)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Inspect or compact the provider fixture archive")
+    ap.add_argument("command", choices=("info", "compact"))
+    ap.add_argument("--dir", default=fixture_dir())
+    args = ap.parse_args()
+    arc = Archive(args.dir)
+    if args.command == "info":
+        print(json.dumps(info(arc), indent=2))
+    else:
+        print(json.dumps({"dropped": compact(arc)}))
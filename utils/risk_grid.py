@@ -0,0 +1,366 @@
+# backend/utils/risk_grid.py
+"""
+Vectorized versions of the wildfire/flood heuristics in routes.predictions,
+plus the slippy-map tile math and colouring used by /api/tiles and the
+block scorer behind /api/export.
+
+The scalar endpoints call the same functions with 0-d arrays, so the
+formulas are shared; the inputs are not. /api/wildfire-risk scores 24 h NWS
+means at the point, while tiles and exports interpolate a coarse
+open-meteo lattice, so a tile pixel and a click at the same spot can
+differ by however much the two weather sources disagree. FIRMS detections
+go through the same firms_risk kernel in both. Missing inputs are NaN,
+which behaves like the endpoints' None checks.
+"""
+import io
+import math
+
+import numpy as np
+
+FIRMS_RADIUS_KM = 50.0
+FIRMS_AGGREGATE_ABOVE = 1000   # detections beyond this are binned, not dropped
+FIRMS_BIN_DEG = 0.01           # ~1 km bins, small against the 50 km kernel
+_CONF_MAP = {"low": 30, "nominal": 60, "high": 90}
+
+
+# -----------------------------
+# Heuristics
+# -----------------------------
+def firms_arrays(rows):
+    """
+    (lat, lon, conf, frp) arrays from FIRMS CSV rows, skipping bad
+    coordinates. Past FIRMS_AGGREGATE_ABOVE detections the arrays are
+    binned with aggregate_detections, so every row still counts.
+    """
+    lat, lon, conf, frp = [], [], [], []
+    for row in rows or []:
+        try:
+            fy = float(row["latitude"]); fx = float(row["longitude"])
+        except Exception:
+            continue
+        conf_raw = row.get("confidence", "50")
+        try:
+            c = float(conf_raw)
+        except Exception:
+            c = _CONF_MAP.get(str(conf_raw).strip().lower(), 50)
+        try:
+            f = float(row.get("frp", 1.0))
+        except Exception:
+            f = 1.0
+        lat.append(fy); lon.append(fx); conf.append(c); frp.append(f)
+    det = (np.array(lat), np.array(lon), np.array(conf, dtype=float), np.array(frp, dtype=float))
+    if det[0].size > FIRMS_AGGREGATE_ABOVE:
+        det = aggregate_detections(det)
+    return det
+
+
+def aggregate_detections(det, bin_deg=FIRMS_BIN_DEG):
+    """
+    Detections merged per bin_deg cell into one pseudo-detection at the
+    weight-averaged position carrying the summed firms_risk weight
+    (conf 100, frp 10 x sum). firms_risk over the result matches the raw
+    sum to within about bin_deg / kernel radius.
+    """
+    lat, lon, conf, frp = det
+    weight = (conf / 100.0) * (frp / 10.0)
+    cells = np.stack([np.floor(lat / bin_deg), np.floor(lon / bin_deg)], axis=1)
+    _, inv = np.unique(cells, axis=0, return_inverse=True)
+    inv = inv.ravel()
+    n = int(inv.max()) + 1
+    wsum = np.bincount(inv, weights=weight, minlength=n)
+    # zero-weight bins fall back to the plain mean position
+    pos_w = np.where(wsum[inv] > 0, weight, 1.0)
+    denom = np.bincount(inv, weights=pos_w, minlength=n)
+    return (np.bincount(inv, weights=lat * pos_w, minlength=n) / denom,
+            np.bincount(inv, weights=lon * pos_w, minlength=n) / denom,
+            np.full(n, 100.0), wsum * 10.0)
+
+
+def firms_risk(lats, lons, det, chunk=256):
+    """Distance-weighted detection sum at each (lat, lon); same 111 km/deg proxy as the endpoint."""
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    out = np.zeros(np.broadcast(lats, lons).shape)
+    dlat_all, dlon_all, conf, frp = det
+    weight = (conf / 100.0) * (frp / 10.0)
+    for s in range(0, dlat_all.size, chunk):
+        dy = lats[..., None] - dlat_all[s:s + chunk]
+        dx = lons[..., None] - dlon_all[s:s + chunk]
+        dist_km = np.sqrt(dy * dy + dx * dx) * 111.0
+        falloff = np.where(dist_km < FIRMS_RADIUS_KM, 1.0 - dist_km / FIRMS_RADIUS_KM, 0.0)
+        out += (falloff * weight[s:s + chunk]).sum(axis=-1)
+    return out
+
+
+def wildfire_score(risk_raw, rh, wind):
+    score = np.clip(risk_raw, 0.0, 1.0)
+    with np.errstate(invalid="ignore"):
+        score = score + np.where(rh < 25, 0.25, 0.0) + np.where(wind > 30, 0.2, 0.0)
+    return np.minimum(score, 1.0)
+
+
+def flood_probability(precip_mm, rh):
+    rh = np.where(np.isnan(rh), 50.0, rh)
+    return np.minimum(1.0, (precip_mm / 50.0) * 0.6 + (rh / 100.0) * 0.4)
+
+
+HAND_SCALE_M = 5.0        # susceptibility falls to 1/e at 5 m above drainage
+RAIN_SCALE_MM = 40.0
+NO_FORECAST_RAIN = 0.3    # rain factor assumed when there is no QPF
+
+
+def terrain_flood_probability(precip_mm, rh, hand_m, upstream_km2):
+    """
+    Terrain-aware flood probability: susceptibility from height above
+    drainage and upstream area, scaled by the QPF window. Where the DEM
+    doesn't cover the point, falls back to flood_probability().
+    """
+    precip_mm = np.asarray(precip_mm, dtype=float)
+    hand_m = np.asarray(hand_m, dtype=float)
+    susceptibility = (0.7 * np.exp(-np.maximum(hand_m, 0.0) / HAND_SCALE_M)
+                      + 0.3 * np.clip(np.log10(1.0 + np.nan_to_num(upstream_km2)) / 3.0, 0.0, 1.0))
+    rain = np.where(np.isnan(precip_mm), NO_FORECAST_RAIN, 1.0 - np.exp(-np.nan_to_num(precip_mm) / RAIN_SCALE_MM))
+    with np.errstate(invalid="ignore"):
+        terrain = np.minimum(1.0, susceptibility * (0.3 + 0.7 * rain))
+    return np.where(np.isnan(hand_m), flood_probability(precip_mm, rh), terrain)
+
+
+def flood_layer(lats, lons, precip_mm, rh):
+    """
+    (height above drainage, flood probability) on a lat/lon grid: the DEM
+    model where terrain is loaded, flood_probability() elsewhere. Tiles and
+    exports both score flood through this.
+    """
+    from utils.dem import get_dem
+    dem = get_dem()
+    if not dem.tiles:
+        return np.full(np.shape(precip_mm), np.nan), flood_probability(precip_mm, rh)
+    t = dem.sample(lats, lons)
+    return t["hand_m"], terrain_flood_probability(precip_mm, rh, t["hand_m"], t["upstream_km2"])
+
+
+def nan_if_none(v):
+    return np.nan if v is None else v
+
+
+# -----------------------------
+# Tile math (Web Mercator XYZ)
+# -----------------------------
+def tile_bounds(z, x, y):
+    """(west, south, east, north) in degrees."""
+    n = 2 ** z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+
+def tile_pixel_grid(z, x, y, size=256):
+    """Pixel-centre (lat, lon) arrays of shape (size, size), row 0 at the north edge."""
+    n = 2 ** z
+    frac = (np.arange(size) + 0.5) / size
+    lons = (x + frac) / n * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + frac) / n))))
+    return np.meshgrid(lats, lons, indexing="ij")
+
+
+def _lerp_index(s, size):
+    pos = (np.arange(size) + 0.5) / size * (s - 1)
+    i0 = np.clip(np.floor(pos).astype(int), 0, s - 2)
+    return i0, pos - i0
+
+
+def bilinear(samples, size, width=None):
+    """Upsample an (s, s) lattice spanning the area's edges to (size, width or size) cell centres."""
+    i0, t = _lerp_index(samples.shape[0], size)
+    j0, u = _lerp_index(samples.shape[1], size if width is None else width)
+    rows = samples[i0] * (1 - t)[:, None] + samples[i0 + 1] * t[:, None]
+    return rows[:, j0] * (1 - u)[None, :] + rows[:, j0 + 1] * u[None, :]
+
+
+# -----------------------------
+# Rendering
+# -----------------------------
+# score 0 -> green, 0.5 -> yellow, 1 -> red
+_STOPS = np.array([0.0, 0.5, 1.0])
+_COLORS = np.array([[46, 204, 113], [241, 196, 15], [231, 76, 60]], dtype=float)
+
+
+def render_png(score, alpha=170):
+    from PIL import Image
+    s = np.clip(np.nan_to_num(score, nan=-1.0), -1.0, 1.0)
+    rgba = np.zeros(score.shape + (4,), dtype=np.uint8)
+    for ch in range(3):
+        rgba[..., ch] = np.interp(s, _STOPS, _COLORS[:, ch]).astype(np.uint8)
+    rgba[..., 3] = np.where(np.isnan(score), 0, alpha)
+    buf = io.BytesIO()
+    Image.fromarray(rgba, "RGBA").save(buf, format="PNG", optimize=False)
+    return buf.getvalue()
+
+
+# -----------------------------
+# Risk tiles
+# -----------------------------
+LAYERS = ("wildfire", "flood")
+TILE_SIZE = 256
+WEATHER_SAMPLES = 5          # open-meteo lattice per tile side, one multi-location call
+FIRMS_MARGIN_DEG = 0.5       # ~50 km so detections just outside the tile still count
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+
+
+def _lattice_spec(lats, lons):
+    glat, glon = np.meshgrid(lats, lons, indexing="ij")
+    return {
+        "provider": "open-meteo", "url": OPEN_METEO_URL,
+        "params": {
+            "latitude": ",".join(f"{v:.3f}" for v in glat.ravel()),
+            "longitude": ",".join(f"{v:.3f}" for v in glon.ravel()),
+            "hourly": "relativehumidity_2m,windspeed_10m,precipitation",
+            "forecast_days": 1,
+            "timezone": "UTC",
+        },
+    }
+
+
+def _firms_spec(west, south, east, north):
+    import os
+    from routes.predictions import FIRMS_URL, FIRMS_SOURCE
+    key = os.getenv("FIRMS_KEY")
+    if not key:
+        return None
+    bbox = ",".join(f"{v:.3f}" for v in (
+        max(-180.0, west - FIRMS_MARGIN_DEG), max(-90.0, south - FIRMS_MARGIN_DEG),
+        min(180.0, east + FIRMS_MARGIN_DEG), min(90.0, north + FIRMS_MARGIN_DEG)))
+    return {"provider": "firms", "parse": "text",
+            "url": FIRMS_URL.format(MAP_KEY=key, SOURCE=FIRMS_SOURCE, BBOX=bbox, DAYS=1)}
+
+
+def tile_input_specs(layer, z, x, y):
+    """Upstream requests a tile depends on, as fetch() keyword dicts."""
+    n = 2 ** z
+    frac = np.linspace(0.0, 1.0, WEATHER_SAMPLES)
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + frac) / n))))
+    lons = (x + frac) / n * 360.0 - 180.0
+    specs = [_lattice_spec(lats, lons)]
+    if layer == "wildfire":
+        firms = _firms_spec(*tile_bounds(z, x, y))
+        if firms:
+            specs.append(firms)
+    return specs
+
+
+def tile_input_version(specs):
+    """Hash of when each input was cached; None if any input isn't cached yet."""
+    import hashlib
+    from utils.shared_cache import get_cache
+    from utils.upstream import cache_key
+    cache = get_cache()
+    if cache is None:
+        return None
+    stamps = []
+    for spec in specs:
+        at = cache.stored_at(cache_key("GET", spec["url"], spec.get("params")))
+        if at is None:
+            return None
+        stamps.append(f"{at:.3f}")
+    return hashlib.sha1("|".join(stamps).encode()).hexdigest()[:12]
+
+
+def _weather_lattice(spec):
+    from utils.upstream import fetch
+    s = WEATHER_SAMPLES
+    nan = np.full((s, s), np.nan)
+    try:
+        res = fetch(spec["provider"], spec["url"], params=spec["params"], timeout=10)
+    except Exception:
+        return nan, nan, nan
+    if isinstance(res, dict):
+        res = [res]
+    rh, wind, precip = [], [], []
+    for loc in res:
+        h = loc.get("hourly", {})
+        def arr(k):
+            return np.array([np.nan if v is None else v for v in h.get(k, [])[:24]], dtype=float)
+        r, w, p = arr("relativehumidity_2m"), arr("windspeed_10m"), arr("precipitation")
+        rh.append(np.nanmean(r) if np.isfinite(r).any() else np.nan)
+        wind.append(np.nanmean(w) if np.isfinite(w).any() else np.nan)
+        precip.append(np.nansum(p) if p.size else np.nan)
+    if len(rh) != s * s:
+        return nan, nan, nan
+    return (np.array(rh).reshape(s, s), np.array(wind).reshape(s, s), np.array(precip).reshape(s, s))
+
+
+def _firms_detections(spec):
+    import csv
+    from utils.upstream import fetch
+    try:
+        text = fetch("firms", spec["url"], timeout=20, parse="text")
+        return firms_arrays(list(csv.DictReader(io.StringIO(text))))
+    except Exception:
+        return None
+
+
+def render_risk_tile(layer, z, x, y, specs):
+    """Score every pixel of the tile with the endpoint heuristics and encode a PNG."""
+    rh_s, wind_s, precip_s = _weather_lattice(specs[0])
+    rh, wind, precip = (bilinear(a, TILE_SIZE) for a in (rh_s, wind_s, precip_s))
+    if layer == "flood":
+        return render_png(flood_layer(*tile_pixel_grid(z, x, y, TILE_SIZE), precip, rh)[1])
+
+    risk_raw = np.zeros((TILE_SIZE, TILE_SIZE))
+    if len(specs) > 1:
+        det = _firms_detections(specs[1])
+        if det is not None and det[0].size:
+            # detections are scored on a 64 px lattice and repeated up: the 50 km
+            # kernel is far wider than 4 px at every zoom where detections matter
+            lat, lon = tile_pixel_grid(z, x, y, TILE_SIZE // 4)
+            risk_raw = np.repeat(np.repeat(firms_risk(lat, lon, det), 4, axis=0), 4, axis=1)
+    return render_png(wildfire_score(risk_raw, rh, wind))
+
+
+# -----------------------------
+# Regional export
+# -----------------------------
+EXPORT_BLOCK = 64            # cells per block side; one lattice + one FIRMS call per block
+
+
+def region_axes(west, south, east, north, res):
+    """Cell-centre latitudes (north first) and longitudes of a res-degree grid over the bbox."""
+    h = max(1, int(math.ceil((north - south) / res - 1e-9)))
+    w = max(1, int(math.ceil((east - west) / res - 1e-9)))
+    return north - (np.arange(h) + 0.5) * res, west + (np.arange(w) + 0.5) * res
+
+
+def region_blocks(lats, lons, block=EXPORT_BLOCK):
+    """(lats, lons) axis slices of each block, row-major from the north-west corner."""
+    for i in range(0, len(lats), block):
+        for j in range(0, len(lons), block):
+            yield lats[i:i + block], lons[j:j + block]
+
+
+def score_block(lats, lons, res, layers=LAYERS):
+    """
+    Column arrays (flattened, row-major) for one block: the tile heuristics
+    on an open-meteo lattice spanning the block, FIRMS around it for
+    wildfire and the DEM model for flood where terrain is available.
+    """
+    north, south = lats[0] + res / 2.0, lats[-1] - res / 2.0
+    west, east = lons[0] - res / 2.0, lons[-1] + res / 2.0
+    glat, glon = np.meshgrid(lats, lons, indexing="ij")
+    h, w = glat.shape
+    rh_s, wind_s, precip_s = _weather_lattice(_lattice_spec(np.linspace(north, south, WEATHER_SAMPLES),
+                                                            np.linspace(west, east, WEATHER_SAMPLES)))
+    rh, wind, precip = (bilinear(a, h, w) for a in (rh_s, wind_s, precip_s))
+    cols = {"lat": glat, "lon": glon, "humidity": rh, "wind_kmh": wind, "precip_24h_mm": precip}
+    if "wildfire" in layers:
+        risk_raw = np.zeros((h, w))
+        spec = _firms_spec(west, south, east, north)
+        det = _firms_detections(spec) if spec else None
+        if det is not None and det[0].size:
+            risk_raw = firms_risk(glat, glon, det)
+        cols["firms_raw"] = risk_raw
+        cols["wildfire_risk"] = wildfire_score(risk_raw, rh, wind)
+    if "flood" in layers:
+        cols["height_above_drainage_m"], cols["flood_probability"] = flood_layer(glat, glon, precip, rh)
+    return {k: np.ravel(v) for k, v in cols.items()}
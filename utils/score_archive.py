@@ -0,0 +1,318 @@
+# backend/utils/score_archive.py
+"""
+Archive of every risk score the API emits, for time-travel queries.
+
+Emitting endpoints append one row (time, kind, point, score, the cell's
+feature vector) to a hot log table in the shared state DB. A background
+compactor (one per host, like the prewarmer) moves rows of closed hours
+into columnar day partitions:
+
+  LEO_ARCHIVE_DIR/<kind>/<YYYY-MM-DD>.<version>/
+      key.npy ts.npy lat.npy lon.npy score.npy feats.npy meta.json
+
+Rows are sorted by (cell key, time), where the key orders cells row-major
+on the feature-store grid, so a bbox is one searchsorted slice per grid
+row. The columns are opened with mmap_mode="r". A merge writes a new
+version directory and swaps it in the score_partitions manifest in the
+same transaction that deletes the compacted log rows; queries read the
+manifest and the log in one snapshot, so every row is seen exactly once.
+Superseded versions are removed on a later pass.
+
+Queries never touch upstream providers. LEO_ARCHIVE=0 turns recording off.
+"""
+import datetime as dt
+import fcntl
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from utils.feature_store import CELL_DEG, FEATURES, cell_of
+from utils.state_db import state_db
+
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "archive")
+KINDS = ("wildfire", "flood", "crop", "ai_wildfire", "ai_flood", "ai_crop")
+COLUMNS = ("key", "ts", "lat", "lon", "score", "feats")
+KEEP_DAYS = int(os.getenv("LEO_ARCHIVE_KEEP_DAYS", "365"))
+COMPACT_POLL_S = 300.0
+COMPACT_BATCH = 200_000
+GRACE_S = 300.0            # superseded partition versions outlive in-flight readers by this much
+_OFFSET = 1 << 20          # keeps cell indices positive in the key
+
+LOCK_PATH = os.path.join(tempfile.gettempdir(), "leo_archive.lock")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS score_log (
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    score REAL NOT NULL,
+    feats BLOB
+);
+CREATE INDEX IF NOT EXISTS score_log_kind_ts ON score_log (kind, ts);
+CREATE TABLE IF NOT EXISTS score_partitions (
+    kind TEXT NOT NULL,
+    day TEXT NOT NULL,
+    path TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    t0 REAL NOT NULL,
+    t1 REAL NOT NULL,
+    PRIMARY KEY (kind, day)
+);
+"""
+
+
+def _db():
+    return state_db(_SCHEMA)
+
+
+def archive_dir():
+    return os.getenv("LEO_ARCHIVE_DIR", DEFAULT_ARCHIVE_DIR)
+
+
+def enabled():
+    return os.getenv("LEO_ARCHIVE", "1") != "0"
+
+
+def cell_key(cy, cx):
+    return (np.asarray(cy, dtype=np.int64) + _OFFSET) * (2 * _OFFSET) + (np.asarray(cx, dtype=np.int64) + _OFFSET)
+
+
+def _day(ts):
+    return dt.datetime.utcfromtimestamp(ts).strftime("%Y-%m-%d")
+
+
+# -----------------------------
+# Recording
+# -----------------------------
+def record_many(rows):
+    """Append emitted scores, rows of (kind, lat, lon, score, FeatureRecord or None); never raises."""
+    if not enabled():
+        return
+    now = time.time()
+    try:
+        _db().executemany(
+            "INSERT INTO score_log (ts, kind, lat, lon, score, feats) VALUES (?, ?, ?, ?, ?, ?)",
+            [(now, kind, float(lat), float(lon), float(score),
+              None if feats is None else np.asarray(feats.values, dtype=np.float32).tobytes())
+             for kind, lat, lon, score, feats in rows if score is not None])
+    except Exception as e:
+        print("score archive write failed:", repr(e))
+
+
+def record(kind, lat, lon, score, feats=None):
+    record_many([(kind, lat, lon, score, feats)])
+
+
+# -----------------------------
+# Partitions
+# -----------------------------
+def _feat_matrix(blobs):
+    out = np.full((len(blobs), len(FEATURES)), np.nan, dtype=np.float32)
+    for i, b in enumerate(blobs):
+        if b:
+            v = np.frombuffer(b, dtype=np.float32)
+            out[i, :min(len(v), len(FEATURES))] = v[:len(FEATURES)]
+    return out
+
+
+def load_partition(path, mmap=True):
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    cols = {c: np.load(os.path.join(path, c + ".npy"), mmap_mode="r" if mmap else None) for c in COLUMNS}
+    return cols, meta
+
+
+def _write_partition(path, cols, features):
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for c in COLUMNS:
+        np.save(os.path.join(tmp, c + ".npy"), cols[c])
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"features": list(features), "rows": int(len(cols["ts"]))}, f)
+    os.replace(tmp, path)
+
+
+def _merge(old, new):
+    """Concatenate two column sets (old feature layout remapped to FEATURES) sorted by (key, ts)."""
+    if old is not None:
+        cols, meta = old
+        feats = np.full((len(cols["ts"]), len(FEATURES)), np.nan, dtype=np.float32)
+        for j, name in enumerate(meta["features"]):
+            if name in FEATURES:
+                feats[:, FEATURES.index(name)] = cols["feats"][:, j]
+        new = {c: np.concatenate([np.asarray(cols[c]) if c != "feats" else feats, new[c]]) for c in COLUMNS}
+    order = np.lexsort((new["ts"], new["key"]))
+    return {c: new[c][order] for c in COLUMNS}
+
+
+def compact(now=None):
+    """Move log rows of closed hours into their day partitions; returns rows moved."""
+    now = time.time() if now is None else now
+    cutoff = math.floor(now / 3600.0) * 3600.0
+    c = _db()
+    rows = c.execute("SELECT rowid, ts, kind, lat, lon, score, feats FROM score_log WHERE ts < ? "
+                     "ORDER BY rowid LIMIT ?", (cutoff, COMPACT_BATCH)).fetchall()
+    if rows:
+        max_rowid = rows[-1][0]
+        groups = {}
+        for r in rows:
+            groups.setdefault((r[2], _day(r[1])), []).append(r)
+        manifest = []
+        for (kind, day), grp in groups.items():
+            lat = np.array([r[3] for r in grp])
+            lon = np.array([r[4] for r in grp])
+            cy, cx = np.floor(lat / CELL_DEG).astype(np.int64), np.floor(lon / CELL_DEG).astype(np.int64)
+            new = {"key": cell_key(cy, cx), "ts": np.array([r[1] for r in grp]),
+                   "lat": lat.astype(np.float32), "lon": lon.astype(np.float32),
+                   "score": np.array([r[5] for r in grp], dtype=np.float32),
+                   "feats": _feat_matrix([r[6] for r in grp])}
+            cur = c.execute("SELECT path FROM score_partitions WHERE kind = ? AND day = ?", (kind, day)).fetchone()
+            merged = _merge(load_partition(cur[0], mmap=False) if cur else None, new)
+            path = os.path.join(archive_dir(), kind, f"{day}.{int(now * 1000)}")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write_partition(path, merged, FEATURES)
+            manifest.append((kind, day, path, len(merged["ts"]), float(merged["ts"].min()), float(merged["ts"].max())))
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            c.executemany("INSERT OR REPLACE INTO score_partitions (kind, day, path, rows, t0, t1) "
+                          "VALUES (?, ?, ?, ?, ?, ?)", manifest)
+            c.execute("DELETE FROM score_log WHERE rowid <= ? AND ts < ?", (max_rowid, cutoff))
+            c.execute("COMMIT")
+        except Exception:
+            c.execute("ROLLBACK")
+            raise
+    _sweep(c, now)
+    return len(rows)
+
+
+def _sweep(c, now):
+    """Drop partitions past KEEP_DAYS and superseded versions older than GRACE_S."""
+    oldest = _day(now - KEEP_DAYS * 86400.0)
+    c.execute("DELETE FROM score_partitions WHERE day < ?", (oldest,))
+    live = {r[0] for r in c.execute("SELECT path FROM score_partitions")}
+    root = archive_dir()
+    for kind in (os.listdir(root) if os.path.isdir(root) else ()):
+        kdir = os.path.join(root, kind)
+        for name in os.listdir(kdir):
+            path = os.path.join(kdir, name)
+            if path not in live and now - os.path.getmtime(path) > GRACE_S:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+# -----------------------------
+# Queries
+# -----------------------------
+def _partition_rows(path, bbox, t0, t1):
+    cols, meta = load_partition(path)
+    west, south, east, north = bbox
+    cy0, cx0 = cell_of(south, west)
+    cy1, cx1 = cell_of(north, east)
+    key = cols["key"]
+    idx = []
+    for cy in range(cy0, cy1 + 1):
+        lo = np.searchsorted(key, cell_key(cy, cx0), side="left")
+        hi = np.searchsorted(key, cell_key(cy, cx1), side="right")
+        if hi > lo:
+            idx.append(np.arange(lo, hi))
+    if not idx:
+        return None
+    idx = np.concatenate(idx)
+    ts, lat, lon = cols["ts"][idx], cols["lat"][idx], cols["lon"][idx]
+    keep = (ts >= t0) & (ts <= t1) & (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+    idx = idx[keep]
+    feats = np.full((len(idx), len(FEATURES)), np.nan, dtype=np.float32)
+    for j, name in enumerate(meta["features"]):
+        if name in FEATURES:
+            feats[:, FEATURES.index(name)] = cols["feats"][idx, j]
+    return {"ts": cols["ts"][idx], "lat": cols["lat"][idx].astype(float), "lon": cols["lon"][idx].astype(float),
+            "score": cols["score"][idx].astype(float), "feats": feats}
+
+
+def query(kind, bbox, t0, t1):
+    """Every archived (kind) row inside bbox and [t0, t1], as column arrays sorted by time."""
+    west, south, east, north = bbox
+    c = _db()
+    c.execute("BEGIN")      # one snapshot: manifest and log agree about what was compacted
+    try:
+        parts = c.execute("SELECT path FROM score_partitions WHERE kind = ? AND t1 >= ? AND t0 <= ? ORDER BY day",
+                          (kind, t0, t1)).fetchall()
+        hot = c.execute("SELECT ts, lat, lon, score, feats FROM score_log WHERE kind = ? AND ts BETWEEN ? AND ? "
+                        "AND lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?",
+                        (kind, t0, t1, south, north, west, east)).fetchall()
+    finally:
+        c.execute("COMMIT")
+    chunks = [r for r in (_partition_rows(p[0], bbox, t0, t1) for p in parts) if r is not None]
+    if hot:
+        chunks.append({"ts": np.array([r[0] for r in hot]), "lat": np.array([r[1] for r in hot]),
+                       "lon": np.array([r[2] for r in hot]), "score": np.array([r[3] for r in hot]),
+                       "feats": _feat_matrix([r[4] for r in hot])})
+    if not chunks:
+        return {"ts": np.zeros(0), "lat": np.zeros(0), "lon": np.zeros(0), "score": np.zeros(0),
+                "feats": np.zeros((0, len(FEATURES)), dtype=np.float32)}
+    out = {k: np.concatenate([ch[k] for ch in chunks]) for k in chunks[0]}
+    order = np.argsort(out["ts"], kind="stable")
+    return {k: v[order] for k, v in out.items()}
+
+
+def latest_per_cell(rows):
+    """Indices of the last row in each feature-store cell (rows sorted by time)."""
+    if not len(rows["ts"]):
+        return np.zeros(0, dtype=int)
+    cy, cx = np.floor(rows["lat"] / CELL_DEG).astype(np.int64), np.floor(rows["lon"] / CELL_DEG).astype(np.int64)
+    key = cell_key(cy, cx)
+    rev = key[::-1]
+    _, first = np.unique(rev, return_index=True)
+    return np.sort(len(key) - 1 - first)
+
+
+def hourly_series(rows):
+    """[(hour start, count, mean, max)] over the rows."""
+    if not len(rows["ts"]):
+        return []
+    hours = np.floor(rows["ts"] / 3600.0).astype(np.int64)
+    uniq, inv = np.unique(hours, return_inverse=True)
+    counts = np.bincount(inv)
+    sums = np.bincount(inv, weights=rows["score"])
+    maxes = np.full(len(uniq), -np.inf)
+    np.maximum.at(maxes, inv, rows["score"])
+    return [(int(h) * 3600, int(n), float(s / n), float(m)) for h, n, s, m in zip(uniq, counts, sums, maxes)]
+
+
+# -----------------------------
+# Background compaction
+# -----------------------------
+_started = False
+
+
+def _lead_and_compact():
+    lock = open(LOCK_PATH, "w")
+    while True:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            break
+        except OSError:
+            time.sleep(60)
+    while True:
+        try:
+            moved = compact()
+        except Exception as e:
+            print("score archive compaction failed:", repr(e))
+            moved = 0
+        time.sleep(1.0 if moved >= COMPACT_BATCH else COMPACT_POLL_S)
+
+
+def start_archive_compactor():
+    """Start the compactor thread once per process (LEO_ARCHIVE=0 disables)."""
+    global _started
+    if _started or not enabled():
+        return
+    _started = True
+    threading.Thread(target=_lead_and_compact, name="leo-archive", daemon=True).start()
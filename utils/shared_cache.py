@@ -0,0 +1,150 @@
+# backend/utils/shared_cache.py
+"""
+Cross-process response cache in a single SQLite file (WAL mode).
+
+Every gunicorn worker opens the same file, so a response fetched by one
+worker is served to all of them and survives restarts and deploys. Values
+are zlib-compressed response bodies; each write is one transaction, so
+readers never see a partial entry. When the file grows past max_bytes the
+least recently read entries are evicted. Expired entries are kept for a
+grace period (STALE_GRACE_S) as the stale fallback for a failing provider.
+"""
+import os
+import tempfile
+import threading
+import time
+import zlib
+
+from utils.state_db import connect
+
+DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "leo_cache.sqlite3")
+
+# Seconds a provider response stays fresh; LEO_CACHE_TTL_<PROVIDER> overrides.
+PROVIDER_TTLS = {
+    "nws": 900,
+    "firms": 600,
+    "open-meteo": 900,
+    "cdse": 6 * 3600,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires_at);
+"""
+
+
+def provider_ttl(provider):
+    env = os.getenv("LEO_CACHE_TTL_" + provider.upper().replace("-", "_"))
+    if env is not None:
+        return int(env)
+    return PROVIDER_TTLS.get(provider, 300)
+
+
+class SharedCache:
+    # Only bump accessed_at when it is this stale, to keep reads write-free
+    TOUCH_EVERY_S = 30.0
+    # Re-check the total size every N writes instead of on each one
+    SIZE_CHECK_EVERY = 50
+    # Expired entries stay this long so get_stale can still serve them
+    # when the provider is down; LEO_CACHE_STALE_GRACE_S overrides
+    STALE_GRACE_S = int(os.getenv("LEO_CACHE_STALE_GRACE_S", str(7 * 24 * 3600)))
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._writes = 0
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self):
+        return connect(self.path)
+
+    def get(self, key):
+        """(value bytes, stored_at) if a fresh entry exists, else None."""
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT value, stored_at, expires_at, accessed_at FROM entries WHERE key = ?",
+            (key,)).fetchone()
+        if row is None or row[2] < now:
+            return None
+        if now - row[3] > self.TOUCH_EVERY_S:
+            self._conn().execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return zlib.decompress(row[0]), row[1]
+
+    def get_stale(self, key):
+        """Value of an entry even if expired (until it is evicted), else None."""
+        row = self._conn().execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        return zlib.decompress(row[0]) if row else None
+
+    def stored_at(self, key):
+        row = self._conn().execute(
+            "SELECT stored_at FROM entries WHERE key = ? AND expires_at >= ?",
+            (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, provider, value, ttl):
+        now = time.time()
+        blob = zlib.compress(value, 6)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, provider, blob, len(blob), now, now + ttl, now))
+        self._writes += 1
+        if self._writes % self.SIZE_CHECK_EVERY == 0:
+            self.evict()
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def evict(self):
+        """Drop entries expired for over STALE_GRACE_S, then LRU entries until under 90% of max_bytes."""
+        c = self._conn()
+        c.execute("DELETE FROM entries WHERE expires_at < ?", (time.time() - self.STALE_GRACE_S,))
+        total = c.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = total - int(self.max_bytes * 0.9)
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            freed = 0
+            doomed = []
+            for key, size in c.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+                doomed.append((key,))
+                freed += size
+                if freed >= target:
+                    break
+            c.executemany("DELETE FROM entries WHERE key = ?", doomed)
+            c.execute("COMMIT")
+        except Exception:
+            c.execute("ROLLBACK")
+            raise
+
+    def stats(self):
+        rows = self._conn().execute(
+            "SELECT provider, COUNT(*), SUM(size) FROM entries GROUP BY provider").fetchall()
+        return {p: {"entries": n, "bytes": b} for p, n, b in rows}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide SharedCache, or None when LEO_CACHE_PATH is set to empty."""
+    global _cache
+    if _cache is None:
+        path = os.getenv("LEO_CACHE_PATH", DEFAULT_PATH)
+        if not path:
+            return None
+        with _cache_lock:
+            if _cache is None:
+                max_mb = int(os.getenv("LEO_CACHE_MAX_MB", "256"))
+                _cache = SharedCache(path, max_bytes=max_mb * 1024 * 1024)
+    return _cache
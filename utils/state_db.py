@@ -0,0 +1,42 @@
+# backend/utils/state_db.py
+"""
+Per-thread SQLite connections (WAL) for state shared by all gunicorn workers.
+
+The response cache lives in its own evictable file; durable state such as
+the watchlist goes in LEO_STATE_PATH.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+
+DEFAULT_STATE_PATH = os.path.join(tempfile.gettempdir(), "leo_state.sqlite3")
+
+_local = threading.local()
+
+
+def connect(path):
+    """Autocommit connection to `path` owned by the calling thread and process."""
+    conns = getattr(_local, "conns", None)
+    # connections must not cross a fork (gunicorn --preload)
+    if conns is None or _local.pid != os.getpid():
+        conns = _local.conns = {}
+        _local.schemas = set()
+        _local.pid = os.getpid()
+    c = conns.get(path)
+    if c is None:
+        c = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        c.execute("PRAGMA journal_mode=WAL")
+        c.execute("PRAGMA synchronous=NORMAL")
+        conns[path] = c
+    return c
+
+
+def state_db(schema=None):
+    """This thread's state DB connection; the `schema` DDL script runs once per connection."""
+    path = os.getenv("LEO_STATE_PATH", DEFAULT_STATE_PATH)
+    c = connect(path)
+    if schema is not None and (path, schema) not in _local.schemas:
+        c.executescript(schema)
+        _local.schemas.add((path, schema))
+    return c
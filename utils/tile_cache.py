@@ -0,0 +1,102 @@
+# backend/utils/tile_cache.py
+"""
+Disk LRU for rendered map tiles, shared by all workers on the host.
+
+Files are named {layer}/{z}/{x}/{y}-{version}.png; a hit bumps the file's
+mtime, and once the directory passes max_bytes the oldest files are
+removed. Writes go to a temp file and are renamed into place, so a reader
+never sees a half-written PNG. A new data version simply produces new
+names; tiles of stale versions age out through the LRU.
+"""
+import os
+import tempfile
+import threading
+import time
+
+DEFAULT_DIR = os.path.join(tempfile.gettempdir(), "leo_tiles")
+
+
+class TileCache:
+    # Rescan the directory size every N writes
+    SIZE_CHECK_EVERY = 100
+
+    def __init__(self, root=DEFAULT_DIR, max_bytes=512 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, layer, z, x, y, version):
+        return os.path.join(self.root, layer, str(z), str(x), f"{y}-{version}.png")
+
+    def get(self, layer, z, x, y, version):
+        p = self.path(layer, z, x, y, version)
+        try:
+            with open(p, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(p)
+        except OSError:
+            pass
+        return data
+
+    def put(self, layer, z, x, y, version, data):
+        p = self.path(layer, z, x, y, version)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(p), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, p)
+        except Exception:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self._writes += 1
+            check = self._writes % self.SIZE_CHECK_EVERY == 0
+        if check:
+            self.evict()
+
+    def evict(self):
+        files = []
+        total = 0
+        for dirpath, _, names in os.walk(self.root):
+            for n in names:
+                p = os.path.join(dirpath, n)
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                if n.endswith(".tmp") and time.time() - st.st_mtime > 300:
+                    files.append((0.0, st.st_size, p))   # orphaned temp file
+                else:
+                    files.append((st.st_mtime, st.st_size, p))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return
+        target = total - int(self.max_bytes * 0.9)
+        for _, size, p in sorted(files):
+            try:
+                os.unlink(p)
+            except OSError:
+                continue
+            target -= size
+            if target <= 0:
+                break
+
+
+_cache = None
+
+
+def get_tile_cache():
+    global _cache
+    if _cache is None:
+        _cache = TileCache(os.getenv("LEO_TILE_CACHE_DIR", DEFAULT_DIR),
+                           max_bytes=int(os.getenv("LEO_TILE_CACHE_MAX_MB", "512")) * 1024 * 1024)
+    return _cache
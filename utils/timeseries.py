@@ -0,0 +1,204 @@
+# backend/utils/timeseries.py
+"""
+Rolling-window statistics for provider time series.
+
+Batch helpers take any sequence (None/NaN allowed) and return float64 arrays
+of the same length; windows at the start of the series are partial, matching
+the old smooth_series(). The Rolling*/EWMA classes are the online versions:
+feed new samples with update() and read the current value without touching
+history. Both use the same positional window: the last k samples, missing
+ones included, with the statistic taken over the valid samples among them
+(NaN / None when there are none).
+"""
+from collections import deque
+import math
+
+import numpy as np
+
+
+def as_array(values):
+    """float64 array with None mapped to NaN."""
+    if isinstance(values, np.ndarray):
+        return values.astype(np.float64, copy=False)
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def series_total(values):
+    """Sum ignoring missing samples (0.0 for an empty series)."""
+    x = as_array(values)
+    return float(np.nansum(x)) if x.size else 0.0
+
+
+def series_mean(values):
+    """Mean ignoring missing samples, None if nothing is valid."""
+    x = as_array(values)
+    valid = ~np.isnan(x)
+    return float(x[valid].mean()) if valid.any() else None
+
+
+def rolling_mean(values, k):
+    """Trailing k-sample mean via cumulative sums, O(n); NaNs in the window are left out of the count."""
+    x = as_array(values)
+    if k < 1:
+        raise ValueError("k must be >= 1")
+    valid = ~np.isnan(x)
+    csum = np.concatenate(([0.0], np.cumsum(np.where(valid, x, 0.0))))
+    ccnt = np.concatenate(([0], np.cumsum(valid)))
+    hi = np.arange(1, x.size + 1)
+    lo = np.maximum(hi - k, 0)
+    cnt = ccnt[hi] - ccnt[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(cnt > 0, (csum[hi] - csum[lo]) / cnt, np.nan)
+
+
+def _rolling_reduce(values, k, fn, pad):
+    x = as_array(values)
+    if k < 1:
+        raise ValueError("k must be >= 1")
+    if x.size == 0:
+        return x
+    filled = np.where(np.isnan(x), pad, x)
+    padded = np.concatenate((np.full(k - 1, pad), filled))
+    out = fn(np.lib.stride_tricks.sliding_window_view(padded, k), axis=1)
+    return np.where(np.isinf(out), np.nan, out)
+
+
+def rolling_min(values, k):
+    return _rolling_reduce(values, k, np.min, np.inf)
+
+
+def rolling_max(values, k):
+    return _rolling_reduce(values, k, np.max, -np.inf)
+
+
+def ewma(values, alpha=None, span=None):
+    """
+    Exponentially weighted mean, y[0] = x[0], y[t] = a*x[t] + (1-a)*y[t-1].
+    Evaluated block-wise in closed form so long series stay vectorized;
+    missing samples carry the previous value forward.
+    """
+    if alpha is None:
+        if span is None:
+            raise ValueError("alpha or span is required")
+        alpha = 2.0 / (span + 1.0)
+    if not 0.0 < alpha <= 1.0:
+        raise ValueError("alpha must be in (0, 1]")
+    x = as_array(values)
+    out = np.full_like(x, np.nan)
+    valid = np.flatnonzero(~np.isnan(x))
+    if not valid.size:
+        return out
+    f = valid[0]
+    if alpha == 1.0:
+        idx = np.where(np.isnan(x), -1, np.arange(x.size))
+        np.maximum.accumulate(idx, out=idx)
+        out[f:] = x[idx[f:]]
+        return out
+
+    out[f] = carry = x[f]
+    # keep (1-a)**-block inside float64 range
+    block = max(1, int(150.0 / -math.log10(1.0 - alpha)))
+    for s in range(f + 1, x.size, block):
+        seg = x[s:s + block]
+        miss = np.isnan(seg)
+        a = np.where(miss, 0.0, alpha)           # missing sample: y[t] = y[t-1]
+        scale = np.cumprod(1.0 - a)              # prod_{i<=j} (1 - a_i)
+        y = scale * (carry + np.cumsum(np.where(miss, 0.0, seg) * a / scale))
+        out[s:s + block] = y
+        carry = y[-1]
+    return out
+
+
+# -----------------------------
+# Online / incremental updaters
+# -----------------------------
+class RollingMean:
+    """Trailing k-sample mean with O(1) update(); same window as rolling_mean()."""
+
+    def __init__(self, k):
+        self.k = k
+        self._buf = deque()     # last k samples, None where missing
+        self._sum = 0.0
+        self._count = 0
+
+    def update(self, x):
+        if x is not None and math.isnan(x):
+            x = None
+        self._buf.append(x)
+        if x is not None:
+            self._sum += x
+            self._count += 1
+        if len(self._buf) > self.k:
+            old = self._buf.popleft()
+            if old is not None:
+                self._sum -= old
+                self._count -= 1
+                if not self._count:
+                    self._sum = 0.0     # drop accumulated rounding error
+        return self.value
+
+    def extend(self, xs):
+        for x in xs:
+            self.update(x)
+        return self.value
+
+    @property
+    def value(self):
+        return self._sum / self._count if self._count else None
+
+
+class EWMA:
+    """Online exponentially weighted mean; same recurrence as ewma()."""
+
+    def __init__(self, alpha=None, span=None):
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1.0)
+        self.value = None
+
+    def update(self, x):
+        if x is None or math.isnan(x):
+            return self.value
+        self.value = x if self.value is None else self.alpha * x + (1.0 - self.alpha) * self.value
+        return self.value
+
+    def extend(self, xs):
+        for x in xs:
+            self.update(x)
+        return self.value
+
+
+class RollingExtrema:
+    """Trailing k-sample min and max with monotonic deques (amortized O(1)); same window as rolling_min/max()."""
+
+    def __init__(self, k):
+        self.k = k
+        self._n = 0
+        self._min = deque()   # (index, value), increasing values
+        self._max = deque()   # (index, value), decreasing values
+
+    def update(self, x):
+        i = self._n
+        self._n += 1            # a missing sample still takes its place in the window
+        if x is not None and not math.isnan(x):
+            while self._min and self._min[-1][1] >= x:
+                self._min.pop()
+            while self._max and self._max[-1][1] <= x:
+                self._max.pop()
+            self._min.append((i, x))
+            self._max.append((i, x))
+        for dq in (self._min, self._max):
+            while dq and dq[0][0] <= i - self.k:
+                dq.popleft()
+        return self.min, self.max
+
+    def extend(self, xs):
+        for x in xs:
+            self.update(x)
+        return self.min, self.max
+
+    @property
+    def min(self):
+        return self._min[0][1] if self._min else None
+
+    @property
+    def max(self):
+        return self._max[0][1] if self._max else None
@@ -0,0 +1,254 @@
+# backend/utils/upstream.py
+"""
+Outbound calls to the data providers (weather.gov, FIRMS, open-meteo, CDSE).
+
+fetch() is the blocking client used by the Flask views; afetch() is its
+non-blocking twin used by asgi.py. Both return the already-decoded body
+(parse="json" | "text" | "bytes") and raise on HTTP errors, so callers keep
+their existing try/except fallbacks.
+
+Successful responses go through the cross-worker SharedCache: GETs are
+cached for the provider's TTL by default, other methods only when the
+caller passes an explicit ttl (e.g. deterministic CDSE process requests).
+
+Cache misses take a token from the provider's shared bucket
+(utils.ratelimit) at the caller's priority first. A call that would wait
+too long is shed: it is answered from the expired cache entry when one is
+still on disk, otherwise RateLimited propagates to the caller's fallback.
+
+Inside a request deadline (utils.admission) the rate-limit wait and the
+call's timeout are capped to the time left; with too little left the call
+is skipped, served stale when possible, else DeadlineExceeded is raised.
+
+Inside shared_fetches() identical fetch() calls made for one request, from
+any thread running in a copy of its context, reach the cache or provider
+once; the other callers wait for and reuse that result.
+
+LEO_UPSTREAM_MODE=record|replay captures responses to, or serves them
+from, the local fixture archive (utils.replay) for deterministic offline
+runs.
+"""
+from concurrent.futures import Future
+from contextlib import contextmanager
+import contextvars
+import hashlib
+import json as _json
+import os
+import threading
+import time
+import requests
+
+from utils.admission import DeadlineExceeded, budget, remaining
+from utils.ratelimit import RateLimited, acquire, aacquire, penalize, retry_after_s
+from utils.replay import areplayed, record, redact_form, redact_url, replayed, upstream_mode
+from utils.shared_cache import get_cache, provider_ttl
+
+NWS_USER_AGENT = os.getenv("NWS_USER_AGENT", "LEO-DigitalTwin/1.0 (contact@example.com)")
+
+# Connection limits for the shared async client: one event loop can keep this
+# many sockets open to providers while thousands of requests await them.
+ASYNC_MAX_CONNECTIONS = int(os.getenv("LEO_ASYNC_MAX_CONNECTIONS", "512"))
+ASYNC_MAX_KEEPALIVE = int(os.getenv("LEO_ASYNC_MAX_KEEPALIVE", "64"))
+
+_session = requests.Session()
+_async_client = None
+
+_refresh = contextvars.ContextVar("leo_upstream_refresh", default=False)
+_shared = contextvars.ContextVar("leo_upstream_shared", default=None)
+
+
+@contextmanager
+def refreshing():
+    """Inside this block fetch()/afetch() skip cache reads and overwrite the entry."""
+    token = _refresh.set(True)
+    try:
+        yield
+    finally:
+        _refresh.reset(token)
+
+
+def is_refreshing():
+    return _refresh.get()
+
+
+@contextmanager
+def shared_fetches():
+    """Identical fetch() calls inside the block run once; yields the {call: Future} map."""
+    calls = {}
+    token = _shared.set((threading.Lock(), calls))
+    try:
+        yield calls
+    finally:
+        _shared.reset(token)
+
+
+def nws_headers(accept=None):
+    h = {"User-Agent": NWS_USER_AGENT}
+    if accept:
+        h["Accept"] = accept
+    return h
+
+
+def _decode(content, parse):
+    if parse == "json":
+        return _json.loads(content)
+    if parse == "text":
+        return content.decode("utf-8", errors="replace")
+    return content
+
+
+def cache_key(method, url, params=None, headers=None, data=None, json=None):
+    """Stable key for a request; auth headers are left out on purpose."""
+    accept = (headers or {}).get("Accept", "")
+    blob = _json.dumps([method.upper(), url, sorted((params or {}).items()), accept,
+                        data if not isinstance(data, dict) else sorted(data.items()), json],
+                       sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _cache_ttl(method, ttl, provider):
+    if ttl is None:
+        return provider_ttl(provider) if method.upper() == "GET" else 0
+    return ttl
+
+
+def _fixture_key(method, url, params, headers, data, json):
+    return cache_key(method, redact_url(url), params, headers, redact_form(data), json)
+
+
+def _cache_get(key):
+    cache = get_cache()
+    if cache is None:
+        return None
+    try:
+        hit = cache.get(key)
+    except Exception:
+        return None
+    return hit[0] if hit else None
+
+
+def _cache_stale(key):
+    cache = get_cache()
+    if cache is None or key is None:
+        return None
+    try:
+        return cache.get_stale(key)
+    except Exception:
+        return None
+
+
+def _cache_put(key, provider, content, ttl):
+    cache = get_cache()
+    if cache is None:
+        return
+    try:
+        cache.set(key, provider, content, ttl)
+    except Exception:
+        pass  # a cache write failure must never fail the request
+
+
+def fetch(provider, url, method="GET", params=None, headers=None, data=None,
+          json=None, timeout=10, parse="json", ttl=None):
+    """Blocking provider call; returns the decoded body or raises."""
+    shared = _shared.get()
+    if shared is None:
+        return _fetch(provider, url, method, params, headers, data, json, timeout, parse, ttl)
+    lock, calls = shared
+    key = (_fixture_key(method, url, params, headers, data, json), parse)
+    with lock:
+        call = calls.get(key)
+        first = call is None
+        if first:
+            call = calls[key] = Future()
+    if first:
+        try:
+            call.set_result(_fetch(provider, url, method, params, headers, data, json, timeout, parse, ttl))
+        except BaseException as e:
+            call.set_exception(e)
+    return call.result()
+
+
+def _fetch(provider, url, method, params, headers, data, json, timeout, parse, ttl):
+    mode = upstream_mode()
+    if mode == "replay":
+        return _decode(replayed(provider, _fixture_key(method, url, params, headers, data, json), url), parse)
+    ttl = _cache_ttl(method, ttl, provider)
+    key = cache_key(method, url, params, headers, data, json) if ttl > 0 else None
+    if key and not _refresh.get() and mode != "record":
+        content = _cache_get(key)
+        if content is not None:
+            return _decode(content, parse)
+    try:
+        acquire(provider, max_wait=remaining())
+        timeout = budget(timeout)
+    except (RateLimited, DeadlineExceeded):
+        stale = _cache_stale(key)
+        if stale is None:
+            raise
+        return _decode(stale, parse)
+    t0 = time.monotonic()
+    r = _session.request(method, url, params=params, headers=headers,
+                         data=data, json=json, timeout=timeout)
+    if mode == "record":
+        record(provider, _fixture_key(method, url, params, headers, data, json), method, url,
+               r.status_code, (time.monotonic() - t0) * 1000.0, r.content)
+    if r.status_code == 429:
+        penalize(provider, retry_after_s(r.headers))
+    r.raise_for_status()
+    if key:
+        _cache_put(key, provider, r.content, ttl)
+    return _decode(r.content, parse)
+
+
+def _client():
+    global _async_client
+    if _async_client is None:
+        import httpx
+        _async_client = httpx.AsyncClient(
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=ASYNC_MAX_CONNECTIONS,
+                                max_keepalive_connections=ASYNC_MAX_KEEPALIVE),
+        )
+    return _async_client
+
+
+async def afetch(provider, url, method="GET", params=None, headers=None, data=None,
+                 json=None, timeout=10, parse="json", ttl=None):
+    """Non-blocking twin of fetch() on a shared httpx.AsyncClient."""
+    mode = upstream_mode()
+    if mode == "replay":
+        return _decode(await areplayed(provider, _fixture_key(method, url, params, headers, data, json), url),
+                       parse)
+    ttl = _cache_ttl(method, ttl, provider)
+    key = cache_key(method, url, params, headers, data, json) if ttl > 0 else None
+    if key and not _refresh.get() and mode != "record":
+        content = _cache_get(key)   # local SQLite read, sub-millisecond
+        if content is not None:
+            return _decode(content, parse)
+    try:
+        await aacquire(provider, max_wait=remaining())
+        timeout = budget(timeout)
+    except (RateLimited, DeadlineExceeded):
+        stale = _cache_stale(key)
+        if stale is None:
+            raise
+        return _decode(stale, parse)
+    t0 = time.monotonic()
+    r = await _client().request(method, url, params=params, headers=headers,
+                                data=data, json=json, timeout=timeout)
+    if mode == "record":
+        record(provider, _fixture_key(method, url, params, headers, data, json), method, url,
+               r.status_code, (time.monotonic() - t0) * 1000.0, r.content)
+    if r.status_code == 429:
+        penalize(provider, retry_after_s(r.headers))
+    r.raise_for_status()
+    if key:
+        _cache_put(key, provider, r.content, ttl)
+    return _decode(r.content, parse)
+
+
+async def aclose():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
@@ -0,0 +1,241 @@
+# backend/utils/watchlist.py
+"""
+Operator watchlist and the background pre-warming scheduler.
+
+Watched areas live in the shared state DB so every worker sees the same
+list. One worker per host (whoever holds the prewarm lock file) runs the
+scheduler: shortly before the cached entry would expire it re-fetches each
+area's provider data the way the endpoints read it, inside
+upstream.refreshing(). NWS, FIRMS and CDSE are recomputed as feature-store
+sources of the area's cell (the risk endpoints read the cell, not the
+point); open-meteo goes through spread_api.fetch_weather like /api/spread.
+Calls are spaced per provider so a long watchlist never bursts into a rate
+limit.
+"""
+import fcntl
+import heapq
+import json
+import os
+import tempfile
+import threading
+import time
+
+from utils.ratelimit import PREFETCH, priority
+from utils.shared_cache import provider_ttl
+from utils.state_db import state_db
+from utils.upstream import refreshing
+
+# endpoint kind -> providers it reads
+KIND_PROVIDERS = {
+    "wildfire": ("nws", "firms"),
+    "flood": ("nws",),
+    "crop": ("cdse",),
+    "spread": ("open-meteo",),
+}
+
+# Minimum seconds between two pre-warm calls to the same provider
+PROVIDER_SPACING_S = {"nws": 1.0, "firms": 2.0, "open-meteo": 0.5, "cdse": 5.0}
+
+# Refresh when this fraction of the provider TTL has elapsed
+REFRESH_AT = 0.8
+
+LOCK_PATH = os.path.join(tempfile.gettempdir(), "leo_prewarm.lock")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS watchlist (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    kinds TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS watchlist_refresh (
+    area_id INTEGER NOT NULL,
+    provider TEXT NOT NULL,
+    refreshed_at REAL NOT NULL,
+    ok INTEGER NOT NULL,
+    PRIMARY KEY (area_id, provider)
+);
+"""
+
+
+def _db():
+    return state_db(_SCHEMA)
+
+
+# -----------------------------
+# Watchlist store
+# -----------------------------
+def add_area(lat, lon, name=None, kinds=None):
+    kinds = [k for k in (kinds or KIND_PROVIDERS) if k in KIND_PROVIDERS]
+    if not kinds:
+        raise ValueError(f"kinds must be any of {sorted(KIND_PROVIDERS)}")
+    cur = _db().execute(
+        "INSERT INTO watchlist (name, lat, lon, kinds, created_at) VALUES (?, ?, ?, ?, ?)",
+        (name, float(lat), float(lon), json.dumps(kinds), time.time()))
+    return get_area(cur.lastrowid)
+
+
+def remove_area(area_id):
+    c = _db()
+    c.execute("DELETE FROM watchlist_refresh WHERE area_id = ?", (area_id,))
+    return c.execute("DELETE FROM watchlist WHERE id = ?", (area_id,)).rowcount > 0
+
+
+def _row_to_area(row, refreshed=None):
+    area_id, name, lat, lon, kinds, created_at = row
+    return {"id": area_id, "name": name, "lat": lat, "lon": lon,
+            "kinds": json.loads(kinds), "created_at": created_at,
+            "refreshed": refreshed or {}}
+
+
+def get_area(area_id):
+    row = _db().execute("SELECT id, name, lat, lon, kinds, created_at FROM watchlist WHERE id = ?",
+                        (area_id,)).fetchone()
+    return _row_to_area(row) if row else None
+
+
+def list_areas():
+    c = _db()
+    refreshed = {}
+    for area_id, provider, at, ok in c.execute("SELECT area_id, provider, refreshed_at, ok FROM watchlist_refresh"):
+        refreshed.setdefault(area_id, {})[provider] = {"at": at, "ok": bool(ok)}
+    rows = c.execute("SELECT id, name, lat, lon, kinds, created_at FROM watchlist ORDER BY id").fetchall()
+    return [_row_to_area(r, refreshed.get(r[0])) for r in rows]
+
+
+def _mark_refreshed(area_id, provider, ok):
+    _db().execute("INSERT OR REPLACE INTO watchlist_refresh VALUES (?, ?, ?, ?)",
+                  (area_id, provider, time.time(), int(ok)))
+
+
+# -----------------------------
+# Provider refresh jobs (same call paths as the endpoints)
+# -----------------------------
+def _refresh_cell(source):
+    """Refresher recomputing feature-store `source` for the area's cell; ok if it answered with any features."""
+    def refresh(lat, lon):
+        from utils.feature_store import SOURCES, cell_of, refresh_cell, touch_cells
+        cell = cell_of(lat, lon)
+        touch_cells([cell])     # the feature refresher keeps the cell current between pre-warms
+        t0 = time.time()
+        rec = refresh_cell(*cell, (source,))
+        if rec.meta.get("computed", {}).get(source, 0.0) < t0:
+            return False        # the source failed; the cell kept its old values
+        return any(rec.get(name) is not None for name in SOURCES[source][1])
+    return refresh
+
+def _refresh_open_meteo(lat, lon):
+    from spread_api import fetch_weather
+    return fetch_weather(lat, lon) is not None
+
+REFRESHERS = {
+    "nws": _refresh_cell("nws"),
+    "firms": _refresh_cell("firms"),
+    "open-meteo": _refresh_open_meteo,
+    "cdse": _refresh_cell("ndvi"),
+}
+
+
+class Prewarmer:
+    """Single-threaded scheduler: a heap of (due_at, area_id, provider) jobs."""
+
+    POLL_S = 30.0   # how often the watchlist is re-read for added/removed areas
+
+    def __init__(self):
+        self._heap = []
+        self._known = set()
+        self._last_call = {}
+        self._stop = threading.Event()
+        self._hooks = []
+
+    def on_refresh(self, fn):
+        """Register fn(area, provider, ok), called after every pre-warm fetch."""
+        self._hooks.append(fn)
+        return fn
+
+    def _sync_watchlist(self):
+        areas = {a["id"]: a for a in list_areas()}
+        wanted = set()
+        for a in areas.values():
+            for kind in a["kinds"]:
+                wanted.update((a["id"], p) for p in KIND_PROVIDERS[kind])
+        now = time.time()
+        for i, job in enumerate(sorted(wanted - self._known)):
+            area = areas[job[0]]
+            last = area["refreshed"].get(job[1], {}).get("at", 0.0)
+            due = max(now + i * PROVIDER_SPACING_S.get(job[1], 1.0),
+                      last + REFRESH_AT * provider_ttl(job[1]))
+            heapq.heappush(self._heap, (due, job[0], job[1]))
+        self._known = wanted
+        return areas
+
+    def run_once(self, areas):
+        """Run every due job, honouring per-provider spacing; returns jobs run."""
+        ran = 0
+        while self._heap and self._heap[0][0] <= time.time() and not self._stop.is_set():
+            _, area_id, provider = heapq.heappop(self._heap)
+            if (area_id, provider) not in self._known or area_id not in areas:
+                continue
+            wait = self._last_call.get(provider, 0.0) + PROVIDER_SPACING_S.get(provider, 1.0) - time.time()
+            if wait > 0:
+                self._stop.wait(wait)
+            area = areas[area_id]
+            try:
+                with refreshing(), priority(PREFETCH):
+                    ok = bool(REFRESHERS[provider](area["lat"], area["lon"]))
+            except Exception:
+                ok = False
+            self._last_call[provider] = time.time()
+            _mark_refreshed(area_id, provider, ok)
+            for hook in self._hooks:
+                try:
+                    hook(area, provider, ok)
+                except Exception:
+                    pass
+            # failed refreshes retry sooner than a full TTL
+            delay = REFRESH_AT * provider_ttl(provider) if ok else 60.0
+            heapq.heappush(self._heap, (time.time() + delay, area_id, provider))
+            ran += 1
+        return ran
+
+    def run(self):
+        next_sync = 0.0
+        areas = {}
+        while not self._stop.is_set():
+            if time.time() >= next_sync:
+                areas = self._sync_watchlist()
+                next_sync = time.time() + self.POLL_S
+            self.run_once(areas)
+            until = min(next_sync, self._heap[0][0] if self._heap else next_sync)
+            self._stop.wait(max(0.5, until - time.time()))
+
+    def stop(self):
+        self._stop.set()
+
+
+prewarmer = Prewarmer()
+_started = False
+
+
+def _lead_and_run():
+    # One scheduler per host: the worker holding the lock runs it, the others
+    # keep retrying so a new leader takes over if that worker exits.
+    lock = open(LOCK_PATH, "w")
+    while True:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            break
+        except OSError:
+            time.sleep(60)
+    prewarmer.run()
+
+
+def start_prewarmer():
+    """Start the background scheduler thread once per process (LEO_PREWARM=0 disables)."""
+    global _started
+    if _started or os.getenv("LEO_PREWARM", "1") == "0":
+        return
+    _started = True
+    threading.Thread(target=_lead_and_run, name="leo-prewarm", daemon=True).start()